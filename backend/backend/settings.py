@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'users.middleware.RequestLogMiddleware', # request IDs and one log line per request
+    'users.middleware.MetricsMiddleware', # per-route metrics, served on /metrics
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware', 
     'django.middleware.common.CommonMiddleware',
@@ -161,15 +163,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        # OTP issuance, see users.throttles.OTPRequestThrottle
+        'otp_email': '3/hour',
+        'otp_phone': '3/hour',
+        'otp_ip': '30/hour',
+    },
 }
 
+# Proxies whose X-Real-IP header is believed (users.throttles.get_client_ip);
+# from anywhere else the connecting address is the client
+TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '127.0.0.1/32,::1/128').split(',')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Checks users.revocation; the token_blacklist app isn't used
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RevocableTokenRefreshSerializer',
+}
+# Threads the async views (users.async_views) hash passwords on
+PASSWORD_HASHING_THREADS = int(os.getenv('PASSWORD_HASHING_THREADS', 4))
+
+# Logging: JSON lines on stdout, written from a background thread (users.log)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Share of fast successful requests that get a log line; the rest are always logged
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv('LOG_SUCCESS_SAMPLE_RATE', 1.0))
+LOG_SLOW_REQUEST_MS = 1000
+# Keeps those lines out of `manage.py test` output; --show-logs brings them back
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'background': {
+            'class': 'users.log.BackgroundHandler',
+        },
+    },
+    'root': {
+        'handlers': ['background'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['background'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        # 4xx are already logged by RequestLogMiddleware
+        'django.request': {
+            'level': 'ERROR',
+        },
+    },
 }
 
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>", and is a 404
+# while METRICS_TOKEN is unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# How long an authenticated user is served from the cache (users.authentication)
+AUTH_USER_CACHE_TIMEOUT = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtpout.secureserver.net'
 EMAIL_PORT = 587
@@ -178,10 +234,127 @@ EMAIL_USE_TLS = False
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
+# OTP storage: CacheOTPStore expires OTPs via the cache TTL but needs a cache
+# every web process shares, DatabaseOTPStore keeps EmailOTP/PhoneOTP rows for auditing
+OTP_STORE_BACKEND = os.getenv(
+    'OTP_STORE_BACKEND',
+    'users.otp_store.CacheOTPStore' if os.getenv('REDIS_URL') else 'users.otp_store.DatabaseOTPStore',
+)
+OTP_EXPIRY = timedelta(minutes=10)
+
+# OTP emails are queued in the cache and sent in batches over one SMTP connection
+OTP_EMAIL_BATCH_SIZE = int(os.getenv('OTP_EMAIL_BATCH_SIZE', 50))
+
+# SMS (users.sms): users.sms.backends.http posts to the gateway and refuses
+# to send without SMS_GATEWAY_URL. console (which prints OTPs), locmem and
+# filebased are for development and tests, and must be chosen explicitly.
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'users.sms.backends.http.SMSBackend')
+SMS_GATEWAY_URL = os.getenv('SMS_GATEWAY_URL')
+SMS_GATEWAY_API_KEY = os.getenv('SMS_GATEWAY_API_KEY')
+SMS_SENDER_ID = os.getenv('SMS_SENDER_ID', 'ADMSN')
+SMS_GATEWAY_TIMEOUT = float(os.getenv('SMS_GATEWAY_TIMEOUT', 5))
+SMS_GATEWAY_RETRIES = int(os.getenv('SMS_GATEWAY_RETRIES', 3))
+# Base of the exponential backoff between retries, in seconds
+SMS_GATEWAY_BACKOFF = 0.5
+SMS_GATEWAY_POOL_SIZE = 4
+SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', 100))
+SMS_FILE_PATH = os.path.join(BASE_DIR, 'tmp', 'sms')
+
+# Uploaded documents are stored once per distinct content, named by SHA-256
+# (users.storage); set DOCUMENT_STORAGE_BACKEND to opt out
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'documents': {
+        'BACKEND': os.getenv('DOCUMENT_STORAGE_BACKEND', 'users.storage.ContentAddressedStorage'),
+    },
+}
+
+# Application and form numbers (users.sequences): the admission year (the
+# current year when unset) followed by six digits, reserved in blocks per worker
+ADMISSION_YEAR = int(os.getenv('ADMISSION_YEAR', 0)) or None
+SEQUENCE_BLOCK_SIZE = int(os.getenv('SEQUENCE_BLOCK_SIZE', 20))
+SEQUENCE_FORMATS = {
+    'application_number': 'APP-{year}-{number:06d}',
+    'form_number': 'FORM-{year}-{number:06d}',
+}
+
+# Chunked uploads (users.uploads): chunks are written straight into a
+# per-upload temp file, which is attached to the image field on completion.
+# Each open upload reserves its full size, so they are capped per user.
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'tmp', 'uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+CHUNKED_UPLOAD_CHUNK_SIZE = 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY = timedelta(hours=24)
+CHUNKED_UPLOAD_MAX_OPEN = 4
+CHUNKED_UPLOAD_MAX_RESERVED = 100 * 1024 * 1024
+
+# Cache
+# Redis when REDIS_URL is set, otherwise a per-process locmem cache.
+# 'payloads' holds serialized profile sections (users.payload_cache); it is
+# TTL-bound, and LRU-bound by MAX_ENTRIES locally or maxmemory-policy on Redis.
+PAYLOAD_CACHE_TIMEOUT = 900
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+        'payloads': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'payloads',
+            'TIMEOUT': PAYLOAD_CACHE_TIMEOUT,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'payloads': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'payloads',
+            'TIMEOUT': PAYLOAD_CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+    }
+
+
+# Celery
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
+# Without a broker, tasks run inline in the calling process
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
 
 CELERY_BEAT_SCHEDULE = {
     'delete_unverified_accounts': {
         'task': 'users.tasks.delete_unverified_accounts',  # Replace 'your_app_name'
         'schedule': timedelta(hours=1),  # Run every hour
     },
+    'delete_expired_otps': {
+        'task': 'users.tasks.delete_expired_otps',
+        'schedule': timedelta(minutes=10),  # Same as OTP_EXPIRY
+    },
+    'rebuild_merit_list': {
+        'task': 'users.tasks.rebuild_merit_list',
+        'schedule': timedelta(days=1),
+    },
+    'send_queued_otp_emails': {
+        'task': 'users.tasks.send_queued_otp_emails',
+        'schedule': timedelta(minutes=1),  # Picks up anything a failed send left behind
+    },
+    'delete_stale_uploads': {
+        'task': 'users.tasks.delete_stale_uploads',
+        'schedule': timedelta(hours=1),
+    },
+    'sweep_unreferenced_documents': {
+        'task': 'users.tasks.sweep_unreferenced_documents',
+        'schedule': timedelta(hours=1),  # Longer than storage.DELETE_GRACE_PERIOD
+    },
 }
\ No newline at end of file
@@ -0,0 +1,50 @@
+import logging
+import os
+
+from django.test.runner import DiscoverRunner
+
+from users.log import BackgroundHandler
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Sends the JSON log lines of users.log.BackgroundHandler to /dev/null
+    while tests run, so the test output is only the test results.
+    assertLogs() still sees every record; --show-logs keeps the lines.
+    """
+
+    def __init__(self, show_logs=False, **kwargs):
+        super().__init__(**kwargs)
+        self.show_logs = show_logs
+        self.silenced = []
+        self.devnull = None
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--show-logs', action='store_true', help='Write the JSON log lines to stdout as usual.')
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if self.show_logs:
+            return
+        handlers = {
+            handler for logger in (logging.getLogger(), *logging.root.manager.loggerDict.values())
+            for handler in getattr(logger, 'handlers', ())
+            if isinstance(handler, BackgroundHandler)
+        }
+        self.devnull = open(os.devnull, 'w')
+        for handler in handlers:
+            self.silenced.append((handler, handler.target.setStream(self.devnull)))
+
+    def teardown_test_environment(self, **kwargs):
+        for handler, stream in self.silenced:
+            # Lines still queued are written before the stream is swapped back
+            handler.stop()
+            handler.target.setStream(stream)
+            handler.start()
+        self.silenced = []
+        if self.devnull is not None:
+            self.devnull.close()
+            self.devnull = None
+        super().teardown_test_environment(**kwargs)
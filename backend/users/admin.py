@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, Application, PersonalInfo, EducationInfo, EmailOTP, PhoneOTP
+from .models import CustomUser, Application, PersonalInfo, EducationInfo, EmailOTP, PhoneOTP, MeritRank, AdmissionCounter, NumberSequence
 
 # Register your models here.
 admin.site.register(CustomUser)
@@ -7,5 +7,7 @@ admin.site.register(Application)
 admin.site.register(PersonalInfo)
 admin.site.register(EducationInfo)
 admin.site.register(EmailOTP)
-admin.site.register(PhoneOTP)   
-
+admin.site.register(PhoneOTP)
+admin.site.register(MeritRank)
+admin.site.register(AdmissionCounter)   
+admin.site.register(NumberSequence)
@@ -0,0 +1,262 @@
+"""
+Async (ASGI) variants of the registration, login and OTP views.
+
+Same requests and responses as the views in views.py, served under
+/users/async/. DRF views are synchronous, so these are plain Django async
+views: the ORM calls use the async API, password hashing runs in a small
+dedicated thread pool (PASSWORD_HASHING_THREADS) so a burst of logins
+can't starve everything else, and OTP delivery is dispatched off the event
+loop. Under an ASGI server one worker can then hold hundreds of these
+requests open at once instead of one per thread.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, close_old_connections, transaction
+from django.http import JsonResponse, QueryDict
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+from .otp_store import get_otp_store, EMAIL, PHONE, OTP_VALID
+from .serializers import CustomUserSerializer
+from .throttles import OTPRequestThrottle
+from .views import OTP_ERRORS, mark_verified, send_otp_email, send_otp_sms
+
+logger = logging.getLogger(__name__)
+
+password_hashing_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING_THREADS, thread_name_prefix='password-hashing',
+)
+
+
+async def hash_password(password):
+    return await sync_to_async(make_password, thread_sensitive=False, executor=password_hashing_pool)(password)
+
+
+def authenticate_user(request, **credentials):
+    """
+    authenticate() like LoginView, so auth backends, user_login_failed and
+    hash upgrades apply. It hashes, so it runs in password_hashing_pool;
+    the pool's threads see no request_finished, so their connections are
+    recycled here.
+    """
+    try:
+        return authenticate(request, **credentials)
+    finally:
+        close_old_connections()
+
+
+def parse_payload(request):
+    """The request body as a dict, from JSON or a form; raises ValueError if it's neither."""
+    if not request.body:
+        return {}
+    if request.content_type == 'application/json':
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError('Expected a JSON object')
+        return data
+    return QueryDict(request.body, encoding=request.encoding).dict()
+
+
+class AsyncAPIView(View):
+    """
+    Base for the async views: parses the body into self.data, applies
+    throttle_classes like DRF does, and is CSRF-exempt like APIView.
+    """
+    throttle_classes = []
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.data = parse_payload(request)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid request body'}, status=400)
+        throttled = await sync_to_async(self.check_throttles, thread_sensitive=False)(request)
+        if throttled:
+            return throttled
+        return await super().dispatch(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        # The throttles only need the method, the parsed body and META
+        throttle_request = SimpleNamespace(method=request.method, data=self.data, META=request.META)
+        waits = []
+        for throttle in (throttle_class() for throttle_class in self.throttle_classes):
+            if not throttle.allow_request(throttle_request, self):
+                waits.append(throttle.wait())
+        if not waits:
+            return None
+        wait = max((wait for wait in waits if wait is not None), default=None)
+        response = JsonResponse({'detail': 'Request was throttled.'}, status=429)
+        if wait is not None:
+            response['Retry-After'] = str(wait)
+        return response
+
+
+def token_response(user, user_data, status=200):
+    refresh = RefreshToken.for_user(user)
+    return JsonResponse({
+        'user': user_data,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }, status=status)
+
+
+def save_with_password(serializer, encoded):
+    """
+    serializer.save() with the password hashed beforehand, so registration
+    goes through the same create_user() call as RegisterView. create_user()
+    stores an unusable password, replaced in the same transaction.
+    """
+    with transaction.atomic():
+        user = serializer.save(password=None)
+        user.password = encoded
+        user.save(update_fields=['password'])
+    return user
+
+
+class AsyncRegisterView(AsyncAPIView):
+    async def post(self, request):
+        serializer = CustomUserSerializer(data=self.data)
+        # Validation includes the unique-field lookups
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        encoded = await hash_password(serializer.validated_data['password'])
+        try:
+            user = await sync_to_async(save_with_password)(serializer, encoded)
+        except IntegrityError:
+            # Registered concurrently with the same username, email or phone
+            return JsonResponse({'error': 'A user with these details already exists.'}, status=400)
+        logger.info(f"Registered user {user.pk}")
+        return token_response(user, serializer.data, status=201)
+
+
+class AsyncLoginView(AsyncAPIView):
+    async def post(self, request):
+        username = self.data.get('username')
+        password = self.data.get('password')
+        if not username or not password:
+            return JsonResponse({'error': 'Please provide both username and password'}, status=400)
+
+        user = await sync_to_async(authenticate_user, thread_sensitive=False, executor=password_hashing_pool)(
+            request, username=username, password=password,
+        )
+        if user is None:
+            return JsonResponse({'error': 'Invalid credentials'}, status=401)
+        if not user.is_email_verified:
+            return JsonResponse({'error': 'Email verification required.'}, status=401)
+        if not user.is_phone_verified:
+            return JsonResponse({'error': 'Phone verification required.'}, status=401)
+        return token_response(user, CustomUserSerializer(user).data)
+
+
+class AsyncEmailVerificationView(AsyncAPIView):
+    throttle_classes = [OTPRequestThrottle]  # POST only
+
+    async def post(self, request):
+        """Send OTP for email verification"""
+        email = self.data.get('email')
+        if not email:
+            return JsonResponse({'error': 'Email is required'}, status=400)
+
+        user = await CustomUser.objects.filter(email=email).afirst()
+        if not user:
+            return JsonResponse({'error': 'User not found. Register first.'}, status=400)
+
+        otp = await get_otp_store().aissue(user, EMAIL, email)
+        await sync_to_async(send_otp_email, thread_sensitive=False)(email, otp)
+        return JsonResponse({'message': 'OTP sent successfully'})
+
+    async def put(self, request):
+        """Verify email OTP"""
+        email = self.data.get('email')
+        otp = self.data.get('otp')
+        if not email or not otp:
+            return JsonResponse({'error': 'Email and OTP are required'}, status=400)
+
+        result = await get_otp_store().aconsume(EMAIL, email, otp)
+        if result != OTP_VALID:
+            return JsonResponse({'error': OTP_ERRORS[result]}, status=400)
+
+        await sync_to_async(mark_verified)('is_email_verified', email=email)
+        return JsonResponse({'message': 'Email verified successfully'})
+
+
+class AsyncPhoneVerificationView(AsyncAPIView):
+    throttle_classes = [OTPRequestThrottle]  # POST only
+
+    async def post(self, request):
+        """Send OTP for phone verification"""
+        phone = self.data.get('phone')
+        if not phone:
+            return JsonResponse({'error': 'Phone number is required'}, status=400)
+
+        user = await CustomUser.objects.filter(phone=phone).afirst()
+        if not user:
+            return JsonResponse({'error': 'User not found. Register first.'}, status=400)
+
+        otp = await get_otp_store().aissue(user, PHONE, phone)
+        await sync_to_async(send_otp_sms, thread_sensitive=False)(phone, otp)
+        return JsonResponse({'message': 'OTP sent successfully'})
+
+    async def put(self, request):
+        """Verify phone OTP"""
+        phone = self.data.get('phone')
+        otp = self.data.get('otp')
+        if not phone or not otp:
+            return JsonResponse({'error': 'Phone number and OTP are required'}, status=400)
+
+        result = await get_otp_store().aconsume(PHONE, phone, otp)
+        if result != OTP_VALID:
+            return JsonResponse({'error': OTP_ERRORS[result]}, status=400)
+
+        await sync_to_async(mark_verified)('is_phone_verified', phone=phone)
+        return JsonResponse({'message': 'Phone number verified successfully'})
+
+
+class AsyncResetPasswordView(AsyncAPIView):
+    throttle_classes = [OTPRequestThrottle]  # POST only
+
+    async def post(self, request):
+        """Send OTP for password reset"""
+        email = self.data.get('email')
+        if not email:
+            return JsonResponse({'error': 'Email is required'}, status=400)
+
+        user = await CustomUser.objects.filter(email=email).afirst()
+        if not user:
+            return JsonResponse({'error': 'User not found'}, status=400)
+
+        otp = await get_otp_store().aissue(user, EMAIL, email)
+        await sync_to_async(send_otp_email, thread_sensitive=False)(email, otp)
+        return JsonResponse({'message': 'Password reset OTP sent successfully'})
+
+    async def put(self, request):
+        """Reset password with OTP verification"""
+        email = self.data.get('email')
+        otp = self.data.get('otp')
+        new_password = self.data.get('new_password')
+        if not email or not otp or not new_password:
+            return JsonResponse({'error': 'Email, OTP and new password are required'}, status=400)
+
+        result = await get_otp_store().aconsume(EMAIL, email, otp)
+        if result != OTP_VALID:
+            return JsonResponse({'error': OTP_ERRORS[result]}, status=400)
+
+        user = await CustomUser.objects.filter(email=email).afirst()
+        if user:
+            user.password = await hash_password(new_password)
+            await user.asave()
+            return JsonResponse({'message': 'Password reset successful'})
+        return JsonResponse({'error': 'User not found'}, status=400)
@@ -0,0 +1,70 @@
+"""
+JWT authentication without a user query per request.
+
+CachedJWTAuthentication resolves request.user from a short-lived cache
+entry instead of querying CustomUser on every request. Saves and deletes of
+a CustomUser drop its entry (see signals.py). Writes that bypass signals,
+such as QuerySet.update(), are bounded by AUTH_USER_CACHE_TIMEOUT.
+
+The entry holds every column except the password hash; users served from
+it have password deferred, loaded from the database if something reads it.
+The revocation check only needs the hash's digest, which is cached instead.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Per-process hit/miss counts
+stats = Counter()
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def drop_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def cached_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.attname != 'password']
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        key = user_cache_key(user_id)
+        fields = cached_fields(self.user_model)
+        entry = cache.get(key)
+        if entry is None:
+            stats['misses'] += 1
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            password_hash = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+            values = [getattr(user, field) for field in fields]
+            cache.set(key, (values, password_hash), timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        else:
+            stats['hits'] += 1
+            values, password_hash = entry
+            user = self.user_model.from_db(router.db_for_read(self.user_model), fields, values)
+
+        # Same checks as JWTAuthentication, applied to cached users too
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,138 @@
+"""
+Helpers for the in-process benchmark commands.
+
+benchmark_environment() runs the body against a throwaway test database,
+with throttling off, locmem caches, emails and SMS kept in memory, uploads
+in a temporary directory and tasks run inline, so a benchmark never touches
+real data, Redis or anything outside the process. On SQLite the test
+database is a temporary file rather than in memory: concurrent writers then
+wait for the lock like they would in production instead of failing.
+
+live_server() serves the project over HTTP from a thread, for benchmarks
+that should include the WSGI server and the network stack.
+"""
+import math
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from celery import current_app
+from django.conf import settings as django_settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.settings import api_settings
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of values (0 < p <= 100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (milliseconds) for one run."""
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def compare(results, baseline, max_latency_increase, max_throughput_decrease):
+    """
+    Regressions of results against baseline, as messages.
+
+    Both map a step name to a summarize() dict. A step regresses when its
+    median latency grows by more than max_latency_increase percent, its throughput drops by
+    more than max_throughput_decrease percent, or it has new errors.
+    """
+    regressions = []
+    for step, before in baseline.items():
+        after = results.get(step)
+        if after is None:
+            continue
+        # The median: tail latencies of short steps swing with whatever else is running
+        if before['p50_ms'] and after['p50_ms'] > before['p50_ms'] * (1 + max_latency_increase / 100):
+            regressions.append(f"{step}: p50 {before['p50_ms']} ms -> {after['p50_ms']} ms")
+        if before['rps'] and after['rps'] < before['rps'] * (1 - max_throughput_decrease / 100):
+            regressions.append(f"{step}: {before['rps']} -> {after['rps']} req/s")
+        if after['errors'] > before['errors']:
+            regressions.append(f"{step}: {before['errors']} -> {after['errors']} errors")
+    return regressions
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def live_server():
+    """Serves the project on a free local port; yields (host, port)."""
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@contextmanager
+def benchmark_environment(**settings):
+    runner = DiscoverRunner(verbosity=0)
+    temp_dir = tempfile.TemporaryDirectory()
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = os.path.join(temp_dir.name, 'benchmark.sqlite3')
+        # Dozens of concurrent clients write at once: take the write lock up
+        # front and queue for it, rather than fail with "database is locked"
+        connection.settings_dict['OPTIONS'] = {
+            **connection.settings_dict['OPTIONS'], 'transaction_mode': 'IMMEDIATE', 'timeout': 20,
+        }
+    setup_test_environment()
+    databases = runner.setup_databases()
+    rest_framework = dict(api_settings.user_settings, DEFAULT_THROTTLE_RATES={})
+    always_eager = current_app.conf.task_always_eager
+    current_app.conf.task_always_eager = True
+    try:
+        with override_settings(**{
+            'ALLOWED_HOSTS': ['*'],
+            'CACHES': {
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark',
+                },
+                'payloads': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark-payloads',
+                    'TIMEOUT': django_settings.PAYLOAD_CACHE_TIMEOUT,
+                },
+            },
+            # Everything runs in this process, so the production Redis setup's
+            # cache-backed OTP store works on locmem
+            'OTP_STORE_BACKEND': 'users.otp_store.CacheOTPStore',
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+            'SMS_BACKEND': 'users.sms.backends.locmem.SMSBackend',
+            'MEDIA_ROOT': os.path.join(temp_dir.name, 'media'),
+            'CHUNKED_UPLOAD_DIR': os.path.join(temp_dir.name, 'uploads'),
+            'REST_FRAMEWORK': rest_framework,
+            **settings,
+        }):
+            yield
+    finally:
+        current_app.conf.task_always_eager = always_eager
+        runner.teardown_databases(databases)
+        teardown_test_environment()
+        temp_dir.cleanup()
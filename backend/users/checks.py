@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+from django.utils.module_loading import import_string
+
+from .mail_queue import cache_is_shared, worker_can_drain
+from .otp_store import CacheOTPStore
+from .sms.backends.http import SMSBackend as HTTPSMSBackend
+
+
+@register()
+def check_sms_gateway(app_configs, **kwargs):
+    """Phone OTPs can't be delivered when the gateway backend has no URL."""
+    if issubclass(import_string(settings.SMS_BACKEND), HTTPSMSBackend) and not settings.SMS_GATEWAY_URL:
+        return [Warning(
+            'SMS_GATEWAY_URL is not set, so phone OTPs will fail to send.',
+            hint='Set SMS_GATEWAY_URL, or for development set SMS_BACKEND to users.sms.backends.console.SMSBackend.',
+            id='users.W001',
+        )]
+    return []
+
+
+@register()
+def check_mail_queue_cache(app_configs, **kwargs):
+    """The Celery worker drains the OTP outbox from the default cache, so it must be shared."""
+    if not worker_can_drain():
+        return [Warning(
+            'CELERY_BROKER_URL is set but the default cache is local to each process, '
+            'so OTP emails are sent from the web process instead of the Celery worker.',
+            hint='Set REDIS_URL so the web processes and the worker share the cache.',
+            id='users.W002',
+        )]
+    return []
+
+
+@register()
+def check_otp_store_cache(app_configs, **kwargs):
+    """An OTP issued by one web process must be found by whichever process verifies it."""
+    if issubclass(import_string(settings.OTP_STORE_BACKEND), CacheOTPStore) and not cache_is_shared():
+        return [Warning(
+            'OTP_STORE_BACKEND is CacheOTPStore but the default cache is local to each process, '
+            'so an OTP is only accepted by the worker that issued it.',
+            hint='Set REDIS_URL, or use users.otp_store.DatabaseOTPStore.',
+            id='users.W003',
+        )]
+    return []
@@ -0,0 +1,118 @@
+"""
+HTTP validators for per-user records that carry an updated_at column.
+
+The ETag is weak and built from the owner's id and updated_at, so it can be
+checked against the row alone, before any serializer work. Both
+If-None-Match and If-Match use weak comparison: the tag names a version of
+the record, not exact response bytes, and that is all optimistic locking
+needs.
+
+The If-Match check before validating only saves work. The write itself is
+conditional too: save_if_unmodified() moves updated_at with
+UPDATE ... WHERE updated_at = <the version in If-Match>, so of two requests
+sent with the same ETag only the first one saves.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+PRECONDITION_FAILED_MESSAGE = 'This record has changed since you loaded it. Reload and try again.'
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def make_etag(instance):
+    # Integer maths: _etag_versions() turns the tag back into the exact updated_at
+    return f'W/"{instance.user_id}-{(instance.updated_at - EPOCH) // timedelta(microseconds=1)}"'
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _etag_matches(header, etag):
+    etags = parse_etags(header)
+    return etags == ['*'] or _strip_weak(etag) in {_strip_weak(tag) for tag in etags}
+
+
+def _etag_versions(header, user_id):
+    """updated_at values named by the ETags in header for user_id's record."""
+    versions = []
+    for tag in parse_etags(header):
+        owner, _, micros = _strip_weak(tag).strip('"').partition('-')
+        if owner == str(user_id) and micros.isdigit():
+            versions.append(EPOCH + timedelta(microseconds=int(micros)))
+    return versions
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = PRECONDITION_FAILED_MESSAGE
+    default_code = 'precondition_failed'
+
+
+class ConditionalRequestMixin:
+    """
+    For views over a single record with user_id and updated_at.
+
+    GET: call not_modified_response() before serializing.
+    PUT/PATCH: call precondition_failed_response() before validating, and
+    save through save_if_unmodified().
+    with_validators() adds ETag and Last-Modified to any response.
+    """
+
+    def with_validators(self, response, instance):
+        if instance.updated_at is not None:
+            response['ETag'] = make_etag(instance)
+            response['Last-Modified'] = http_date(instance.updated_at.timestamp())
+        return response
+
+    def not_modified_response(self, request, instance):
+        """A 304 if the client's copy is current, else None."""
+        if instance.updated_at is None:
+            return None
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # If-None-Match wins over If-Modified-Since when both are sent
+            not_modified = _etag_matches(if_none_match, make_etag(instance))
+        else:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = since is not None and int(instance.updated_at.timestamp()) <= since
+        if not_modified:
+            return self.with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), instance)
+        return None
+
+    def precondition_failed_response(self, request, instance):
+        """A 412 if If-Match names a version other than the current one, else None."""
+        if_match = request.headers.get('If-Match')
+        if not if_match or instance.updated_at is None:
+            return None
+        if _etag_matches(if_match, make_etag(instance)):
+            return None
+        return self.with_validators(Response(
+            {'error': PRECONDITION_FAILED_MESSAGE},
+            status=status.HTTP_412_PRECONDITION_FAILED,
+        ), instance)
+
+    def save_if_unmodified(self, request, instance, save):
+        """
+        Calls save() if the row is still at a version If-Match names, checked
+        and claimed in one UPDATE; raises PreconditionFailed if another write
+        has landed since. Without If-Match (or with *) it just saves.
+        """
+        if_match = request.headers.get('If-Match')
+        if not if_match or parse_etags(if_match) == ['*'] or instance.updated_at is None:
+            return save()
+        with transaction.atomic():
+            claimed = type(instance).objects.filter(
+                pk=instance.pk, updated_at__in=_etag_versions(if_match, instance.user_id),
+            ).update(updated_at=timezone.now())
+            if not claimed:
+                raise PreconditionFailed()
+            return save()
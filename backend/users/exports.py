@@ -0,0 +1,111 @@
+"""
+Streaming applicant export.
+
+One query joins CustomUser to Application, PersonalInfo and EducationInfo
+and is read with .iterator(), so memory stays flat however many applicants
+there are. Rows are encoded and yielded one at a time.
+"""
+import csv
+import datetime
+import json
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.fields.files import FieldFile
+
+from .models import CustomUser, PersonalInfo, EducationInfo
+from .serializers import ApplicantFilterSerializer
+
+EXPORT_CHUNK_SIZE = 2000
+
+USER_COLUMNS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'phone',
+    'is_email_verified', 'is_phone_verified', 'created_at',
+)
+APPLICATION_COLUMNS = ('application_number', 'form_number', 'application_status')
+
+
+def _model_columns(model):
+    skip = {'id', 'user', 'created_at', 'updated_at'}
+    return tuple(f.name for f in model._meta.concrete_fields if f.editable and f.name not in skip)
+
+
+PERSONAL_INFO_COLUMNS = _model_columns(PersonalInfo)
+EDUCATION_INFO_COLUMNS = _model_columns(EducationInfo)
+
+# (related accessor, columns); None is the user itself
+COLUMN_GROUPS = (
+    (None, USER_COLUMNS),
+    ('application', APPLICATION_COLUMNS),
+    ('personalinfo', PERSONAL_INFO_COLUMNS),
+    ('educationinfo', EDUCATION_INFO_COLUMNS),
+)
+HEADER = tuple(column for _, columns in COLUMN_GROUPS for column in columns)
+
+# ApplicantFilterSerializer field -> lookup; each targets an indexed column
+FILTERS = {
+    'application_status': 'application__application_status',
+    'casteCategory': 'personalinfo__casteCategory',
+    'min_percentage': 'educationinfo__intermediate_percentage__gte',
+    'max_percentage': 'educationinfo__intermediate_percentage__lte',
+    'year_of_passing': 'educationinfo__intermediate_year_of_passing',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+}
+
+
+def export_queryset(params):
+    """Applicants matching the query parameters; raises ValidationError on invalid ones."""
+    filters = ApplicantFilterSerializer.validated(params)
+    queryset = (
+        CustomUser.objects
+        .filter(user_type='applicant')
+        .select_related('application', 'personalinfo', 'educationinfo')
+        .order_by('pk')
+    )
+    return queryset.filter(**{FILTERS[name]: value for name, value in filters.items()})
+
+
+def _related(user, accessor):
+    if accessor is None:
+        return user
+    try:
+        return getattr(user, accessor)
+    except ObjectDoesNotExist:
+        return None
+
+
+def _value(value):
+    if isinstance(value, FieldFile):
+        return value.name or None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_rows(queryset):
+    """Yields one tuple per applicant, in HEADER order."""
+    for user in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = []
+        for accessor, columns in COLUMN_GROUPS:
+            obj = _related(user, accessor)
+            row.extend(_value(getattr(obj, column)) if obj is not None else None for column in columns)
+        yield row
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADER)
+    for row in export_rows(queryset):
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def stream_ndjson(queryset):
+    for row in export_rows(queryset):
+        yield json.dumps(dict(zip(HEADER, row))) + '\n'
@@ -0,0 +1,161 @@
+"""
+Post-upload image processing.
+
+After a PersonalInfo/EducationInfo save, process_uploaded_images runs in
+Celery for each image field whose file hasn't been processed yet. It
+validates the file with Pillow, replaces the stored original with a copy
+without EXIF metadata (after applying its orientation), and writes a
+display-size rendition and a thumbnail to the default storage. Their paths
+are recorded in image_renditions. Renditions are named after their source,
+so with content-addressed documents (users.storage) an image uploaded
+before is rendered only once.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .models import PersonalInfo, EducationInfo
+from .storage import ContentAddressedStorage, update_references
+from .payload_cache import PERSONAL_INFO, EDUCATION_INFO, invalidate_payload
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = {
+    PersonalInfo: ('profile_image', 'caste_or_ews_certificate_image'),
+    EducationInfo: ('intermediate_certificate_image', 'lastappearingexam_marksheet_image'),
+}
+
+PAYLOAD_SECTIONS = {
+    PersonalInfo: PERSONAL_INFO,
+    EducationInfo: EDUCATION_INFO,
+}
+
+RENDITIONS = {
+    'display': (1600, 1600),
+    'thumbnail': (320, 320),
+}
+RENDITION_FORMAT, RENDITION_EXTENSION = ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+RENDITION_QUALITY = 80
+RENDITION_DIR = 'renditions'
+
+
+def pending_image_fields(instance):
+    """Image fields holding a file that has no renditions yet."""
+    renditions = instance.image_renditions or {}
+    return [
+        field for field in IMAGE_FIELDS[type(instance)]
+        if getattr(instance, field) and renditions.get(field, {}).get('source') != getattr(instance, field).name
+    ]
+
+
+def _open_verified(file):
+    """Opens an uploaded image, raising if Pillow can't decode it."""
+    with file.open('rb') as f:
+        data = f.read()
+    Image.open(io.BytesIO(data)).verify()  # verify() leaves the image unusable
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def _strip_exif(file, image):
+    """Saves a copy of the original without EXIF. Returns the image and the copy's name."""
+    if not image.getexif():
+        return image, file.name
+    upright = ImageOps.exif_transpose(image)
+    buffer = io.BytesIO()
+    save_kwargs = {'quality': 95} if image.format == 'JPEG' else {}
+    upright.save(buffer, format=image.format, **save_kwargs)
+    return upright, file.storage.save(file.name, ContentFile(buffer.getvalue()))
+
+
+def _save_rendition(source_name, image, kind, size):
+    stem = os.path.splitext(source_name)[0]
+    name = f'{RENDITION_DIR}/{stem}_{kind}.{RENDITION_EXTENSION}'
+    if default_storage.exists(name):
+        return name
+    rendition = image.copy()
+    if rendition.mode not in ('RGB', 'RGBA'):
+        rendition = rendition.convert('RGBA' if 'A' in rendition.getbands() else 'RGB')
+    if RENDITION_FORMAT == 'JPEG' and rendition.mode == 'RGBA':
+        rendition = rendition.convert('RGB')
+    rendition.thumbnail(size)
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=RENDITION_FORMAT, quality=RENDITION_QUALITY)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process_image_field(instance, field):
+    """
+    Validates, strips and renders one image field. Returns its image_renditions
+    entry, whose source is the stripped copy's name when a copy was made.
+    """
+    file = getattr(instance, field)
+    entry = {'source': file.name}
+    try:
+        image = _open_verified(file)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        logger.warning(f"Rejected {file.name} on {instance._meta.label} {instance.pk}: {str(e)}")
+        entry['error'] = 'invalid image'
+        return entry
+
+    image, entry['source'] = _strip_exif(file, image)
+    for kind, size in RENDITIONS.items():
+        entry[kind] = _save_rendition(entry['source'], image, kind, size)
+    return entry
+
+
+def process_uploaded_images(model, pk, fields):
+    """Processes the given image fields of one row and records the renditions."""
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return {}
+    fields = [field for field in fields if field in pending_image_fields(instance)]
+    originals = {field: getattr(instance, field).name for field in fields}
+    entries = {field: process_image_field(instance, field) for field in fields}
+    if not entries:
+        return {}
+
+    storage = model._meta.get_field(fields[0]).storage
+    with transaction.atomic():
+        # Re-read under lock: another task may have recorded other fields meanwhile,
+        # and the applicant may have uploaded a new file since we started.
+        # update() skips signals and auto_now, so this doesn't re-trigger processing.
+        current = model.objects.select_for_update().filter(pk=pk).values(*IMAGE_FIELDS[model], 'user_id', 'image_renditions').first()
+        if current is None:
+            return {}
+        renditions = dict(current.pop('image_renditions') or {})
+        user_id = current.pop('user_id')
+        replaced, discarded = {}, []
+        for field, entry in entries.items():
+            if current[field] != originals[field]:
+                if entry['source'] != originals[field]:
+                    discarded.append(entry['source'])
+                continue
+            renditions[field] = entry
+            if entry['source'] != originals[field]:
+                replaced[field] = entry['source']
+        changes = dict(replaced, image_renditions=renditions)
+        if replaced:
+            # The file names changed, so clients' copies and the cached payload are stale
+            updated_at = changes['updated_at'] = timezone.now()
+            section = PAYLOAD_SECTIONS[model]
+            transaction.on_commit(lambda: invalidate_payload(section, user_id, updated_at))
+        model.objects.filter(pk=pk).update(**changes)
+
+        before = {name for name in current.values() if name}
+        after = {name for name in {**current, **replaced}.values() if name}
+        update_references(before, after)
+        if not isinstance(storage, ContentAddressedStorage):
+            # Content-addressed files are deleted by update_references once unreferenced
+            discarded.extend(before - after)
+        for name in discarded:
+            if name not in after:
+                transaction.on_commit(lambda name=name: storage.delete(name))
+    return entries
@@ -0,0 +1,136 @@
+"""
+Structured logging off the request thread.
+
+BackgroundHandler is a QueueHandler: emitting a record on a request thread
+only renders its message and puts it on a queue. A QueueListener thread
+formats it as one JSON line and writes it out, so slow or contended stdout
+never holds up a worker.
+
+Every record carries the request_id of the request it was logged under (set
+by RequestLogMiddleware). JSONFormatter masks OTPs, passwords and tokens,
+both in extra fields and in "otp: 123456"-style text in the message.
+Records logged with extra={'sample_rate': r} are kept with probability r.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+request_id = ContextVar('request_id', default=None)
+
+REDACTED = '[redacted]'
+SENSITIVE_KEYS = {'otp', 'password', 'password2', 'new_password', 'refresh', 'access', 'token', 'authorization'}
+SENSITIVE_TEXT = re.compile(
+    r'(?i)\b(otp|password|password2|new_password|refresh|access|token)\b(["\']?\s*[:=]\s*["\']?)([^\s,;"\'}]+)'
+)
+
+# LogRecord attributes; anything else on a record came from extra={...}
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in SENSITIVE_KEYS else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return SENSITIVE_TEXT.sub(lambda match: f'{match[1]}{match[2]}{REDACTED}', value)
+    return value
+
+
+class RequestIDFilter(logging.Filter):
+    """Stamps records with the current request's ID, on the thread that logged them."""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        return rate is None or random.random() < rate
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and key != 'sample_rate':
+                entry[key] = REDACTED if key.lower() in SENSITIVE_KEYS else redact(value)
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = redact(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Queues records for a listener thread that writes them as JSON lines to
+    stream (stdout by default). Full queues drop records rather than block.
+    A forked child (Celery and gunicorn workers) gets its own listener, as
+    threads don't survive fork().
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(None)
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.target.setFormatter(JSONFormatter())
+        self.addFilter(RequestIDFilter())
+        self.addFilter(SamplingFilter())
+        self.maxsize = maxsize
+        # Sets self.queue
+        self.start()
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self.start)
+
+    def start(self):
+        self.queue = queue.Queue(maxsize=self.maxsize)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Writes out everything queued so far and stops the listener."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record):
+        # Render the message while its args are still safe to read; the JSON
+        # formatting happens on the listener thread
+        return _copy_for_queue(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def _copy_for_queue(record):
+    """A copy of record that can cross threads: message rendered, exc_info as text."""
+    copy = logging.makeLogRecord(vars(record))
+    copy.msg = record.getMessage()
+    copy.args = None
+    if record.exc_info:
+        copy.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+        copy.exc_info = None
+    return copy
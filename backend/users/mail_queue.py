@@ -0,0 +1,211 @@
+"""
+Cache-backed outbox for OTP emails.
+
+Views push messages with enqueue_email() and return straight away. The
+send_queued_otp_emails task drains the outbox in batches of
+OTP_EMAIL_BATCH_SIZE over a single SMTP connection. The outbox lives in
+the default cache, so a Celery worker can only drain it when that cache is
+shared between processes; otherwise the drain runs in the enqueuing process.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+QUEUE_HEAD_KEY = 'otp_mail:head'  # last sequence number sent
+QUEUE_TAIL_KEY = 'otp_mail:tail'  # last sequence number enqueued
+QUEUE_ITEM_KEY = 'otp_mail:item:{seq}'
+QUEUE_LOCK_KEY = 'otp_mail:lock'
+QUEUE_STATS_KEY = 'otp_mail:stats:{name}'
+QUEUE_STALL_KEY = 'otp_mail:stall'  # tail when the drain first found a gap after head, and since when
+
+QUEUE_ITEM_TIMEOUT = 600  # An OTP is useless after 10 minutes, so is its email
+QUEUE_LOCK_TIMEOUT = 60
+# How long a missing item may be an enqueue that has claimed its number but
+# not written the item yet; after that it is taken as expired and skipped
+QUEUE_CLAIM_GRACE = 5
+
+# Counters, kept as integers so cache.incr works on every backend
+STAT_COUNTERS = ('sent', 'failed_batches', 'latency_total_ms')
+
+
+def cache_is_shared(alias='default'):
+    """Whether other processes (workers, Celery) see what this one stores in the cache."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def worker_can_drain():
+    """Whether send_queued_otp_emails can run on a Celery worker rather than inline."""
+    return settings.CELERY_TASK_ALWAYS_EAGER or cache_is_shared()
+
+
+def _item_key(seq):
+    return QUEUE_ITEM_KEY.format(seq=seq)
+
+
+def enqueue_email(subject, message, recipient):
+    """Adds an email to the outbox and returns its sequence number."""
+    cache.add(QUEUE_TAIL_KEY, 0, timeout=None)
+    seq = cache.incr(QUEUE_TAIL_KEY)
+    cache.set(_item_key(seq), {
+        'subject': subject,
+        'message': message,
+        'recipient': recipient,
+        'enqueued_at': time.time(),
+    }, timeout=QUEUE_ITEM_TIMEOUT)
+    return seq
+
+
+def queue_depth():
+    """Number of emails enqueued but not yet sent."""
+    head = cache.get(QUEUE_HEAD_KEY, 0)
+    tail = cache.get(QUEUE_TAIL_KEY, 0)
+    return max(tail - head, 0)
+
+
+def _stats_key(name):
+    return QUEUE_STATS_KEY.format(name=name)
+
+
+def queue_stats():
+    """Queue depth plus delivery counters and latencies since the cache was last cleared."""
+    values = cache.get_many([_stats_key(name) for name in (*STAT_COUNTERS, 'latency_max')])
+    stats = {name: values.get(_stats_key(name), 0) for name in STAT_COUNTERS}
+    stats['latency_total'] = stats.pop('latency_total_ms') / 1000
+    stats['latency_max'] = values.get(_stats_key('latency_max'), 0.0)
+    stats['depth'] = queue_depth()
+    stats['latency_avg'] = stats['latency_total'] / stats['sent'] if stats['sent'] else 0.0
+    return stats
+
+
+def _incr_stat(name, delta):
+    key = _stats_key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Evicted between add and incr
+        cache.add(key, delta, timeout=None)
+
+
+def _record_batch(latencies=None, failed=False):
+    if failed:
+        _incr_stat('failed_batches', 1)
+        return
+    _incr_stat('sent', len(latencies))
+    _incr_stat('latency_total_ms', round(sum(latencies) * 1000))
+    # Only the drain holding QUEUE_LOCK_KEY records, so this read-then-write is not contended
+    latency_max = max([cache.get(_stats_key('latency_max'), 0.0), *latencies])
+    cache.set(_stats_key('latency_max'), latency_max, timeout=None)
+
+
+def _skip_missing(head, tail, first_present):
+    """
+    Called when the item after head is not in the cache. A missing item may
+    be an enqueue that has claimed its number but not written the item yet,
+    so the tail is noted the first time a gap is seen; once QUEUE_CLAIM_GRACE
+    seconds have passed, missing items up to that tail have expired, e.g.
+    while SMTP was down, and head moves up to first_present - 1 so they
+    don't stop the queue for good. Returns whether head moved.
+    """
+    stall = cache.get(QUEUE_STALL_KEY)
+    if stall is None or head + 1 > stall['tail']:
+        cache.set(QUEUE_STALL_KEY, {'tail': tail, 'since': time.time()}, timeout=QUEUE_ITEM_TIMEOUT)
+        return False
+    if time.time() - stall['since'] < QUEUE_CLAIM_GRACE:
+        return False
+    new_head = min(first_present - 1, stall['tail'])
+    logger.warning(f"Skipping OTP emails {head + 1}-{new_head}: expired before they were sent")
+    cache.set(QUEUE_HEAD_KEY, new_head, timeout=None)
+    return True
+
+
+def _drain_locked(batch_size):
+    """Sends batches until the outbox is empty. Caller must hold QUEUE_LOCK_KEY."""
+    sent = 0
+    connection = None
+    try:
+        while True:
+            head = cache.get(QUEUE_HEAD_KEY, 0)
+            tail = cache.get(QUEUE_TAIL_KEY, 0)
+            if head > tail:
+                # The tail counter was evicted and restarted; follow it
+                head = 0
+                cache.set(QUEUE_HEAD_KEY, head, timeout=None)
+                cache.delete(QUEUE_STALL_KEY)
+            if head == tail:
+                break
+
+            last = min(tail, head + batch_size)
+            seqs = range(head + 1, last + 1)
+            items = cache.get_many([_item_key(seq) for seq in seqs])
+            # Only the unbroken run after head: a gap may be an item that is
+            # still being written, and head must not pass it
+            present = []
+            for seq in seqs:
+                if _item_key(seq) not in items:
+                    break
+                present.append(seq)
+            if not present:
+                first_present = next((seq for seq in seqs if _item_key(seq) in items), last + 1)
+                if _skip_missing(head, tail, first_present):
+                    continue
+                break
+
+            messages = [
+                EmailMessage(
+                    items[_item_key(seq)]['subject'],
+                    items[_item_key(seq)]['message'],
+                    settings.EMAIL_HOST_USER,
+                    [items[_item_key(seq)]['recipient']],
+                )
+                for seq in present
+            ]
+            if connection is None:
+                connection = get_connection()
+                connection.open()
+            try:
+                connection.send_messages(messages)
+            except Exception as e:
+                logger.error(f"Error sending batch of {len(messages)} OTP emails: {str(e)}")
+                _record_batch(failed=True)
+                break
+
+            now = time.time()
+            _record_batch([now - items[_item_key(seq)]['enqueued_at'] for seq in present])
+            cache.set(QUEUE_HEAD_KEY, present[-1], timeout=None)
+            cache.delete_many([_item_key(seq) for seq in present])
+            sent += len(messages)
+    finally:
+        if connection is not None:
+            connection.close()
+    return sent
+
+
+def drain_queue(batch_size=None):
+    """Sends every queued email. Returns the number sent by this call."""
+    batch_size = batch_size or settings.OTP_EMAIL_BATCH_SIZE
+    sent = 0
+    while cache.add(QUEUE_LOCK_KEY, 1, timeout=QUEUE_LOCK_TIMEOUT):
+        try:
+            batch_sent = _drain_locked(batch_size)
+        finally:
+            cache.delete(QUEUE_LOCK_KEY)
+        sent += batch_sent
+        # Something may have been enqueued while we held the lock; its own
+        # drain call would have found the lock taken, so look again.
+        if not batch_sent or not queue_depth():
+            break
+    if sent:
+        stats = queue_stats()
+        logger.info(
+            f"Sent {sent} OTP emails (queue depth {stats['depth']}, "
+            f"avg latency {stats['latency_avg']:.2f}s, max latency {stats['latency_max']:.2f}s)"
+        )
+    return sent
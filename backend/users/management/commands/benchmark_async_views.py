@@ -0,0 +1,95 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from users.benchmark import benchmark_environment, summarize
+from users.models import CustomUser
+from users.otp_store import get_otp_store, EMAIL
+
+PASSWORD = 'Bench-pass-123'
+
+# name -> (method, path, payload for user i given the OTPs issued to each user)
+SCENARIOS = {
+    'login': ('post', 'login/', lambda i, otps: {'username': f'bench{i}', 'password': PASSWORD}),
+    'request-otp': ('post', 'verify-email/', lambda i, otps: {'email': f'bench{i}@example.com'}),
+    'verify-otp': ('put', 'verify-email/', lambda i, otps: {'email': f'bench{i}@example.com', 'otp': otps[i]}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the WSGI auth/OTP views against their async variants under /users/async/, '
+        'in-process on a throwaway database, with the same concurrency for both.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and path.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                            help='Run only this scenario (repeatable). Default: all.')
+
+    def handle(self, *args, **options):
+        count, concurrency = options['requests'], options['concurrency']
+        with benchmark_environment():
+            encoded = make_password(PASSWORD)
+            CustomUser.objects.bulk_create(
+                CustomUser(
+                    username=f'bench{i}', email=f'bench{i}@example.com', phone=8000000000 + i,
+                    password=encoded, user_type='applicant', is_email_verified=True, is_phone_verified=True,
+                )
+                for i in range(count)
+            )
+            self.stdout.write(f'{"scenario":<12} {"path":<6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+            for name in options['scenario'] or SCENARIOS:
+                method, path, payload = SCENARIOS[name]
+                for label, run in (('wsgi', self.run_sync), ('asgi', self.run_async)):
+                    otps = self.issue_otps(count)
+                    result = run(method, f'/users/{"async/" if label == "asgi" else ""}{path}',
+                                 lambda i: payload(i, otps), count, concurrency)
+                    self.stdout.write(
+                        f'{name:<12} {label:<6} {result["rps"]:>8} {result["p50_ms"]:>8} '
+                        f'{result["p95_ms"]:>8} {result["p99_ms"]:>8} {result["errors"]:>7}'
+                    )
+
+    def issue_otps(self, count):
+        store = get_otp_store()
+        users = CustomUser.objects.filter(username__startswith='bench').order_by('phone')
+        return [store.issue(user, EMAIL, user.email) for user in users[:count]]
+
+    def run_sync(self, method, path, payload, count, concurrency):
+        def request(i):
+            client = Client(raise_request_exception=False)
+            started = time.perf_counter()
+            response = getattr(client, method)(path, payload(i), content_type='application/json')
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(request, range(count)))
+        return self.summarize(results, time.perf_counter() - started)
+
+    def run_async(self, method, path, payload, count, concurrency):
+        async def main():
+            client = AsyncClient(raise_request_exception=False)
+            gate = asyncio.Semaphore(concurrency)
+
+            async def request(i):
+                async with gate:
+                    started = time.perf_counter()
+                    response = await getattr(client, method)(path, payload(i), content_type='application/json')
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(request(i) for i in range(count)))
+
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        return self.summarize(results, time.perf_counter() - started)
+
+    def summarize(self, results, elapsed):
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, status in results if status >= 400)
+        return summarize(latencies, elapsed, errors)
@@ -0,0 +1,120 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users import authentication
+from users.authentication import CachedJWTAuthentication
+from users.benchmark import benchmark_environment, summarize
+from users.management.commands.benchmark_flow import education_info, personal_info
+from users.models import CustomUser, EducationInfo, PersonalInfo
+
+# name -> authenticated GET endpoint
+SCENARIOS = {
+    # Served from the payload cache after the first request per user, so
+    # authentication is most of what's left
+    'personal-info': 'personal-info/',
+    'profile': 'profile/',
+}
+
+AUTHENTICATION = {
+    'plain': JWTAuthentication,
+    'cached': CachedJWTAuthentication,
+}
+
+
+@contextmanager
+def authenticate_with(authentication_class):
+    """Every view that doesn't pick its own uses authentication_class."""
+    default = APIView.authentication_classes
+    APIView.authentication_classes = [authentication_class]
+    try:
+        yield
+    finally:
+        APIView.authentication_classes = default
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks CachedJWTAuthentication against plain JWTAuthentication on authenticated '
+        'endpoints, in-process on a throwaway database, with the same requests for both. '
+        'Reports latency, throughput and database queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Applicants whose tokens are used in turn.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per scenario and authentication class.')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                            help='Run only this scenario (repeatable). Default: all.')
+
+    def handle(self, *args, **options):
+        with benchmark_environment():
+            tokens = self.create_applicants(options['users'])
+            self.stdout.write(
+                f'{"scenario":<14} {"auth":<7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+                f'{"errors":>7} {"queries":>8} {"hits":>6}'
+            )
+            for name in options['scenario'] or SCENARIOS:
+                for label, authentication_class in AUTHENTICATION.items():
+                    # Both start cold: no cached users or payloads
+                    cache.clear()
+                    authentication.stats.clear()
+                    with authenticate_with(authentication_class):
+                        result = self.run(
+                            f'/users/{SCENARIOS[name]}', tokens, options['requests'], options['concurrency'],
+                        )
+                    hits = authentication.stats['hits'] if label == 'cached' else '-'
+                    self.stdout.write(
+                        f'{name:<14} {label:<7} {result["rps"]:>8} {result["p50_ms"]:>8} {result["p95_ms"]:>8} '
+                        f'{result["p99_ms"]:>8} {result["errors"]:>7} {result["queries"]:>8} {hits:>6}'
+                    )
+
+    def create_applicants(self, count):
+        """Applicants with both sections filled in; returns an access token for each."""
+        users = CustomUser.objects.bulk_create(
+            CustomUser(
+                username=f'bench{i}', email=f'bench{i}@example.com', phone=8000000000 + i,
+                user_type='applicant', is_email_verified=True, is_phone_verified=True,
+            )
+            for i in range(count)
+        )
+        # bulk_create skips the signals that would process the placeholder scans
+        PersonalInfo.objects.bulk_create(PersonalInfo(user=user, **personal_info(i)) for i, user in enumerate(users))
+        EducationInfo.objects.bulk_create(
+            EducationInfo(
+                user=user, intermediate_certificate_image='intermediate.png',
+                lastappearingexam_marksheet_image='marksheet.png', **education_info(i),
+            )
+            for i, user in enumerate(users)
+        )
+        return [str(AccessToken.for_user(user)) for user in users]
+
+    def run(self, path, tokens, count, concurrency):
+        def request(i):
+            client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {tokens[i % len(tokens)]}')
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(path)
+                latency = time.perf_counter() - started
+            return latency, response.status_code, len(queries)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(request, range(count)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _, _ in results]
+        errors = sum(1 for _, status, _ in results if status >= 400)
+        return {
+            **summarize(latencies, elapsed, errors),
+            'queries': round(sum(queries for _, _, queries in results) / len(results), 2),
+        }
@@ -0,0 +1,228 @@
+import http.client
+import io
+import json
+import platform
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+
+from users.benchmark import benchmark_environment, compare, live_server, summarize
+from users.models import CustomUser, EducationInfo, PersonalInfo
+
+PASSWORD = 'Bench-pass-123'
+OTP_PATTERN = re.compile(r'Your OTP is (\d+)')
+OTP_WAIT = 10
+
+# In the order one applicant goes through them
+STEPS = ('register', 'request-otp', 'verify-otp', 'login', 'personal-info', 'education-info', 'refresh', 'logout')
+
+
+class FlowError(Exception):
+    pass
+
+
+def personal_info(i):
+    return {
+        'dob': '2005-01-01', 'gender': 'female', 'nationality': 'Indian', 'religion': 'Hindu',
+        'aadhar_card': 100000000 + i, 'father_name': 'Father', 'father_qualification': 'Graduate',
+        'father_occupation': 'Teacher', 'father_contact': 200000000 + i, 'mother_name': 'Mother',
+        'mother_qualification': 'Graduate', 'mother_occupation': 'Doctor', 'mother_contact': 300000000 + i,
+        'guardian_name': 'Guardian', 'guardian_relation': 'Uncle', 'guardian_occupation': 'Clerk',
+        'guardian_contact': 400000000 + i, 'permanentAddress_Country': 'India',
+        'permanentAddress_State': 'Bihar', 'permanentAddress_City': 'Patna', 'permanentAddress_PinCode': 800001,
+        'permanentAddress_Address': 'Boring Road', 'is_same_as_permanentAddress': True,
+        'currentAddress_Country': 'India', 'currentAddress_State': 'Bihar', 'currentAddress_City': 'Patna',
+        'currentAddress_PinCode': 800001, 'currentAddress_Address': 'Boring Road', 'blood_group': 'A+',
+        'casteCategory': 'GEN', 'caste': 'General', 'caste_or_ews_certificate_issued_by': 'SDO Patna',
+        'caste_or_ews_certificate_number': 500000000 + i,
+    }
+
+
+def education_info(i):
+    return {
+        'intermediate_school_name': 'School', 'intermediate_school_board': 'CBSE', 'intermdiate_grade': 'A',
+        'intermediaate_roll_number': 600000000 + i, 'intermediate_obtained_marks': 400,
+        'intermediate_total_marks': 500, 'intermediate_percentage': 80.0, 'intermediate_year_of_passing': 2024,
+        'lastappearingexam_institution_name': 'School', 'lastappearingexam_place': 'Patna',
+        'lastappearingexam_board': 'CBSE', 'lastappearingexam_year_of_passing': 2024,
+    }
+
+
+def scan(i, name):
+    """A small PNG, different for every applicant so stored documents don't deduplicate."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), (i % 256, i // 256 % 256, len(name))).save(buffer, 'PNG')
+    return SimpleUploadedFile(f'{name}.png', buffer.getvalue(), 'image/png')
+
+
+class Client:
+    """One keep-alive connection; records the latency and status of each step."""
+
+    def __init__(self, address, results):
+        self.connection = http.client.HTTPConnection(*address, timeout=60)
+        self.results = results
+
+    def request(self, step, method, path, data, expected, access=None):
+        headers = {'Content-Type': 'application/json'}
+        if isinstance(data, bytes):
+            body, headers['Content-Type'] = data, MULTIPART_CONTENT
+        else:
+            body = json.dumps(data)
+        if access:
+            headers['Authorization'] = f'Bearer {access}'
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, f'/users/{path}', body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.connection.close()
+            self.results[step].append((started, time.perf_counter(), None))
+            raise FlowError(f'{step}: {e}')
+        self.results[step].append((started, time.perf_counter(), response.status))
+        if response.status != expected:
+            raise FlowError(f'{step}: HTTP {response.status} {content[:200]!r}')
+        return json.loads(content) if content else {}
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the applicant flow (register, email OTP, login, personal and education info, '
+        'token refresh, logout) against a local server with concurrent clients, on a throwaway '
+        'database with in-memory caches and email. Reports latency percentiles and throughput '
+        'per step, and can compare them with a baseline written by --output.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Applicants to take through the flow.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Applicants in the flow at once.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Fail if the results regress against this JSON file, '
+                                               'e.g. benchmarks/baseline.json.')
+        parser.add_argument('--max-latency-increase', type=float, default=50,
+                            help='Allowed median latency increase over the baseline, in percent.')
+        parser.add_argument('--max-throughput-decrease', type=float, default=30,
+                            help='Allowed req/s decrease from the baseline, in percent.')
+
+    def handle(self, *args, **options):
+        results = defaultdict(list)
+        failures = []
+        with benchmark_environment(), live_server() as address:
+            local = threading.local()
+
+            def run(i):
+                if not hasattr(local, 'client'):
+                    local.client = Client(address, results)
+                try:
+                    self.flow(local.client, i)
+                except FlowError as e:
+                    failures.append(str(e))
+                finally:
+                    connection.close()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                list(pool.map(run, range(options['users'])))
+            elapsed = time.perf_counter() - started
+
+        report = {
+            'environment': {
+                'users': options['users'],
+                'concurrency': options['concurrency'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            # register and login use the production password hashers, one
+            # PBKDF2 run each, which the server's threads take turns at under
+            # the GIL. Every step spans most of the run, as applicants go
+            # through the flow staggered, so per-step req/s is about
+            # users / run time.
+            'steps': {step: self.summarize(results[step]) for step in STEPS},
+            'total': self.summarize([sample for step in STEPS for sample in results[step]], elapsed),
+        }
+
+        self.stdout.write(f'{"step":<15} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+        for step, result in [*report['steps'].items(), ('total', report['total'])]:
+            result = {key: '-' if value is None else value for key, value in result.items()}
+            self.stdout.write(
+                f'{step:<15} {result["rps"]:>8} {result["p50_ms"]:>8} {result["p95_ms"]:>8} '
+                f'{result["p99_ms"]:>8} {result["errors"]:>7}'
+            )
+        for failure in failures[:10]:
+            self.stderr.write(failure)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare(
+                {**report['steps'], 'total': report['total']},
+                {**baseline['steps'], 'total': baseline['total']},
+                options['max_latency_increase'],
+                options['max_throughput_decrease'],
+            )
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def flow(self, client, i):
+        email = f'flow{i}@example.com'
+        user = client.request('register', 'POST', 'register/', {
+            'username': f'flow{i}', 'first_name': 'Flow', 'last_name': 'Applicant', 'password': PASSWORD,
+            'password2': PASSWORD, 'email': email, 'phone': 7000000000 + i, 'user_type': 'applicant',
+        }, expected=201)['user']
+        client.request('request-otp', 'POST', 'verify-email/', {'email': email}, expected=200)
+        client.request('verify-otp', 'PUT', 'verify-email/', {'email': email, 'otp': self.otp(email)}, expected=200)
+
+        # Not part of the flow: the phone was verified, and both sections
+        # saved once, earlier on (the views can't create them by PUT).
+        # bulk_create skips the signals that would process the placeholder scans.
+        CustomUser.objects.filter(pk=user['id']).update(is_phone_verified=True)
+        PersonalInfo.objects.bulk_create([PersonalInfo(user_id=user['id'], **personal_info(i))])
+        EducationInfo.objects.bulk_create([EducationInfo(
+            user_id=user['id'], intermediate_certificate_image='intermediate.png',
+            lastappearingexam_marksheet_image='marksheet.png', **education_info(i),
+        )])
+
+        tokens = client.request('login', 'POST', 'login/', {'username': f'flow{i}', 'password': PASSWORD}, expected=200)
+        client.request('personal-info', 'PUT', 'personal-info/', {'user': user['id'], **personal_info(i)}, expected=200, access=tokens['access'])
+        client.request('education-info', 'PUT', 'education-info/', encode_multipart(BOUNDARY, {
+            'user': user['id'],
+            **education_info(i),
+            'intermediate_certificate_image': scan(i, 'intermediate'),
+            'lastappearingexam_marksheet_image': scan(i, 'marksheet'),
+        }), expected=200, access=tokens['access'])
+        access = client.request('refresh', 'POST', 'token/refresh/', {'refresh': tokens['refresh']}, expected=200)['access']
+        client.request('logout', 'POST', 'logout/', {'refresh': tokens['refresh']}, expected=200, access=access)
+
+    def otp(self, email):
+        """The OTP in the latest email to email, once the mail queue has sent it."""
+        deadline = time.monotonic() + OTP_WAIT
+        while time.monotonic() < deadline:
+            for message in reversed(mail.outbox):
+                if email in message.to:
+                    return OTP_PATTERN.search(message.body).group(1)
+            time.sleep(0.01)
+        raise FlowError(f'request-otp: no OTP email to {email}')
+
+    def summarize(self, samples, elapsed=None):
+        if elapsed is None:
+            # Throughput over the time this step was in progress
+            elapsed = max((end for _, end, _ in samples), default=0) - min((start for start, _, _ in samples), default=0)
+        errors = sum(1 for _, _, status in samples if status is None or status >= 400)
+        return summarize([end - start for start, end, _ in samples], elapsed, errors)
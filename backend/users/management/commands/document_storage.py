@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q, Sum
+
+from users.models import StoredBlob
+from users.storage import recount_references, sweep_unreferenced
+
+
+def _size(num_bytes):
+    return f'{num_bytes:,} bytes'
+
+
+class Command(BaseCommand):
+    help = 'Reports how much disk content-addressed document storage saves, and optionally tidies it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute reference counts from the image fields (after bulk writes that skip signals).')
+        parser.add_argument('--sweep', action='store_true',
+                            help='Delete stored files that no row references.')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f'Corrected {recount_references()} reference counts')
+        if options['sweep']:
+            self.stdout.write(f'Deleted {sweep_unreferenced()} unreferenced files')
+
+        totals = StoredBlob.objects.aggregate(
+            files=Count('pk'),
+            stored=Sum('size'),
+            stored_referenced=Sum('size', filter=Q(refcount__gt=0)),
+            referenced=Sum(F('size') * F('refcount'), filter=Q(refcount__gt=0)),
+            references=Sum('refcount', filter=Q(refcount__gt=0)),
+            shared=Count('pk', filter=Q(refcount__gt=1)),
+            unreferenced=Count('pk', filter=Q(refcount__lte=0)),
+        )
+        stored, referenced = totals['stored'] or 0, totals['referenced'] or 0
+        saved = referenced - (totals['stored_referenced'] or 0)
+        self.stdout.write(f"Files stored:        {totals['files']} ({_size(stored)})")
+        self.stdout.write(f"References:          {totals['references'] or 0} ({_size(referenced)} without deduplication)")
+        self.stdout.write(f"Shared files:        {totals['shared']}")
+        self.stdout.write(f"Unreferenced files:  {totals['unreferenced']}")
+        self.stdout.write(self.style.SUCCESS(f'Disk saved: {_size(saved)}'))
+
@@ -0,0 +1,262 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, models, transaction
+
+from users.merit import rebuild_merit_list
+from users.models import CustomUser, PersonalInfo, EducationInfo
+from users.stats import rebuild_admission_stats
+from users.storage import recount_references
+
+# user_type is always 'applicant'
+USER_FIELDS = ('username', 'first_name', 'last_name', 'email', 'phone')
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured
+    django.setup()
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def _importable_fields(model):
+    """Concrete, non-file columns an import row may set."""
+    return {
+        f.name for f in model._meta.concrete_fields
+        if f.editable and not f.primary_key and not f.is_relation and not isinstance(f, models.FileField)
+        and not getattr(f, 'auto_now', False) and not getattr(f, 'auto_now_add', False)
+    }
+
+
+def _unique_fields(model):
+    return [
+        f.name for f in model._meta.concrete_fields
+        if f.unique and not f.primary_key and not f.is_relation
+    ]
+
+
+def _file_fields(model):
+    return [f.name for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+
+
+class ImportRow:
+    def __init__(self, number, user, password, personal_info=None, education_info=None):
+        self.number = number
+        self.user = user
+        self.password = password
+        self.personal_info = personal_info
+        self.education_info = education_info
+
+    def instances(self):
+        return [obj for obj in (self.user, self.personal_info, self.education_info) if obj is not None]
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-imports applicants (CustomUser plus optional PersonalInfo and EducationInfo) '
+        'from a CSV or JSONL file. Columns are model field names plus "password".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows per transaction and bulk_create call')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes used to hash passwords')
+        parser.add_argument('--checkpoint',
+                            help='File recording the last committed row; the import resumes after it')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        checkpoint = options['checkpoint']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        self.user_fields = _importable_fields(CustomUser) & set(USER_FIELDS)
+        self.personal_fields = _importable_fields(PersonalInfo)
+        self.education_fields = _importable_fields(EducationInfo)
+
+        start = self.read_checkpoint(checkpoint)
+        if start:
+            self.stdout.write(f'Resuming after row {start}')
+
+        created = conflicts = processed = 0
+        started_at = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as f, \
+                ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            rows = enumerate(self.read_rows(f, fmt), start=1)
+            rows = islice(rows, start, None)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                batch_created, batch_conflicts = self.import_batch(batch, pool)
+                created += batch_created
+                conflicts += batch_conflicts
+                processed += len(batch)
+                self.write_checkpoint(checkpoint, batch[-1][0])
+
+                elapsed = time.monotonic() - started_at
+                self.stdout.write(
+                    f'Row {batch[-1][0]}: {created} created, {conflicts} skipped, '
+                    f'{processed / elapsed:.0f} rows/sec'
+                )
+
+        if created:
+            self.rebuild_derived_data()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} applicants, skipped {conflicts} rows '
+            f'in {time.monotonic() - started_at:.1f}s'
+        ))
+
+    def rebuild_derived_data(self):
+        """bulk_create skips the signals that keep counters, ranks and file references current."""
+        self.stdout.write(f'Rebuilt {rebuild_admission_stats()} admission counters')
+        self.stdout.write(f'Ranked {rebuild_merit_list()} applicants')
+        self.stdout.write(f'Corrected {recount_references()} document reference counts')
+
+    def read_rows(self, f, fmt):
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                # Empty cells mean "not provided" so model defaults apply
+                yield {key: value for key, value in row.items() if key and value != ''}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def read_checkpoint(self, checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return int(f.read().strip() or 0)
+
+    def write_checkpoint(self, checkpoint, row_number):
+        if not checkpoint:
+            return
+        tmp = f'{checkpoint}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(row_number))
+        os.replace(tmp, checkpoint)
+
+    def report(self, number, message):
+        self.stderr.write(f'Row {number}: {message}')
+
+    def build_row(self, number, data):
+        """Builds and validates the row's instances without touching the database."""
+        user = CustomUser(
+            user_type='applicant',
+            **{key: value for key, value in data.items() if key in self.user_fields},
+        )
+        row = ImportRow(number, user, data.get('password'))
+        if any(key in data for key in self.personal_fields):
+            row.personal_info = PersonalInfo(
+                **{key: value for key, value in data.items() if key in self.personal_fields}
+            )
+        if any(key in data for key in self.education_fields):
+            row.education_info = EducationInfo(
+                **{key: value for key, value in data.items() if key in self.education_fields}
+            )
+
+        if not row.password:
+            self.report(number, 'password is required')
+            return None
+        try:
+            if row.personal_info is not None:
+                # Copy the permanent address before validating the current one
+                row.personal_info.is_same_as_permanentAddress = models.BooleanField().to_python(
+                    row.personal_info.is_same_as_permanentAddress
+                )
+                row.personal_info.sync_current_address()
+            user.clean_fields(exclude=['password'])
+            if row.personal_info is not None:
+                row.personal_info.clean_fields(exclude=['user', *_file_fields(PersonalInfo)])
+            if row.education_info is not None:
+                exclude = ['user', *_file_fields(EducationInfo)]
+                if row.education_info.intermediate_percentage is None:
+                    exclude.append('intermediate_percentage')  # Calculated below
+                row.education_info.clean_fields(exclude=exclude)
+        except ValidationError as e:
+            self.report(number, '; '.join(f'{field}: {" ".join(errors)}' for field, errors in e.message_dict.items()))
+            return None
+
+        if row.education_info is not None and not row.education_info.intermediate_percentage:
+            row.education_info.calculate_percentage()
+        return row
+
+    def drop_conflicts(self, rows):
+        """Drops rows whose unique values exist in the database or earlier in the batch."""
+        conflicting = set()
+        for attr, model in (('user', CustomUser), ('personal_info', PersonalInfo),
+                            ('education_info', EducationInfo)):
+            for field in _unique_fields(model):
+                values = {getattr(getattr(row, attr), field) for row in rows if getattr(row, attr) is not None}
+                existing = set(
+                    model.objects.filter(**{f'{field}__in': values}).values_list(field, flat=True)
+                ) if values else set()
+                seen = set()
+                for row in rows:
+                    obj = getattr(row, attr)
+                    if obj is None:
+                        continue
+                    value = getattr(obj, field)
+                    if value is None:
+                        continue
+                    if value in existing:
+                        self.report(row.number, f'{field} {value!r} already exists')
+                        conflicting.add(row.number)
+                    elif value in seen:
+                        self.report(row.number, f'{field} {value!r} duplicates an earlier row')
+                        conflicting.add(row.number)
+                    seen.add(value)
+        return [row for row in rows if row.number not in conflicting]
+
+    def import_batch(self, batch, pool):
+        rows = [row for row in (self.build_row(number, data) for number, data in batch) if row]
+        rows = self.drop_conflicts(rows)
+
+        hashes = pool.map(_hash_password, [row.password for row in rows], chunksize=16)
+        for row, password_hash in zip(rows, hashes):
+            row.user.password = password_hash
+
+        try:
+            with transaction.atomic():
+                self.bulk_write(rows)
+        except IntegrityError:
+            # Lost a race with another writer; find the offending rows one by one
+            created = 0
+            for row in rows:
+                for obj in row.instances():
+                    obj.pk = None
+                try:
+                    with transaction.atomic():
+                        self.bulk_write([row])
+                    created += 1
+                except IntegrityError as e:
+                    self.report(row.number, str(e))
+            return created, len(batch) - created
+        return len(rows), len(batch) - len(rows)
+
+    def bulk_write(self, rows):
+        CustomUser.objects.bulk_create([row.user for row in rows])
+        for row in rows:
+            for obj in (row.personal_info, row.education_info):
+                if obj is not None:
+                    obj.user = row.user
+        PersonalInfo.objects.bulk_create([row.personal_info for row in rows if row.personal_info is not None])
+        EducationInfo.objects.bulk_create([row.education_info for row in rows if row.education_info is not None])
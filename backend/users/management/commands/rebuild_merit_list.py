@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.merit import rebuild_merit_list
+
+
+class Command(BaseCommand):
+    help = 'Recomputes overall and category-wise merit ranks for every applicant.'
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        ranked = rebuild_merit_list()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ranked {ranked} applicants in {time.monotonic() - started_at:.1f}s'
+        ))
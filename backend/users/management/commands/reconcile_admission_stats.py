@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from users.stats import rebuild_admission_stats, get_admission_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the admission statistics counters from the Application, PersonalInfo and EducationInfo tables.'
+
+    def handle(self, *args, **options):
+        before = get_admission_stats()
+        rebuilt = rebuild_admission_stats()
+        after = get_admission_stats()
+
+        for dimension in sorted(before.keys() | after.keys()):
+            old, new = before.get(dimension, {}), after.get(dimension, {})
+            for value in sorted(old.keys() | new.keys()):
+                if old.get(value, 0) != new.get(value, 0):
+                    self.stdout.write(f'{dimension}={value}: {old.get(value, 0)} -> {new.get(value, 0)}')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} counters'))
@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+from django.db.models import Max
+
+from users.benchmark import benchmark_environment
+from users.models import Application, CustomUser
+from users.sequences import APPLICATION_NUMBER, FORM_NUMBER, SequenceAllocator
+
+MAX_ATTEMPTS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates applications from concurrent threads on a throwaway database, taking their '
+        'numbers from users.sequences (one allocator per simulated worker process) or, for '
+        'comparison, from MAX()+1. Reports unique-constraint retries and fails if the allocator '
+        'needed any, or handed a worker a number lower than one it had already handed out.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4, help='Simulated worker processes.')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per worker.')
+        parser.add_argument('--strategy', choices=('sequence', 'max'), default='sequence')
+
+    def handle(self, *args, **options):
+        count = options['applications']
+        with benchmark_environment():
+            CustomUser.objects.bulk_create(
+                CustomUser(username=f'stress{i}', email=f'stress{i}@example.com', phone=8000000000 + i,
+                           user_type='applicant')
+                for i in range(count)
+            )
+            user_ids = list(CustomUser.objects.order_by('pk').values_list('pk', flat=True))
+            workers = [SequenceAllocator() for _ in range(options['workers'])]
+            # Per worker, numbers in the order they were handed out
+            issued = [[] for _ in workers]
+            worker_locks = [threading.Lock() for _ in workers]
+            retries = []
+            lock = threading.Lock()
+
+            def submit(i):
+                worker = i % len(workers)
+                try:
+                    for _ in range(MAX_ATTEMPTS):
+                        if options['strategy'] == 'sequence':
+                            with worker_locks[worker]:
+                                numbers = workers[worker].allocate(APPLICATION_NUMBER), workers[worker].allocate(FORM_NUMBER)
+                                issued[worker].append(numbers)
+                        else:
+                            top = Application.objects.aggregate(Max('application_number'), Max('form_number'))
+                            numbers = (top['application_number__max'] or 0) + 1, (top['form_number__max'] or 0) + 1
+                        try:
+                            Application.objects.create(
+                                user_id=user_ids[i], application_number=numbers[0], form_number=numbers[1],
+                                application_status='pending',
+                            )
+                        except IntegrityError:
+                            with lock:
+                                retries.append(i)
+                            continue
+                        return
+                    raise CommandError(f'Application {i} still clashed after {MAX_ATTEMPTS} attempts')
+                finally:
+                    connection.close()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers'] * options['threads']) as pool:
+                list(pool.map(submit, range(count)))
+            elapsed = time.perf_counter() - started
+            created = Application.objects.count()
+
+        # A worker's numbers must only increase, in the order it handed them out
+        backwards = sum(
+            1 for numbers in issued for before, after in zip(numbers, numbers[1:])
+            if after[0] <= before[0] or after[1] <= before[1]
+        )
+
+        self.stdout.write(f'created: {created} in {elapsed:.2f}s ({created / elapsed:.0f}/s)')
+        self.stdout.write(f'unique-constraint retries: {len(retries)}')
+        if options['strategy'] == 'sequence':
+            self.stdout.write(f'numbers out of order within a worker: {backwards}')
+            if retries or backwards or created != count:
+                raise CommandError('The sequence allocator clashed or went backwards.')
+            self.stdout.write(self.style.SUCCESS('No retries.'))
@@ -0,0 +1,218 @@
+"""
+Merit list engine.
+
+Applicants with both EducationInfo and PersonalInfo are ranked overall and
+within their casteCategory by intermediate_percentage (highest first), then
+dob (older first), then registration time, then user id, into MeritRank.
+
+rebuild_merit_list() recomputes everything with one query and one sort.
+update_merit_rank() re-ranks a single applicant after an edit: it finds the
+new position with an index seek and only shifts the rows between the old
+and new positions. Rows removed by a cascade (a deleted user) leave a gap
+in the ranks, which the incremental maths tolerates and the periodic
+rebuild closes.
+"""
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Q
+
+from .models import CustomUser, EducationInfo, MeritRank, PersonalInfo
+
+# The fields each model feeds into the ranking
+RANKING_FIELDS = {
+    PersonalInfo: ('dob', 'casteCategory'),
+    EducationInfo: ('intermediate_percentage',),
+}
+
+MERIT_LOCK_KEY = 'merit:lock'
+MERIT_LOCK_TIMEOUT = 300
+REBUILD_BATCH_SIZE = 5000
+
+
+class MeritLockTimeout(Exception):
+    pass
+
+
+@contextmanager
+def merit_lock(wait=10):
+    """
+    Serializes rank writers; ranks are shared state. The lock lives in the
+    default cache, so it spans processes only with a shared cache (Redis).
+    With the locmem fallback it is per process, and concurrent re-ranks in
+    different workers can interleave until the next rebuild.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(MERIT_LOCK_KEY, token, timeout=MERIT_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise MeritLockTimeout('Merit list is locked by another writer')
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        # Held past MERIT_LOCK_TIMEOUT, the lock may have expired and gone
+        # to another writer; leave theirs alone
+        if cache.get(MERIT_LOCK_KEY) == token:
+            cache.delete(MERIT_LOCK_KEY)
+
+
+def ranking_values(instance):
+    """The instance's ranking inputs as loaded; deferred fields count as unknown."""
+    return tuple(instance.__dict__.get(field) for field in RANKING_FIELDS[type(instance)])
+
+
+def sort_key(percentage, dob, registered_at, user_id):
+    return (-percentage, dob, registered_at, user_id)
+
+
+def _rankable_applicants():
+    return (
+        CustomUser.objects
+        .filter(user_type='applicant', educationinfo__isnull=False, personalinfo__isnull=False)
+        .values_list(
+            'pk', 'educationinfo__intermediate_percentage', 'personalinfo__dob',
+            'created_at', 'personalinfo__casteCategory',
+        )
+    )
+
+
+def rebuild_merit_list():
+    """Recomputes every rank from scratch. Returns the number of ranked applicants."""
+    with merit_lock(wait=MERIT_LOCK_TIMEOUT):
+        rows = list(_rankable_applicants().iterator(chunk_size=REBUILD_BATCH_SIZE))
+        rows.sort(key=lambda row: sort_key(row[1], row[2], row[3], row[0]))
+
+        category_counts = defaultdict(int)
+        ranks = []
+        for overall_rank, (user_id, percentage, dob, registered_at, category) in enumerate(rows, start=1):
+            category_counts[category] += 1
+            ranks.append(MeritRank(
+                user_id=user_id,
+                percentage=percentage,
+                dob=dob,
+                registered_at=registered_at,
+                casteCategory=category,
+                overall_rank=overall_rank,
+                category_rank=category_counts[category],
+            ))
+
+        with transaction.atomic():
+            MeritRank.objects.all().delete()
+            MeritRank.objects.bulk_create(ranks, batch_size=REBUILD_BATCH_SIZE)
+    return len(ranks)
+
+
+def _better_than(key):
+    percentage, dob, registered_at, user_id = key
+    return (
+        Q(percentage__gt=percentage)
+        | Q(percentage=percentage, dob__lt=dob)
+        | Q(percentage=percentage, dob=dob, registered_at__lt=registered_at)
+        | Q(percentage=percentage, dob=dob, registered_at=registered_at, user_id__lt=user_id)
+    )
+
+
+def _worse_than(key):
+    percentage, dob, registered_at, user_id = key
+    return (
+        Q(percentage__lt=percentage)
+        | Q(percentage=percentage, dob__gt=dob)
+        | Q(percentage=percentage, dob=dob, registered_at__gt=registered_at)
+        | Q(percentage=percentage, dob=dob, registered_at=registered_at, user_id__gt=user_id)
+    )
+
+
+def _remove(scope, field, rank):
+    """Closes the slot at rank in scope."""
+    scope.filter(**{f'{field}__gt': rank}).update(**{field: F(field) - 1})
+
+
+def _insert(scope, field, key):
+    """Opens a slot for key in scope and returns its rank."""
+    rank = (
+        scope.filter(_worse_than(key))
+        .order_by(field)
+        .values_list(field, flat=True)
+        .first()
+    )
+    if rank is None:
+        return (scope.aggregate(last=Max(field))['last'] or 0) + 1
+    scope.filter(**{f'{field}__gte': rank}).update(**{field: F(field) + 1})
+    return rank
+
+
+def _move(scope, field, rank, old_key, new_key):
+    """Moves a row from rank to new_key's position, shifting only the rows in between."""
+    if sort_key(*new_key) < sort_key(*old_key):
+        # Up: rows between the new position and the old one drop by one
+        new_rank = (
+            scope.filter(_worse_than(new_key), **{f'{field}__lt': rank})
+            .order_by(field)
+            .values_list(field, flat=True)
+            .first()
+        )
+        if new_rank is None:
+            return rank
+        scope.filter(**{f'{field}__gte': new_rank, f'{field}__lt': rank}).update(**{field: F(field) + 1})
+        return new_rank
+    # Down: rows between the old position and the new one rise by one
+    new_rank = (
+        scope.filter(_better_than(new_key), **{f'{field}__gt': rank})
+        .order_by(f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    if new_rank is None:
+        return rank
+    scope.filter(**{f'{field}__gt': rank, f'{field}__lte': new_rank}).update(**{field: F(field) - 1})
+    return new_rank
+
+
+def update_merit_rank(user_id):
+    """Re-ranks one applicant after their education or personal details changed."""
+    with merit_lock(), transaction.atomic():
+        applicant = _rankable_applicants().filter(pk=user_id).first()
+        current = MeritRank.objects.filter(user_id=user_id).first()
+        others = MeritRank.objects.exclude(user_id=user_id)
+
+        if applicant is None:
+            if current is not None:
+                current.delete()
+                _remove(others, 'overall_rank', current.overall_rank)
+                _remove(others.filter(casteCategory=current.casteCategory), 'category_rank', current.category_rank)
+            return None
+
+        _, percentage, dob, registered_at, category = applicant
+        new_key = (percentage, dob, registered_at, user_id)
+
+        if current is None:
+            current = MeritRank(
+                user_id=user_id,
+                overall_rank=_insert(others, 'overall_rank', new_key),
+                category_rank=_insert(others.filter(casteCategory=category), 'category_rank', new_key),
+            )
+        else:
+            old_key = (current.percentage, current.dob, current.registered_at, user_id)
+            if old_key == new_key and current.casteCategory == category:
+                return current
+            current.overall_rank = _move(others, 'overall_rank', current.overall_rank, old_key, new_key)
+            if current.casteCategory == category:
+                current.category_rank = _move(
+                    others.filter(casteCategory=category), 'category_rank',
+                    current.category_rank, old_key, new_key,
+                )
+            else:
+                _remove(others.filter(casteCategory=current.casteCategory), 'category_rank', current.category_rank)
+                current.category_rank = _insert(others.filter(casteCategory=category), 'category_rank', new_key)
+
+        current.percentage = percentage
+        current.dob = dob
+        current.registered_at = registered_at
+        current.casteCategory = category
+        current.save()
+        return current
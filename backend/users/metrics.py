@@ -0,0 +1,217 @@
+"""
+Per-process request metrics in the Prometheus text format.
+
+MetricsMiddleware records, per route and method, a latency histogram, the
+number and total time of DB queries, response bytes and status codes.
+Every thread records into its own shard, so recording takes no lock: a
+shard is only written by its owner thread, and render() sums the shards
+when /metrics is scraped. A thread's shard goes back to a free list when
+the thread exits and is reused by the next new thread, counts included, so
+there are only ever as many shards as threads alive at once. Each worker process exposes its own numbers;
+Prometheus adds them up across workers.
+
+Queries are counted by an execute wrapper installed on every DB connection
+as it is opened. It finds the current request through a context variable,
+which sync_to_async carries into worker threads, so queries the async views
+run are counted too.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fields of a route's aggregate list; the bucket counts follow them
+REQUESTS, DURATION, QUERIES, QUERY_SECONDS, RESPONSE_BYTES = range(5)
+BUCKETS = 5
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+_local = threading.local()
+_shards = []
+# Shards whose threads have exited
+_free_shards = []
+
+# [query count, query seconds] of the request being handled
+current_queries = ContextVar('current_queries', default=None)
+
+
+def _new_route():
+    return [0, 0.0, 0, 0.0, 0] + [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class _ShardOwner:
+    """Lives in _local: dropped when its thread exits, which frees the shard."""
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+def _shard():
+    try:
+        return _local.owner.shard
+    except AttributeError:
+        # list.pop and list.append are atomic; render() may iterate meanwhile
+        try:
+            shard = _free_shards.pop()
+        except IndexError:
+            shard = {'routes': defaultdict(_new_route), 'statuses': defaultdict(int)}
+            _shards.append(shard)
+        owner = _local.owner = _ShardOwner(shard)
+        weakref.finalize(owner, _free_shards.append, shard)
+        return shard
+
+
+def record_request(route, method, status_code, duration, queries, query_seconds, response_bytes):
+    shard = _shard()
+    aggregate = shard['routes'][route, method]
+    aggregate[REQUESTS] += 1
+    aggregate[DURATION] += duration
+    aggregate[QUERIES] += queries
+    aggregate[QUERY_SECONDS] += query_seconds
+    aggregate[RESPONSE_BYTES] += response_bytes
+    aggregate[BUCKETS + bisect_left(LATENCY_BUCKETS, duration)] += 1
+    shard['statuses'][route, method, status_code] += 1
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = current_queries.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter[0] += 1
+        counter[1] += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver; a connection object keeps its wrappers across reconnects."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def _merged():
+    routes = defaultdict(_new_route)
+    statuses = defaultdict(int)
+    for shard in list(_shards):
+        for key, aggregate in list(shard['routes'].items()):
+            total = routes[key]
+            for i, value in enumerate(aggregate):
+                total[i] += value
+        for key, count in list(shard['statuses'].items()):
+            statuses[key] += count
+    return routes, statuses
+
+
+def reset():
+    for shard in list(_shards):
+        shard['routes'].clear()
+        shard['statuses'].clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """samples: (suffix, labels dict, value) for each sample of the metric."""
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            self.lines.append(f'{name}{suffix}{_labels(**labels) if labels else ""} {value}')
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _request_metrics(out):
+    routes, statuses = _merged()
+    items = sorted(routes.items())
+
+    histogram = []
+    for (route, method), aggregate in items:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), aggregate[BUCKETS:]):
+            cumulative += count
+            histogram.append(('_bucket', {'route': route, 'method': method, 'le': bound}, cumulative))
+        histogram.append(('_sum', {'route': route, 'method': method}, aggregate[DURATION]))
+        histogram.append(('_count', {'route': route, 'method': method}, aggregate[REQUESTS]))
+    out.metric('http_request_duration_seconds', 'histogram', 'Request latency by route.', histogram)
+
+    out.metric('http_requests_total', 'counter', 'Responses by route and status code.', [
+        ('', {'route': route, 'method': method, 'status': status_code}, count)
+        for (route, method, status_code), count in sorted(statuses.items())
+    ])
+    for name, field, help_text in (
+        ('http_db_queries_total', QUERIES, 'DB queries run while handling requests.'),
+        ('http_db_query_seconds_total', QUERY_SECONDS, 'Time spent in DB queries while handling requests.'),
+        ('http_response_bytes_total', RESPONSE_BYTES, 'Response body bytes, streaming responses excluded.'),
+    ):
+        out.metric(name, 'counter', help_text, [
+            ('', {'route': route, 'method': method}, aggregate[field]) for (route, method), aggregate in items
+        ])
+
+
+def _cache_metrics(out):
+    from . import authentication, payload_cache
+
+    samples = []
+    for cache_name, counts in (
+        ('auth_user', {'hit': authentication.stats['hits'], 'miss': authentication.stats['misses']}),
+        *((f'payload_{section}', {'hit': section_stats['hits'], 'miss': section_stats['misses']})
+          for section, section_stats in payload_cache.payload_cache_stats().items()),
+    ):
+        for result, count in counts.items():
+            samples.append(('', {'cache': cache_name, 'result': result}, count))
+    out.metric('cache_requests_total', 'counter', 'Cache lookups by cache and result.', samples)
+
+
+def _delivery_metrics(out):
+    from .mail_queue import queue_stats
+    from .sms.metrics import sms_stats
+
+    sms = sms_stats()
+    out.metric('sms_messages_total', 'counter', 'SMS handed to the backend, by result.', [
+        ('', {'result': 'sent'}, sms.get('messages_sent', 0)),
+        ('', {'result': 'failed'}, sms.get('messages_failed', 0)),
+    ])
+    out.metric('sms_gateway_requests_total', 'counter', 'Requests to the SMS gateway, by result.', [
+        ('', {'result': 'ok'}, sms.get('gateway_requests', 0) - sms.get('gateway_errors', 0)),
+        ('', {'result': 'error'}, sms.get('gateway_errors', 0)),
+    ])
+    out.metric('sms_gateway_retries_total', 'counter', 'Retried SMS gateway requests.', [
+        ('', {}, sms.get('gateway_retries', 0)),
+    ])
+    out.metric('sms_latency_seconds_total', 'counter', 'Dispatch-to-accepted time of sent SMS.', [
+        ('', {}, sms.get('latency_seconds_total', 0.0)),
+    ])
+
+    # Shared by all processes, through the cache
+    mail = queue_stats()
+    out.metric('otp_mail_queue_depth', 'gauge', 'OTP emails waiting to be sent.', [('', {}, mail['depth'])])
+    out.metric('otp_mail_sent_total', 'counter', 'OTP emails sent.', [('', {}, mail['sent'])])
+    out.metric('otp_mail_failed_batches_total', 'counter', 'OTP email batches that failed.', [
+        ('', {}, mail['failed_batches']),
+    ])
+
+
+def render():
+    out = Exposition()
+    _request_metrics(out)
+    _cache_metrics(out)
+    _delivery_metrics(out)
+    return out.render()
@@ -0,0 +1,125 @@
+import logging
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import log, metrics
+
+request_logger = logging.getLogger('users.requests')
+
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+class MetricsMiddleware:
+    """
+    Records latency, DB queries and response size per route (users.metrics).
+
+    Routes are labelled with their URL pattern, e.g. users/uploads/<uuid:upload_id>/,
+    so the number of label values stays bounded. Put it first in MIDDLEWARE
+    so the time spent in the other middleware counts too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = [0, 0.0]
+        token = metrics.current_queries.set(counter)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, counter)
+        return response
+
+    async def __acall__(self, request):
+        counter = [0, 0.0]
+        token = metrics.current_queries.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, counter)
+        return response
+
+    def record(self, request, response, duration, counter):
+        match = request.resolver_match
+        route = match.route if match is not None else metrics.UNMATCHED_ROUTE
+        size = 0 if response.streaming else len(response.content)
+        metrics.record_request(route, request.method, response.status_code, duration, counter[0], counter[1], size)
+
+
+class RequestLogMiddleware:
+    """
+    Gives each request an ID, for every record logged while handling it
+    (users.log), and logs one line per request with its status and timing.
+
+    The ID comes from a well-formed X-Request-ID header, e.g. set by the
+    proxy, or is generated; it is echoed in the response. Successful
+    requests faster than LOG_SLOW_REQUEST_MS are logged at
+    LOG_SUCCESS_SAMPLE_RATE; errors and slow requests always are.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = log.request_id.set(self.get_request_id(request))
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            self.log_request(request, response, time.perf_counter() - started)
+        finally:
+            log.request_id.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        token = log.request_id.set(self.get_request_id(request))
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            self.log_request(request, response, time.perf_counter() - started)
+        finally:
+            log.request_id.reset(token)
+        return response
+
+    def get_request_id(self, request):
+        given = request.headers.get('X-Request-ID', '')
+        return given if REQUEST_ID_PATTERN.fullmatch(given) else uuid.uuid4().hex
+
+    def log_request(self, request, response, duration):
+        response['X-Request-ID'] = log.request_id.get()
+        duration_ms = round(duration * 1000, 2)
+        match = request.resolver_match
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match is not None else None,
+            'status': response.status_code,
+            'duration_ms': duration_ms,
+        }
+        if response.status_code >= 500:
+            request_logger.error('Request failed', extra=fields)
+        elif response.status_code >= 400:
+            request_logger.warning('Request rejected', extra=fields)
+        elif duration_ms >= settings.LOG_SLOW_REQUEST_MS:
+            request_logger.warning('Slow request', extra=fields)
+        else:
+            request_logger.info('Request', extra=dict(fields, sample_rate=settings.LOG_SUCCESS_SAMPLE_RATE))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_alter_personalinfo_currentaddress_pincode_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['is_email_verified', 'is_phone_verified', 'date_joined'], name='users_custo_is_emai_48f32f_idx'),
+        ),
+    ]
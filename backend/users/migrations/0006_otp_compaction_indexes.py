@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customuser_unverified_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emailotp',
+            name='users_email_email_3e6b7d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='phoneotp',
+            name='users_phone_phone_e3eec4_idx',
+        ),
+        migrations.AlterField(
+            model_name='emailotp',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='phoneotp',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(fields=['email', 'is_verified', 'created_at'], name='users_email_email_3190c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phoneotp',
+            index=models.Index(fields=['phone', 'is_verified', 'created_at'], name='users_phone_phone_407d2c_idx'),
+        ),
+    ]
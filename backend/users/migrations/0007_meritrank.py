@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_otp_compaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeritRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('percentage', models.FloatField()),
+                ('dob', models.DateField()),
+                ('registered_at', models.DateTimeField()),
+                ('casteCategory', models.CharField(max_length=100)),
+                ('overall_rank', models.PositiveIntegerField(db_index=True)),
+                ('category_rank', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-percentage', 'dob', 'registered_at', 'user'], name='users_merit_percent_66cc73_idx'), models.Index(fields=['casteCategory', '-percentage', 'dob', 'registered_at', 'user'], name='users_merit_casteCa_a30dac_idx'), models.Index(fields=['casteCategory', 'category_rank'], name='users_merit_casteCa_deab62_idx')],
+            },
+        ),
+    ]
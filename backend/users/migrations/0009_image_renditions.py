@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_admissioncounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationinfo',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='personalinfo',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:54
+
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_chunked_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='educationinfo',
+            name='intermediate_certificate_image',
+            field=models.ImageField(storage=users.models.document_storage, upload_to='intermediate_certificates/'),
+        ),
+        migrations.AlterField(
+            model_name='educationinfo',
+            name='lastappearingexam_marksheet_image',
+            field=models.ImageField(storage=users.models.document_storage, upload_to='lastappearingexam_marksheets/'),
+        ),
+        migrations.AlterField(
+            model_name='personalinfo',
+            name='caste_or_ews_certificate_image',
+            field=models.ImageField(blank=True, null=True, storage=users.models.document_storage, upload_to='caste_or_ews_certificates/'),
+        ),
+        migrations.AlterField(
+            model_name='personalinfo',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=users.models.document_storage, upload_to='user_profile_images/'),
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_saved_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'last_saved_at'], name='users_store_refcoun_cb9117_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_document_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='application',
+            name='application_number',
+            field=models.PositiveIntegerField(blank=True, db_index=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='form_number',
+            field=models.PositiveIntegerField(blank=True, db_index=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('cycle', models.PositiveIntegerField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'cycle'), name='unique_number_sequence')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_percentages(apps, schema_editor):
+    Application = apps.get_model('users', 'Application')
+    EducationInfo = apps.get_model('users', 'EducationInfo')
+    Application.objects.update(intermediate_percentage=Subquery(
+        EducationInfo.objects.filter(user_id=OuterRef('user_id')).values('intermediate_percentage')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_number_sequences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='intermediate_percentage',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['intermediate_percentage', 'id'], name='users_appli_interme_2613ab_idx'),
+        ),
+        migrations.RunPython(copy_percentages, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,15 @@
+import uuid
+
+from django.core.files.storage import storages
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+
+def document_storage():
+    """Storage for uploaded documents; content-addressed by default, see users.storage."""
+    return storages['documents']
+
+
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = [
         ('admin', 'Admin'),
@@ -17,6 +26,8 @@ class CustomUser(AbstractUser):
     class Meta:
         indexes = [
             models.Index(fields=['user_type', 'email']),
+            # Candidate scan for delete_unverified_accounts
+            models.Index(fields=['is_email_verified', 'is_phone_verified', 'date_joined']),
         ]
 
 class EmailOTP(models.Model):
@@ -25,12 +36,12 @@ class EmailOTP(models.Model):
     otp = models.CharField(max_length=6)
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
     def __str__(self):
         return f"{self.user.email} OTP"
     class Meta:
         indexes = [
-            models.Index(fields=['email', 'created_at']),
+            models.Index(fields=['email', 'is_verified', 'created_at']),
         ]
 
 class PhoneOTP(models.Model):
@@ -39,12 +50,12 @@ class PhoneOTP(models.Model):
     otp = models.CharField(max_length=6) 
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
     def __str__(self):
         return f"{self.user.phone} OTP"
     class Meta:
         indexes = [
-            models.Index(fields=['phone', 'created_at']),
+            models.Index(fields=['phone', 'is_verified', 'created_at']),
         ]
 
 
@@ -54,9 +65,13 @@ class Application(models.Model):
         ('approved', 'Approved'),
     ]
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, db_index=True)
-    application_number = models.PositiveIntegerField(unique=True, db_index=True)
-    form_number = models.PositiveIntegerField(unique=True, db_index=True)
+    # Allocated on first save when not given; see users.sequences
+    application_number = models.PositiveIntegerField(unique=True, db_index=True, blank=True)
+    form_number = models.PositiveIntegerField(unique=True, db_index=True, blank=True)
     application_status = models.CharField(max_length=10, choices=APPLICATION_STATUS_CHOICES, db_index=True)
+    # Copy of educationinfo.intermediate_percentage, kept by signals.py, so the
+    # applicant list can order and seek by it on one index instead of a join
+    intermediate_percentage = models.FloatField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
@@ -64,11 +79,12 @@ class Application(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['application_status', 'created_at']),
+            models.Index(fields=['intermediate_percentage', 'id']),
         ]
 
 class PersonalInfo(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, db_index=True)
-    profile_image = models.ImageField(upload_to='user_profile_images/', blank=True, null=True)
+    profile_image = models.ImageField(upload_to='user_profile_images/', storage=document_storage, blank=True, null=True)
     dob = models.DateField(db_index=True)
     GENDER_CHOICES = [
         ('female', 'Female'),
@@ -116,17 +132,22 @@ class PersonalInfo(models.Model):
     caste = models.CharField(max_length=100)
     caste_or_ews_certificate_issued_by = models.CharField(max_length=100)
     caste_or_ews_certificate_number = models.PositiveIntegerField(unique=True, db_index=True)
-    caste_or_ews_certificate_image = models.ImageField(upload_to='caste_or_ews_certificates/', blank=True, null=True)
+    caste_or_ews_certificate_image = models.ImageField(upload_to='caste_or_ews_certificates/', storage=document_storage, blank=True, null=True)
+    # {image field: {'source', 'display', 'thumbnail'}}, written by users.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
+    def sync_current_address(self):
         if self.is_same_as_permanentAddress:
             self.currentAddress_Country = self.permanentAddress_Country
             self.currentAddress_State = self.permanentAddress_State
             self.currentAddress_City = self.permanentAddress_City
             self.currentAddress_PinCode = self.permanentAddress_PinCode
             self.currentAddress_Address = self.permanentAddress_Address
+
+    def save(self, *args, **kwargs):
+        self.sync_current_address()
         super().save(*args, **kwargs)
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name}"
@@ -147,12 +168,12 @@ class EducationInfo(models.Model):
     intermediate_total_marks = models.PositiveIntegerField()
     intermediate_percentage = models.FloatField(db_index=True)
     intermediate_year_of_passing = models.PositiveIntegerField(db_index=True)
-    intermediate_certificate_image = models.ImageField(upload_to='intermediate_certificates/')
+    intermediate_certificate_image = models.ImageField(upload_to='intermediate_certificates/', storage=document_storage)
     lastappearingexam_institution_name = models.CharField(max_length=100)
     lastappearingexam_place = models.CharField(max_length=100)
     lastappearingexam_board = models.CharField(max_length=100)
     lastappearingexam_year_of_passing = models.PositiveIntegerField(db_index=True)
-    lastappearingexam_marksheet_image = models.ImageField(upload_to='lastappearingexam_marksheets/')
+    lastappearingexam_marksheet_image = models.ImageField(upload_to='lastappearingexam_marksheets/', storage=document_storage)
     EXTRA_CURRICULAR_CHOICES = [
         ('NCC', 'NCC'),
         ('LITERACY', 'Literacy Program'),
@@ -169,6 +190,8 @@ class EducationInfo(models.Model):
         help_text="Enter comma separated values for multiple activities",
         db_index=True
     )
+    # {image field: {'source', 'display', 'thumbnail'}}, written by users.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -194,3 +217,112 @@ class EducationInfo(models.Model):
             models.Index(fields=['intermediate_percentage', 'intermediate_year_of_passing']),
             models.Index(fields=['extra_curricular_activities', 'created_at']),
         ]
+
+
+class MeritRank(models.Model):
+    """Materialized merit list, maintained by users.merit."""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, db_index=True)
+    percentage = models.FloatField()
+    dob = models.DateField()
+    registered_at = models.DateTimeField()
+    casteCategory = models.CharField(max_length=100)
+    overall_rank = models.PositiveIntegerField(db_index=True)
+    category_rank = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"{self.user_id}: #{self.overall_rank} ({self.casteCategory} #{self.category_rank})"
+    class Meta:
+        indexes = [
+            # Merit order: percentage, then older first, then earlier registration
+            models.Index(fields=['-percentage', 'dob', 'registered_at', 'user']),
+            models.Index(fields=['casteCategory', '-percentage', 'dob', 'registered_at', 'user']),
+            models.Index(fields=['casteCategory', 'category_rank']),
+        ]
+
+
+class AdmissionCounter(models.Model):
+    """Per-dimension tallies for the admissions dashboard, maintained by users.stats."""
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='unique_admission_counter'),
+        ]
+
+
+class NumberSequence(models.Model):
+    """Last number reserved per sequence and admission year; see users.sequences."""
+    name = models.CharField(max_length=50)
+    cycle = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"{self.name} {self.cycle}: {self.last_value}"
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'cycle'], name='unique_number_sequence'),
+        ]
+
+
+class ChunkedUpload(models.Model):
+    """A file being uploaded in numbered chunks; see users.uploads."""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_index=True)
+    target = models.CharField(max_length=50)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        if index == self.total_chunks - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+class UploadChunk(models.Model):
+    upload = models.ForeignKey(ChunkedUpload, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'index'], name='unique_upload_chunk'),
+        ]
+
+
+class StoredBlob(models.Model):
+    """A file in ContentAddressedStorage and the number of image fields pointing at it."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_saved_at = models.DateTimeField()
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'last_saved_at']),
+        ]
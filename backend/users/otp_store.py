@@ -0,0 +1,152 @@
+"""
+Pluggable OTP storage.
+
+OTP_STORE_BACKEND picks the implementation. CacheOTPStore keeps one live OTP
+per channel and destination in the cache and lets the cache TTL expire it;
+it needs a cache shared by every web process, so it is the default only with
+Redis. DatabaseOTPStore keeps the old EmailOTP/PhoneOTP rows, for
+single-host deployments and those that want a persistent audit trail.
+"""
+import secrets
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import EmailOTP, PhoneOTP
+
+EMAIL = 'email'
+PHONE = 'phone'
+
+# consume() results
+OTP_VALID = 'valid'
+OTP_MISSING = 'missing'
+OTP_EXPIRED = 'expired'
+OTP_INVALID = 'invalid'
+
+
+def generate_otp(length=6):
+    return ''.join(secrets.choice('0123456789') for _ in range(length))
+
+
+class BaseOTPStore:
+    def issue(self, user, channel, destination):
+        """Creates a new OTP for the destination, replacing any older one, and returns it."""
+        raise NotImplementedError
+
+    def consume(self, channel, destination, otp):
+        """Checks the OTP and, if it matches, uses it up. Returns one of the OTP_* results."""
+        raise NotImplementedError
+
+    async def aissue(self, user, channel, destination):
+        return await sync_to_async(self.issue)(user, channel, destination)
+
+    async def aconsume(self, channel, destination, otp):
+        return await sync_to_async(self.consume)(channel, destination, otp)
+
+
+class CacheOTPStore(BaseOTPStore):
+    """
+    OTPs live in the cache under otp:<channel>:<destination>.
+
+    Email and phone are unique per user, so the destination identifies the
+    user without a query. Expiry is the cache TTL. Each issue() stores a
+    fresh nonce with the OTP, and consume() deletes the key only if it still
+    holds the value it checked, so a resend landing in between is never
+    deleted in place of the OTP that was used.
+    """
+    key_format = 'otp:{channel}:{destination}'
+    # Deletes KEYS[1] only if it still holds ARGV[1]
+    delete_if_unchanged = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    )
+    # Caches other than Redis have no check-and-delete, so issue() and
+    # consume() take turns instead; enough for locmem, which is per-process
+    lock = threading.Lock()
+
+    def _key(self, channel, destination):
+        return self.key_format.format(channel=channel, destination=destination)
+
+    @staticmethod
+    def _check(stored, otp):
+        if stored is None:
+            return OTP_MISSING
+        if not secrets.compare_digest(stored['otp'], str(otp)):
+            return OTP_INVALID
+        return OTP_VALID
+
+    def issue(self, user, channel, destination):
+        otp = generate_otp()
+        value = {'nonce': secrets.token_hex(8), 'otp': otp}
+        timeout = settings.OTP_EXPIRY.total_seconds()
+        with self.lock:
+            cache.set(self._key(channel, destination), value, timeout=timeout)
+        return otp
+
+    def consume(self, channel, destination, otp):
+        key = self._key(channel, destination)
+        if isinstance(cache, RedisCache):
+            return self._consume_redis(key, otp)
+        with self.lock:
+            result = self._check(cache.get(key), otp)
+            if result == OTP_VALID:
+                cache.delete(key)
+        return result
+
+    def _consume_redis(self, key, otp):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        raw = client.get(key)
+        if raw is None:
+            return OTP_MISSING
+        result = self._check(cache._cache._serializer.loads(raw), otp)
+        if result == OTP_VALID and not client.eval(self.delete_if_unchanged, 1, key, raw):
+            # Consumed by a concurrent request, or replaced by a resend
+            return OTP_MISSING
+        return result
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """OTPs as EmailOTP/PhoneOTP rows, kept after use until delete_expired_otps runs."""
+    models = {
+        EMAIL: (EmailOTP, 'email'),
+        PHONE: (PhoneOTP, 'phone'),
+    }
+
+    def issue(self, user, channel, destination):
+        model, field = self.models[channel]
+        otp = generate_otp()
+        model.objects.create(**{
+            'user': user,
+            field: destination,
+            'otp': otp,
+            'expires_at': timezone.now() + settings.OTP_EXPIRY,
+        })
+        return otp
+
+    def consume(self, channel, destination, otp):
+        model, field = self.models[channel]
+        record = (
+            model.objects
+            .filter(**{field: destination, 'is_verified': False})
+            .order_by('-created_at')
+            .first()
+        )
+        if not record:
+            return OTP_MISSING
+        if record.expires_at < timezone.now():
+            return OTP_EXPIRED
+        if not secrets.compare_digest(record.otp, str(otp)):
+            return OTP_INVALID
+        # Conditional update so two concurrent requests can't both use it
+        if not model.objects.filter(pk=record.pk, is_verified=False).update(is_verified=True):
+            return OTP_MISSING
+        return OTP_VALID
+
+
+def get_otp_store():
+    return import_string(settings.OTP_STORE_BACKEND)()
@@ -0,0 +1,110 @@
+import base64
+import json
+from functools import reduce
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination, newest or highest first.
+
+    The cursor holds the sort key of the last row on the page, and the next
+    page is "rows after that key", so every page costs the same index range
+    scan however deep it is. Each ordering ends in the primary key to make
+    the key unique. No COUNT(*) is run unless ?count=true is passed.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+
+    # ordering name -> ((field path, cursor value parser), ...), all descending
+    orderings = {}
+    default_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering_name = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if self.ordering_name not in self.orderings:
+            raise NotFound(f'Invalid ordering. Choose one of: {", ".join(self.orderings)}.')
+        self.keys = self.orderings[self.ordering_name]
+        self.page_size = self.get_page_size(request)
+
+        self.count = queryset.count() if request.query_params.get('count') == 'true' else None
+
+        # Rows without a sort value can't be placed on the keyset
+        queryset = queryset.filter(**{f'{path}__isnull': False for path, _ in self.keys})
+        queryset = queryset.order_by(*[f'-{path}' for path, _ in self.keys])
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def after(self, values):
+        """Rows strictly after values in descending (k1, k2, ...) order."""
+        condition = Q()
+        for i in range(len(self.keys) - 1, -1, -1):
+            path = self.keys[i][0]
+            step = Q(**{f'{path}__lt': values[i]})
+            if i < len(self.keys) - 1:
+                step |= Q(**{path: values[i]}) & condition
+            condition = step
+        return condition
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = [parse(value) for (_, parse), value in zip(self.keys, raw, strict=True)]
+        except (TypeError, ValueError):
+            values = [None]
+        if None in values:
+            raise NotFound('Invalid cursor.')
+        return values
+
+    def encode_cursor(self, obj):
+        values = []
+        for path, _ in self.keys:
+            value = reduce(getattr, path.split('__'), obj)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, 'count'), self.cursor_query_param,
+                                   self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            payload['count'] = self.count
+        return Response(payload)
+
+
+class ApplicationKeysetPagination(KeysetPagination):
+    orderings = {
+        'created': (('created_at', parse_datetime), ('id', int)),
+        # Application's own copy of the percentage: one index, no join
+        'percentage': (('intermediate_percentage', float), ('id', int)),
+    }
+    default_ordering = 'created'
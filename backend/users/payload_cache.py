@@ -0,0 +1,77 @@
+"""
+Read-through cache of serialized PersonalInfo/EducationInfo payloads.
+
+Entries live in the 'payloads' cache under payload:<section>:<user_id>, with
+the row's updated_at so conditional GETs can be answered from the cache too.
+Saves and deletes replace the entry with a short-lived tombstone naming the
+committed version. set_payload() only replaces a tombstone with that version
+or a newer one, so a reader that loaded the old row before the commit can't
+put it back.
+
+Payloads are serialized without a request in the serializer context, so they
+hold nothing that depends on who asked: file fields are stored as media
+paths, and views make them absolute per response with absolute_urls().
+"""
+from collections import Counter, namedtuple
+
+from django.core.cache import caches
+
+PERSONAL_INFO = 'personal_info'
+EDUCATION_INFO = 'education_info'
+
+TOMBSTONE = 'stale'
+TOMBSTONE_TIMEOUT = 5
+
+CachedPayload = namedtuple('CachedPayload', 'user_id updated_at data')
+
+# Per-process hit/miss counts
+stats = Counter()
+
+
+def _cache():
+    return caches['payloads']
+
+
+def payload_key(section, user_id):
+    return f'payload:{section}:{user_id}'
+
+
+def get_payload(section, user_id):
+    entry = _cache().get(payload_key(section, user_id))
+    if entry is None or entry[0] == TOMBSTONE:
+        stats[f'{section}_misses'] += 1
+        return None
+    stats[f'{section}_hits'] += 1
+    return CachedPayload(*entry)
+
+
+def set_payload(section, instance, data):
+    key = payload_key(section, instance.user_id)
+    entry = (instance.user_id, instance.updated_at, data)
+    current = _cache().get(key)
+    if current is None:
+        _cache().add(key, entry)
+    elif current[0] == TOMBSTONE and current[1] is not None and instance.updated_at >= current[1]:
+        _cache().set(key, entry)
+
+
+def invalidate_payload(section, user_id, updated_at=None):
+    """Drops the entry. updated_at is the committed version, None after a delete."""
+    _cache().set(payload_key(section, user_id), (TOMBSTONE, updated_at), timeout=TOMBSTONE_TIMEOUT)
+
+
+def absolute_urls(request, data, fields):
+    """A copy of data with the media paths in fields made absolute for request."""
+    return {**data, **{field: request.build_absolute_uri(data[field]) for field in fields if data.get(field)}}
+
+
+def payload_cache_stats():
+    result = {}
+    for section in (PERSONAL_INFO, EDUCATION_INFO):
+        hits, misses = stats[f'{section}_hits'], stats[f'{section}_misses']
+        result[section] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+        }
+    return result
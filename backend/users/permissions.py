@@ -0,0 +1,12 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsAdmissionsStaff(BasePermission):
+    """
+    Admissions staff: Django staff accounts. user_type is not enough, as it
+    used to be chosen by the client at registration.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and user.is_staff)
@@ -0,0 +1,186 @@
+"""
+Refresh-token revocation, kept in the cache.
+
+revoke() stores revoked:<jti> with a TTL equal to the token's remaining
+lifetime, so entries vanish by themselves once the token would have
+expired anyway. There is nothing to clean up.
+
+Most tokens checked are not revoked, so each process keeps a Bloom filter
+of revoked jtis and only asks the cache when the filter says "maybe". To
+learn about revocations made by other processes, revoke() also appends the
+jti to a log in the cache (revoked:log:<seq>). A process catches up on that
+log every REVOCATION_SYNC_INTERVAL seconds, so a logout reaches the other
+workers within two intervals. Log entries live as long as a refresh token,
+so the log trims itself too.
+
+The filter is a list of fixed-size generations. A full generation is kept,
+and a new one started, until everything it holds has expired: one
+refresh-token lifetime after it filled up. Memory follows the number of
+revocations per token lifetime, and a busy period never forces a reload.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+REVOKED_KEY = 'revoked:{jti}'
+LOG_SEQ_KEY = 'revoked:seq'
+LOG_ENTRY_KEY = 'revoked:log:{seq}'
+LOG_FETCH_BATCH = 1000
+
+REVOCATION_SYNC_INTERVAL = 1
+FILTER_CAPACITY = 100000
+FILTER_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, ~error_rate false positives."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+        self.filled_at = None  # time.monotonic() once full
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big')
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationFilter:
+    """
+    This process's view of the revocation log.
+
+    revoke() bumps the sequence number before writing the entry, so an entry
+    may not exist yet when its number is first seen. Each sync therefore
+    only reads up to the number seen by the previous sync, by when its entry
+    has been written.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.generations = [BloomFilter(FILTER_CAPACITY, FILTER_ERROR_RATE)]
+        self.seq = None  # entries up to here are in the filter
+        self.seen = None  # latest number at the previous sync
+        self.synced_at = 0
+
+    def _add(self, jti):
+        current = self.generations[-1]
+        if current.count >= current.capacity:
+            current.filled_at = time.monotonic()
+            current = BloomFilter(FILTER_CAPACITY, FILTER_ERROR_RATE)
+            self.generations.append(current)
+        current.add(jti)
+
+    def _drop_expired_generations(self):
+        # Every jti in a generation was revoked before it filled up
+        lifetime = settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
+        now = time.monotonic()
+        self.generations = [
+            generation for generation in self.generations
+            if generation.filled_at is None or now - generation.filled_at < lifetime
+        ]
+
+    def add(self, jti):
+        with self._lock:
+            self._add(jti)
+
+    def __contains__(self, jti):
+        return any(jti in generation for generation in self.generations)
+
+    def might_contain(self, jti):
+        if time.monotonic() - self.synced_at >= REVOCATION_SYNC_INTERVAL:
+            self.sync()
+        return jti in self
+
+    def sync(self):
+        with self._lock:
+            latest = cache.get(LOG_SEQ_KEY, 0)
+            if self.seen is not None and latest < self.seen:
+                # The cache was emptied: start over from the log
+                self._reset()
+            self._drop_expired_generations()
+            if self.seq is None:
+                self.seq = self._load_backwards(latest)
+            elif self.seen > self.seq:
+                self._load(range(self.seq + 1, self.seen + 1))
+                self.seq = self.seen
+            self.seen = latest
+            self.synced_at = time.monotonic()
+
+    def _load(self, seqs):
+        """Adds the given log entries to the filter. Returns the numbers found."""
+        keys = {LOG_ENTRY_KEY.format(seq=seq): seq for seq in seqs}
+        entries = cache.get_many(keys)
+        for jti in entries.values():
+            self._add(jti)
+        return {keys[key] for key in entries}
+
+    def _load_backwards(self, latest):
+        """
+        Loads the whole log. Entries share one TTL and so expire oldest first:
+        stop at the first empty batch. Returns the number to resume from.
+        """
+        resume_from = latest
+        end = latest
+        while end > 0:
+            start = max(1, end - LOG_FETCH_BATCH + 1)
+            found = self._load(range(start, end + 1))
+            if end == latest:
+                # The newest entries may still be being written; read them again next time
+                missing = set(range(start, end + 1)) - found
+                resume_from = min(missing) - 1 if missing else latest
+            if not found:
+                break
+            end = start - 1
+        return resume_from
+
+
+revocation_filter = RevocationFilter()
+
+
+def _remaining_lifetime(token):
+    return int(token['exp'] - timezone.now().timestamp())
+
+
+def revoke(token):
+    """Revokes a refresh token until it expires."""
+    ttl = _remaining_lifetime(token)
+    if ttl <= 0:
+        return
+    jti = token['jti']
+    cache.set(REVOKED_KEY.format(jti=jti), 1, timeout=ttl)
+    try:
+        seq = cache.incr(LOG_SEQ_KEY)
+    except ValueError:
+        # First revocation since the cache was emptied
+        cache.add(LOG_SEQ_KEY, 0, timeout=None)
+        seq = cache.incr(LOG_SEQ_KEY)
+    log_timeout = settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
+    cache.set(LOG_ENTRY_KEY.format(seq=seq), jti, timeout=log_timeout)
+    revocation_filter.add(jti)
+
+
+def is_revoked(token):
+    jti = token['jti']
+    if not revocation_filter.might_contain(jti):
+        return False
+    return cache.get(REVOKED_KEY.format(jti=jti)) is not None
@@ -0,0 +1,156 @@
+"""
+Application and form numbers.
+
+Numbers come from a NumberSequence row per sequence and admission year
+(the cycle). Each worker process reserves a block of SEQUENCE_BLOCK_SIZE
+numbers at a time, with one UPDATE of that row, and hands them out from
+memory; submissions only touch the row when their worker's block runs
+out, instead of every one of them racing on MAX()+1 and retrying on the
+unique constraint.
+
+A number is the admission year followed by SEQUENCE_DIGITS digits, e.g.
+2025000137, so numbers sort by cycle and never collide across cycles;
+format_number() renders it with the sequence's SEQUENCE_FORMATS prefix.
+
+Within a cycle each worker's numbers only increase, and blocks are handed
+out in order, but numbers are not dense: the rest of a block is lost when
+its worker exits, and numbers taken by failed inserts are not reused.
+"""
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NumberSequence
+
+APPLICATION_NUMBER = 'application_number'
+FORM_NUMBER = 'form_number'
+
+SEQUENCE_DIGITS = 6
+
+# Per-process: blocks reserved, numbers handed out
+stats = Counter()
+
+
+class SequenceExhausted(Exception):
+    pass
+
+
+def current_cycle():
+    return settings.ADMISSION_YEAR or timezone.localdate().year
+
+
+def reserve_block(name, cycle, size):
+    """Reserves the next size numbers of a sequence; returns them as (start, stop)."""
+    sequences = NumberSequence.objects.filter(name=name, cycle=cycle)
+    with transaction.atomic():
+        if not sequences.update(last_value=F('last_value') + size):
+            # First block of the cycle; a concurrent first insert is ignored, not raised
+            NumberSequence.objects.bulk_create([NumberSequence(name=name, cycle=cycle)], ignore_conflicts=True)
+            sequences.update(last_value=F('last_value') + size)
+        # The UPDATE holds the row until commit, so this reads our own value
+        last_value = sequences.values_list('last_value', flat=True).get()
+    stats['blocks_reserved'] += 1
+    return last_value - size + 1, last_value + 1
+
+
+class SequenceAllocator:
+    """
+    Hands out numbers from the blocks this process reserved.
+
+    The lock only guards the in-memory blocks; reservations run without it.
+    A thread inside a transaction may hold the sequence row (or, on SQLite,
+    the database) while it waits for the lock, so a thread holding the lock
+    must never wait for the database. Threads that find no numbers left
+    each reserve a block, and blocks are used lowest first; a block that
+    comes back lower than a number already handed out is dropped, since a
+    worker's numbers must not go back.
+
+    A block reserved inside a transaction is only shared with other
+    threads once that transaction commits: if it rolls back, so does the
+    reservation, and its numbers may be reserved again by another worker.
+    """
+
+    def __init__(self):
+        self.reset()
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        """Forgets every block; a forked child must not reuse its parent's."""
+        self._lock = threading.Lock()
+        # (name, cycle) -> [[next number, stop], ...], lowest first
+        self._blocks = {}
+        # (name, cycle) -> last number handed out
+        self._issued = {}
+
+    def allocate(self, name, cycle=None):
+        cycle = cycle or current_cycle()
+        key = (name, cycle)
+        while True:
+            with self._lock:
+                number = self._take(key)
+            if number is not None:
+                break
+            start, stop = reserve_block(name, cycle, settings.SEQUENCE_BLOCK_SIZE)
+            with self._lock:
+                issued = self._issued.get(key, 0)
+                if start == issued:
+                    # The same block again: the transaction that took its first number rolled back
+                    self._issued[key] = start - 1
+                elif start < issued:
+                    # Another thread has handed out a later block meanwhile
+                    continue
+                if connection.in_atomic_block:
+                    transaction.on_commit(lambda: self._share(key, start + 1, stop))
+                    number = self._issued[key] = start
+                    break
+                self._add_block(key, start, stop)
+                number = self._take(key)
+            if number is not None:
+                break
+        stats['allocated'] += 1
+        if number >= 10 ** SEQUENCE_DIGITS:
+            raise SequenceExhausted(f'{name} has run out of numbers for {cycle}')
+        return cycle * 10 ** SEQUENCE_DIGITS + number
+
+    def _take(self, key):
+        """The lowest unused number above the last one handed out, or None. Call with the lock held."""
+        blocks = self._blocks.get(key, [])
+        floor = self._issued.get(key, 0) + 1
+        while blocks:
+            block = blocks[0]
+            block[0] = max(block[0], floor)
+            if block[0] < block[1]:
+                number = self._issued[key] = block[0]
+                block[0] += 1
+                return number
+            blocks.pop(0)
+        return None
+
+    def _add_block(self, key, start, stop):
+        blocks = self._blocks.setdefault(key, [])
+        blocks.append([start, stop])
+        blocks.sort()
+
+    def _share(self, key, start, stop):
+        with self._lock:
+            # Dropped if a later block is already in use: numbers must not go back
+            if start > self._issued.get(key, 0):
+                self._add_block(key, start, stop)
+
+
+allocator = SequenceAllocator()
+
+
+def allocate(name, cycle=None):
+    return allocator.allocate(name, cycle)
+
+
+def format_number(name, value):
+    """value as shown to applicants, e.g. APP-2025-000137."""
+    cycle, number = divmod(value, 10 ** SEQUENCE_DIGITS)
+    return settings.SEQUENCE_FORMATS[name].format(year=cycle, number=number)
@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from .models import CustomUser, Application, PersonalInfo, EducationInfo
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .revocation import is_revoked, revoke
+from .models import CustomUser, Application, PersonalInfo, EducationInfo, ChunkedUpload
+from .sequences import APPLICATION_NUMBER, FORM_NUMBER, format_number
 
 class CustomUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -15,7 +20,8 @@ class CustomUserSerializer(serializers.ModelSerializer):
             'last_name': {'required': True},
             'email': {'required': True},
             'phone': {'required': True},
-            'user_type': {'required': True}
+            # Everyone who registers is an applicant; staff are created by admins
+            'user_type': {'read_only': True},
         }
 
     def validate(self, attrs):
@@ -25,7 +31,7 @@ class CustomUserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = CustomUser.objects.create_user(**validated_data)
+        user = CustomUser.objects.create_user(user_type='applicant', **validated_data)
         return user
 
     def update(self, instance, validated_data):
@@ -36,15 +42,28 @@ class CustomUserSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 class ApplicationSerializer(serializers.ModelSerializer):
+    application_code = serializers.SerializerMethodField()
+    form_code = serializers.SerializerMethodField()
+
     class Meta:
         model = Application
-        fields = ('id', 'user', 'application_number', 'form_number', 'application_status', 'created_at', 'updated_at')
+        fields = (
+            'id', 'user', 'application_number', 'form_number', 'application_code', 'form_code',
+            'application_status', 'created_at', 'updated_at',
+        )
         extra_kwargs = {
-            'application_number': {'required': True},
-            'form_number': {'required': True},
+            # Allocated by users.sequences
+            'application_number': {'read_only': True},
+            'form_number': {'read_only': True},
             'application_status': {'required': True}
         }
 
+    def get_application_code(self, obj):
+        return format_number(APPLICATION_NUMBER, obj.application_number)
+
+    def get_form_code(self, obj):
+        return format_number(FORM_NUMBER, obj.form_number)
+
     def validate(self, attrs):
         if attrs.get('application_status') not in ['pending', 'approved']:
             raise serializers.ValidationError({"application_status": "Invalid application status"})
@@ -169,4 +188,84 @@ class EducationInfoSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class ApplicantFilterSerializer(serializers.Serializer):
+    """Query parameters filtering the applicant list and export; invalid values are a 400."""
+    application_status = serializers.ChoiceField(choices=Application.APPLICATION_STATUS_CHOICES, required=False)
+    casteCategory = serializers.CharField(max_length=100, required=False)
+    min_percentage = serializers.FloatField(min_value=0, max_value=100, required=False)
+    max_percentage = serializers.FloatField(min_value=0, max_value=100, required=False)
+    year_of_passing = serializers.IntegerField(min_value=1900, max_value=2100, required=False)
+    created_after = serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'], required=False)
+    created_before = serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'], required=False)
+
+    @classmethod
+    def validated(cls, params):
+        """The filters given in params, parsed; empty parameters are left out."""
+        serializer = cls(data={name: value for name, value in params.items() if value != ''})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+
+class ApplicantListSerializer(serializers.ModelSerializer):
+    """Flat, read-only row for the reviewer applicant listing."""
+    username = serializers.CharField(source='user.username', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+    phone = serializers.IntegerField(source='user.phone', read_only=True)
+    gender = serializers.CharField(source='user.personalinfo.gender', read_only=True)
+    dob = serializers.DateField(source='user.personalinfo.dob', read_only=True)
+    casteCategory = serializers.CharField(source='user.personalinfo.casteCategory', read_only=True)
+    intermediate_school_board = serializers.CharField(source='user.educationinfo.intermediate_school_board', read_only=True)
+    intermediate_percentage = serializers.FloatField(source='user.educationinfo.intermediate_percentage', read_only=True)
+    intermediate_year_of_passing = serializers.IntegerField(source='user.educationinfo.intermediate_year_of_passing', read_only=True)
+
+    class Meta:
+        model = Application
+        fields = (
+            'id', 'user', 'application_number', 'form_number', 'application_status',
+            'username', 'first_name', 'last_name', 'email', 'phone',
+            'gender', 'dob', 'casteCategory',
+            'intermediate_school_board', 'intermediate_percentage', 'intermediate_year_of_passing',
+            'created_at', 'updated_at'
+        )
+        read_only_fields = fields
+
+
+class ProfileSerializer(serializers.Serializer):
+    """User, personal info, education info and application status in one payload."""
+    user = CustomUserSerializer(source='*', read_only=True)
+    personal_info = PersonalInfoSerializer(source='personalinfo', read_only=True)
+    education_info = EducationInfoSerializer(source='educationinfo', read_only=True)
+    application_status = serializers.CharField(source='application.application_status', read_only=True)
+
 
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    """Upload state; received_chunks lets a client resume where it left off."""
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    chunk_size = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta:
+        model = ChunkedUpload
+        fields = (
+            'id', 'target', 'filename', 'size', 'chunk_size', 'sha256',
+            'status', 'total_chunks', 'received_chunks', 'created_at', 'completed_at'
+        )
+        read_only_fields = ('id', 'status', 'created_at', 'completed_at')
+
+    def get_received_chunks(self, obj):
+        return list(obj.chunks.order_by('index').values_list('index', flat=True))
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuses refresh tokens revoked at logout; see users.revocation."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken('Token has been revoked')
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            revoke(refresh)
+        return data
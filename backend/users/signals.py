@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CustomUser, Application, PersonalInfo, EducationInfo
+from .authentication import drop_cached_user
+from .stats import snapshot, counter_deltas, apply_deltas
+from .payload_cache import PERSONAL_INFO, EDUCATION_INFO, invalidate_payload
+from .tasks import update_merit_rank, process_uploaded_images
+from .images import IMAGE_FIELDS, pending_image_fields
+from .merit import ranking_values
+from .storage import file_names, update_references
+from .sequences import APPLICATION_NUMBER, FORM_NUMBER, allocate
+
+
+@receiver(post_init, sender=PersonalInfo)
+@receiver(post_init, sender=EducationInfo)
+def remember_ranking_values(sender, instance, **kwargs):
+    instance._ranking_values = ranking_values(instance) if instance.pk else None
+
+
+@receiver([post_save, post_delete], sender=PersonalInfo)
+@receiver([post_save, post_delete], sender=EducationInfo)
+def refresh_merit_rank(sender, instance, **kwargs):
+    """Percentage, dob and casteCategory feed the merit list; re-rank once the write commits."""
+    if kwargs['signal'] is post_save:
+        values = ranking_values(instance)
+        if values == instance._ranking_values:
+            # Nothing the ranking depends on changed
+            return
+        instance._ranking_values = values
+    user_id = instance.user_id
+    transaction.on_commit(lambda: update_merit_rank.delay(user_id))
+
+
+@receiver(pre_save, sender=Application)
+def assign_application_numbers(sender, instance, **kwargs):
+    """Numbers not given explicitly come from users.sequences."""
+    for name in (APPLICATION_NUMBER, FORM_NUMBER):
+        if getattr(instance, name) is None:
+            setattr(instance, name, allocate(name))
+    if instance._state.adding and instance.intermediate_percentage is None:
+        instance.intermediate_percentage = (
+            EducationInfo.objects.filter(user_id=instance.user_id)
+            .values_list('intermediate_percentage', flat=True).first()
+        )
+
+
+@receiver(post_init, sender=EducationInfo)
+def remember_listed_percentage(sender, instance, **kwargs):
+    instance._listed_percentage = instance.__dict__.get('intermediate_percentage') if instance.pk else None
+
+
+@receiver([post_save, post_delete], sender=EducationInfo)
+def update_listed_percentage(sender, instance, **kwargs):
+    """Keeps Application.intermediate_percentage, the applicant list's sort key, in step."""
+    percentage = instance.intermediate_percentage if kwargs['signal'] is post_save else None
+    if kwargs['signal'] is post_save and not kwargs['created'] and percentage == instance._listed_percentage:
+        return
+    Application.objects.filter(user_id=instance.user_id).update(intermediate_percentage=percentage)
+    instance._listed_percentage = percentage
+
+
+@receiver(post_init, sender=Application)
+@receiver(post_init, sender=PersonalInfo)
+@receiver(post_init, sender=EducationInfo)
+def remember_counted_values(sender, instance, **kwargs):
+    """Keeps the values the admission counters last saw, to diff against on save."""
+    instance._counted_values = snapshot(instance) if instance.pk else {}
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_save, sender=PersonalInfo)
+@receiver(post_save, sender=EducationInfo)
+def update_admission_counters(sender, instance, created, **kwargs):
+    old = {} if created else instance._counted_values
+    new = snapshot(instance)
+    apply_deltas(counter_deltas(old, new))
+    instance._counted_values = new
+
+
+@receiver(post_delete, sender=Application)
+@receiver(post_delete, sender=PersonalInfo)
+@receiver(post_delete, sender=EducationInfo)
+def release_admission_counters(sender, instance, **kwargs):
+    apply_deltas(counter_deltas(instance._counted_values, {}))
+    instance._counted_values = {}
+
+
+@receiver([post_save, post_delete], sender=PersonalInfo)
+@receiver([post_save, post_delete], sender=EducationInfo)
+def invalidate_cached_payload(sender, instance, **kwargs):
+    section = PERSONAL_INFO if sender is PersonalInfo else EDUCATION_INFO
+    user_id = instance.user_id
+    updated_at = None if kwargs['signal'] is post_delete else instance.updated_at
+    transaction.on_commit(lambda: invalidate_payload(section, user_id, updated_at))
+
+
+@receiver(post_save, sender=PersonalInfo)
+@receiver(post_save, sender=EducationInfo)
+def queue_image_processing(sender, instance, **kwargs):
+    """New uploads get validated and rendered off the request, once the save commits."""
+    fields = pending_image_fields(instance)
+    if fields:
+        label, pk = sender._meta.label, instance.pk
+        transaction.on_commit(lambda: process_uploaded_images.delay(label, pk, fields))
+
+
+@receiver(post_init, sender=PersonalInfo)
+@receiver(post_init, sender=EducationInfo)
+def remember_document_names(sender, instance, **kwargs):
+    """Keeps the stored files this row referenced when loaded, for the blob refcounts."""
+    instance._document_names = file_names(instance, IMAGE_FIELDS[sender]) if instance.pk else set()
+
+
+@receiver(post_save, sender=PersonalInfo)
+@receiver(post_save, sender=EducationInfo)
+def update_document_references(sender, instance, created, **kwargs):
+    old = set() if created else instance._document_names
+    new = file_names(instance, IMAGE_FIELDS[sender])
+    update_references(old, new)
+    instance._document_names = new
+
+
+@receiver(post_delete, sender=PersonalInfo)
+@receiver(post_delete, sender=EducationInfo)
+def release_document_references(sender, instance, **kwargs):
+    update_references(instance._document_names, set())
+    instance._document_names = set()
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def drop_cached_auth_user(sender, instance, **kwargs):
+    """Authentication reads users from the cache; drop it now and again once committed."""
+    user_id = instance.pk
+    drop_cached_user(user_id)
+    transaction.on_commit(lambda: drop_cached_user(user_id))
@@ -0,0 +1,35 @@
+"""
+SMS sending, modelled on django.core.mail.
+
+SMS_BACKEND names the backend class, like EMAIL_BACKEND does for email:
+users.sms.backends.http talks to the SMS gateway; console, locmem and
+filebased are for development and tests. Views don't send directly: they
+hand messages to users.sms.dispatch, which sends them in batches from a
+background thread.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Messages sent through the locmem backend
+outbox = []
+
+
+class SMSMessage:
+    def __init__(self, to, body):
+        self.to = str(to)
+        self.body = body
+        self.queued_at = None
+
+    def __repr__(self):
+        return f'<SMSMessage to={self.to}>'
+
+
+def get_connection(backend=None, fail_silently=False, **kwargs):
+    """An instance of the SMS backend, SMS_BACKEND unless another is named."""
+    return import_string(backend or settings.SMS_BACKEND)(fail_silently=fail_silently, **kwargs)
+
+
+def send_sms(to, body, fail_silently=False, connection=None):
+    """Sends one message right away, on this thread. Returns the number sent."""
+    connection = connection or get_connection(fail_silently=fail_silently)
+    return connection.send_messages([SMSMessage(to, body)])
@@ -0,0 +1,27 @@
+class BaseSMSBackend:
+    """
+    Base class for SMS backends.
+
+    Subclasses implement send_messages(messages), returning the number of
+    messages sent. With fail_silently, delivery errors are logged and
+    counted instead of raised.
+    """
+
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def send_messages(self, messages):
+        raise NotImplementedError
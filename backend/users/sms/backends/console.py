@@ -0,0 +1,20 @@
+import sys
+import threading
+
+from .base import BaseSMSBackend
+
+
+class SMSBackend(BaseSMSBackend):
+    """Writes messages to stdout."""
+
+    def __init__(self, *args, stream=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send_messages(self, messages):
+        with self._lock:
+            for message in messages:
+                self.stream.write(f'SMS to {message.to}: {message.body}\n')
+            self.stream.flush()
+        return len(messages)
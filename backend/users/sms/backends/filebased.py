@@ -0,0 +1,26 @@
+import datetime
+import os
+import threading
+
+from django.conf import settings
+
+from .base import BaseSMSBackend
+
+
+class SMSBackend(BaseSMSBackend):
+    """Appends messages to a per-day log file under SMS_FILE_PATH."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, *args, file_path=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_path = file_path or settings.SMS_FILE_PATH
+        os.makedirs(self.file_path, exist_ok=True)
+
+    def send_messages(self, messages):
+        now = datetime.datetime.now()
+        path = os.path.join(self.file_path, f'{now:%Y%m%d}.log')
+        with self._lock, open(path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(f'{now.isoformat()}\t{message.to}\t{message.body}\n')
+        return len(messages)
@@ -0,0 +1,145 @@
+"""
+SMS gateway backend.
+
+Posts messages as JSON batches of up to SMS_BATCH_SIZE to SMS_GATEWAY_URL:
+
+    POST <SMS_GATEWAY_URL>
+    Authorization: Bearer <SMS_GATEWAY_API_KEY>
+    {"sender": "<SMS_SENDER_ID>", "messages": [{"to": "...", "body": "..."}, ...]}
+
+Any 2xx response means the whole batch was accepted. Connection errors,
+timeouts, 429 and 5xx are retried up to SMS_GATEWAY_RETRIES times with
+exponential backoff and full jitter; other statuses fail the batch at once.
+Keep-alive connections are pooled per gateway and shared by every backend
+instance in the process, so consecutive sends skip the TCP/TLS handshake.
+"""
+import http.client
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .. import metrics
+from .base import BaseSMSBackend
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_CAP = 10
+
+
+class SMSGatewayError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Up to size idle keep-alive connections to one host."""
+
+    def __init__(self, url, size, timeout):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host, self.port = parts.hostname, parts.port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def connection(self):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            yield connection
+        except BaseException:
+            # Its state is unknown, don't reuse it
+            connection.close()
+            raise
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(url, size, timeout):
+    with _pools_lock:
+        if url not in _pools:
+            _pools[url] = ConnectionPool(url, size, timeout)
+        return _pools[url]
+
+
+class SMSBackend(BaseSMSBackend):
+    def __init__(self, *args, url=None, api_key=None, sender=None, timeout=None, retries=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url = url or settings.SMS_GATEWAY_URL
+        if not self.url:
+            raise SMSGatewayError('SMS_GATEWAY_URL is not set')
+        self.path = urlsplit(self.url).path or '/'
+        self.api_key = api_key or settings.SMS_GATEWAY_API_KEY
+        self.sender = sender or settings.SMS_SENDER_ID
+        self.timeout = timeout or settings.SMS_GATEWAY_TIMEOUT
+        self.retries = settings.SMS_GATEWAY_RETRIES if retries is None else retries
+        self.pool = get_pool(self.url, settings.SMS_GATEWAY_POOL_SIZE, self.timeout)
+
+    def send_messages(self, messages):
+        sent = 0
+        batch_size = settings.SMS_BATCH_SIZE
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            if self._send_batch(batch):
+                sent += len(batch)
+        return sent
+
+    def _post(self, payload):
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        with self.pool.connection() as connection:
+            connection.request('POST', self.path, body=json.dumps(payload).encode(), headers=headers)
+            response = connection.getresponse()
+            # Read the whole body so the connection can be reused
+            response.read()
+            return response.status
+
+    def _send_batch(self, batch):
+        payload = {
+            'sender': self.sender,
+            'messages': [{'to': message.to, 'body': message.body} for message in batch],
+        }
+        for attempt in range(self.retries + 1):
+            started = time.monotonic()
+            try:
+                status = self._post(payload)
+            except (OSError, http.client.HTTPException) as e:
+                error, retryable = f'{type(e).__name__}: {e}', True
+            else:
+                if 200 <= status < 300:
+                    metrics.record_gateway_request(time.monotonic() - started, ok=True)
+                    return True
+                error, retryable = f'HTTP {status}', status == 429 or status >= 500
+            metrics.record_gateway_request(time.monotonic() - started, ok=False)
+
+            if not retryable or attempt == self.retries:
+                break
+            metrics.stats['gateway_retries'] += 1
+            time.sleep(random.uniform(0, min(RETRY_BACKOFF_CAP, settings.SMS_GATEWAY_BACKOFF * 2 ** attempt)))
+
+        logger.error(f"SMS gateway rejected a batch of {len(batch)} after {attempt + 1} attempts: {error}")
+        if not self.fail_silently:
+            raise SMSGatewayError(error)
+        return False
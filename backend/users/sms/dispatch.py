@@ -0,0 +1,72 @@
+"""
+Background SMS dispatch.
+
+dispatch() only puts the message on an in-process queue, so the request
+that triggered it never waits for the gateway. A daemon thread takes
+whatever has queued up, up to SMS_BATCH_SIZE messages, and sends it with
+one backend call. Messages still queued when the process exits are lost;
+for OTPs that only means the applicant asks for a new one.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+
+from . import get_connection, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SMSDispatcher:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def dispatch(self, message):
+        message.queued_at = time.monotonic()
+        self._queue.put(message)
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='sms-dispatch', daemon=True)
+                    self._thread.start()
+
+    def flush(self):
+        """Blocks until everything dispatched so far has been handled."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < settings.SMS_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send(self, batch):
+        try:
+            with get_connection(fail_silently=True) as connection:
+                sent = connection.send_messages(batch)
+        except Exception as e:
+            logger.error(f"Error sending {len(batch)} SMS: {str(e)}")
+            sent = 0
+        # One backend call per batch: it is accepted or rejected as a whole
+        now = time.monotonic()
+        latencies = [now - message.queued_at for message in batch] if sent else []
+        metrics.record_messages(latencies, failed=len(batch) - sent)
+
+
+dispatcher = SMSDispatcher()
+
+
+def dispatch(message):
+    dispatcher.dispatch(message)
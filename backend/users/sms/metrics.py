@@ -0,0 +1,35 @@
+"""
+Per-process SMS delivery counters.
+
+Messages are counted by the dispatcher, gateway requests by the HTTP
+backend. Latency is per message, from dispatch to the gateway accepting it.
+"""
+from collections import Counter
+
+stats = Counter()
+
+
+def record_gateway_request(seconds, ok):
+    stats['gateway_requests'] += 1
+    stats['gateway_seconds_total'] += seconds
+    if not ok:
+        stats['gateway_errors'] += 1
+
+
+def record_messages(latencies, failed):
+    stats['messages_sent'] += len(latencies)
+    stats['messages_failed'] += failed
+    for seconds in latencies:
+        stats['latency_seconds_total'] += seconds
+        stats['latency_seconds_max'] = max(stats['latency_seconds_max'], seconds)
+
+
+def sms_stats():
+    """Counters plus derived averages and error rates."""
+    snapshot = dict(stats)
+    sent, failed = stats['messages_sent'], stats['messages_failed']
+    requests = stats['gateway_requests']
+    snapshot['latency_seconds_avg'] = stats['latency_seconds_total'] / sent if sent else 0.0
+    snapshot['message_error_rate'] = failed / (sent + failed) if sent + failed else 0.0
+    snapshot['gateway_error_rate'] = stats['gateway_errors'] / requests if requests else 0.0
+    return snapshot
@@ -0,0 +1,108 @@
+"""
+Admission statistics counters.
+
+Saves and deletes of Application, PersonalInfo and EducationInfo adjust
+per-dimension tallies in AdmissionCounter (see signals.py), inside the same
+transaction as the write. The dashboard reads one cached snapshot of the
+whole table, which is dropped whenever a counter changes.
+rebuild_admission_stats() recounts from scratch for writes that bypass
+signals, such as bulk_create and QuerySet.update().
+"""
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Application, PersonalInfo, EducationInfo, AdmissionCounter
+
+STATS_CACHE_KEY = 'admission_stats'
+
+# model -> {dimension: field}
+TRACKED_FIELDS = {
+    Application: {
+        'application_status': 'application_status',
+    },
+    PersonalInfo: {
+        'casteCategory': 'casteCategory',
+        'gender': 'gender',
+        'blood_group': 'blood_group',
+    },
+    EducationInfo: {
+        'board': 'intermediate_school_board',
+        'year_of_passing': 'intermediate_year_of_passing',
+    },
+}
+
+_MISSING = object()
+
+
+def snapshot(instance):
+    """Tracked values as loaded; deferred fields are left out rather than fetched."""
+    values = {}
+    for dimension, field in TRACKED_FIELDS[type(instance)].items():
+        value = instance.__dict__.get(field, _MISSING)
+        if value is not _MISSING:
+            values[dimension] = value
+    return values
+
+
+def counter_deltas(old, new):
+    """Counter of (dimension, value) -> change between two snapshots."""
+    deltas = Counter()
+    for dimension in old.keys() | new.keys():
+        before, after = old.get(dimension), new.get(dimension)
+        if before == after:
+            continue
+        if before not in (None, ''):
+            deltas[(dimension, str(before))] -= 1
+        if after not in (None, ''):
+            deltas[(dimension, str(after))] += 1
+    return deltas
+
+
+def apply_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    for (dimension, value), delta in deltas.items():
+        counters = AdmissionCounter.objects.filter(dimension=dimension, value=value)
+        if counters.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                AdmissionCounter.objects.create(dimension=dimension, value=value, count=delta)
+        except IntegrityError:
+            # Created concurrently
+            counters.update(count=F('count') + delta)
+    transaction.on_commit(lambda: cache.delete(STATS_CACHE_KEY))
+
+
+def get_admission_stats():
+    """{dimension: {value: count}} from the cache, or one query over AdmissionCounter."""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = defaultdict(dict)
+        for dimension, value, count in AdmissionCounter.objects.values_list('dimension', 'value', 'count'):
+            if count:
+                stats[dimension][value] = count
+        stats = dict(stats)
+        cache.set(STATS_CACHE_KEY, stats, timeout=None)
+    return stats
+
+
+def rebuild_admission_stats():
+    """Recounts every dimension with GROUP BY queries and replaces the counters."""
+    counters = []
+    for model, fields in TRACKED_FIELDS.items():
+        for dimension, field in fields.items():
+            rows = model.objects.exclude(**{f'{field}__isnull': True}).values_list(field).annotate(total=Count('pk'))
+            counters.extend(
+                AdmissionCounter(dimension=dimension, value=str(value), count=total)
+                for value, total in rows if value != ''
+            )
+    with transaction.atomic():
+        AdmissionCounter.objects.all().delete()
+        AdmissionCounter.objects.bulk_create(counters)
+    cache.delete(STATS_CACHE_KEY)
+    return len(counters)
@@ -0,0 +1,144 @@
+"""
+Content-addressed storage for uploaded documents.
+
+ContentAddressedStorage names every file after the SHA-256 of its content
+(documents/ab/ab12...ef.jpg), so a certificate uploaded again while fixing
+a form, or the same scan uploaded by two siblings, is stored once. The hash
+is computed while the upload is streamed to a temp file beside its final
+location, so large files are never held in memory.
+
+StoredBlob counts the rows whose image fields point at each file. The
+counts are kept by signals.py as rows are saved and deleted, and delete()
+only removes a file once nothing references it. A file saved but never
+referenced (its row failed to save), or released within the grace period
+after it was saved, stays at zero and is removed by the hourly
+sweep_unreferenced_documents task (or `manage.py document_storage --sweep`). Writes that skip signals, such as
+bulk_create, are followed by recount_references().
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+DIRECTORY = 'documents'
+# A saved file has no references until its row is saved too; leave it alone meanwhile
+DELETE_GRACE_PERIOD = timedelta(minutes=10)
+
+
+def _blobs():
+    # Not imported at module level: models.py instantiates this storage while loading
+    return apps.get_model('users', 'StoredBlob').objects
+
+
+def content_name(digest, extension):
+    return f'{DIRECTORY}/{digest[:2]}/{digest}{extension.lower()}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    content_addressed = True
+
+    def get_available_name(self, name, max_length=None):
+        # _save names the file after its content; identical content shares a name
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=directory, suffix='.upload')
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            name = content_name(digest.hexdigest(), os.path.splitext(name)[1])
+
+            with transaction.atomic():
+                # The row lock orders this against delete() of the same file
+                blob, created = _blobs().select_for_update().get_or_create(
+                    name=name, defaults={'size': size, 'last_saved_at': timezone.now()},
+                )
+                if not created:
+                    blob.last_saved_at = timezone.now()
+                    blob.save(update_fields=['last_saved_at'])
+                path = self.path(name)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp, path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        return name
+
+    def delete(self, name):
+        """Removes the file, unless a row still references it or it was only just saved."""
+        with transaction.atomic():
+            blob = _blobs().select_for_update().filter(name=name).first()
+            if blob is not None:
+                if blob.refcount > 0 or blob.last_saved_at > timezone.now() - DELETE_GRACE_PERIOD:
+                    return
+                blob.delete()
+            super().delete(name)
+
+
+def file_names(instance, fields):
+    """Stored names in the given file fields, as loaded; deferred fields are left out."""
+    names = set()
+    for field in fields:
+        value = instance.__dict__.get(field)
+        name = getattr(value, 'name', value)
+        if name:
+            names.add(name)
+    return names
+
+
+def update_references(old_names, new_names):
+    """Moves one row's references from old_names to new_names."""
+    added, released = new_names - old_names, old_names - new_names
+    if added:
+        _blobs().filter(name__in=added).update(refcount=F('refcount') + 1)
+    if released:
+        _blobs().filter(name__in=released).update(refcount=F('refcount') - 1)
+        transaction.on_commit(lambda: delete_unreferenced(released))
+
+
+def delete_unreferenced(names):
+    unreferenced = _blobs().filter(name__in=names, refcount__lte=0).values_list('name', flat=True)
+    for name in unreferenced:
+        storages['documents'].delete(name)
+
+
+def sweep_unreferenced():
+    """Deletes files nothing has referenced since the grace period. Returns how many."""
+    cutoff = timezone.now() - DELETE_GRACE_PERIOD
+    names = list(_blobs().filter(refcount__lte=0, last_saved_at__lt=cutoff).values_list('name', flat=True))
+    delete_unreferenced(names)
+    return len(names)
+
+
+def recount_references():
+    """Recomputes every refcount from the image fields. Returns how many were corrected."""
+    from .images import IMAGE_FIELDS
+
+    counts = Counter()
+    for model, fields in IMAGE_FIELDS.items():
+        for row in model.objects.values_list(*fields).iterator():
+            counts.update({name for name in row if name})
+    corrected = 0
+    with transaction.atomic():
+        for blob in _blobs().select_for_update().only('name', 'refcount'):
+            if blob.refcount != counts[blob.name]:
+                _blobs().filter(pk=blob.pk).update(refcount=counts[blob.name])
+                corrected += 1
+    return corrected
@@ -1,17 +1,135 @@
+import logging
+import time
+from collections import Counter
+
 from celery import shared_task
+from django.apps import apps
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from .models import CustomUser
+from .models import CustomUser, EmailOTP, PhoneOTP, Application, PersonalInfo, EducationInfo
+from .mail_queue import drain_queue
+from . import merit
+from . import images
+from . import uploads
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# Rows that hang off a user; deleted per batch before the users themselves
+USER_DEPENDENTS = (EmailOTP, PhoneOTP, Application, PersonalInfo, EducationInfo)
+
 
 @shared_task
-def delete_unverified_accounts():
-    """Deletes unverified accounts older than 24 hours."""
+def delete_unverified_accounts(batch_size=500, time_budget=60):
+    """
+    Deletes unverified accounts older than 24 hours.
+
+    Walks the candidates in primary-key order, batch_size users at a time,
+    each batch in its own short transaction, and stops starting new batches
+    after time_budget seconds. Returns the number of rows deleted per table.
+    """
     time_threshold = timezone.now() - timedelta(days=1)  # 24 hours
     unverified_users = CustomUser.objects.filter(
         is_email_verified=False,
         is_phone_verified=False,
         date_joined__lte=time_threshold,
     )
-    deleted_count = unverified_users.count()
-    unverified_users.delete()
-    print(f"Deleted {deleted_count} unverified accounts.")
\ No newline at end of file
+    deadline = time.monotonic() + time_budget
+    deleted = Counter()
+    last_pk = 0
+
+    while time.monotonic() < deadline:
+        pks = list(
+            unverified_users.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        with transaction.atomic():
+            # Re-check inside the transaction: someone may have verified meanwhile
+            pks = list(unverified_users.filter(pk__in=pks).values_list('pk', flat=True))
+            for model in USER_DEPENDENTS:
+                deleted.update(model.objects.filter(user_id__in=pks).delete()[1])
+            deleted.update(CustomUser.objects.filter(pk__in=pks).delete()[1])
+
+    deleted = {label: count for label, count in deleted.items() if count}
+    logger.info(f"Deleted {deleted.get(CustomUser._meta.label, 0)} unverified accounts: {deleted}")
+    return deleted
+
+
+@shared_task
+def delete_expired_otps(batch_size=1000, time_budget=60):
+    """
+    Deletes expired and already-verified EmailOTP/PhoneOTP rows.
+
+    Deletes at most batch_size rows per statement and stops after
+    time_budget seconds. Returns each table's row count before and after.
+    """
+    deadline = time.monotonic() + time_budget
+    sizes = {}
+
+    for model in (EmailOTP, PhoneOTP):
+        before = model.objects.count()
+        # One pass per condition: SQLite can't use the expires_at index for an OR
+        for stale in (model.objects.filter(expires_at__lt=timezone.now()), model.objects.filter(is_verified=True)):
+            while time.monotonic() < deadline:
+                pks = list(stale.values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                model.objects.filter(pk__in=pks).delete()
+        sizes[model._meta.label] = {'before': before, 'after': model.objects.count()}
+
+    logger.info(f"OTP table sizes: {sizes}")
+    return sizes
+
+
+@shared_task
+def send_queued_otp_emails():
+    """Sends queued OTP emails in batches over one SMTP connection."""
+    return drain_queue()
+
+
+@shared_task
+def update_merit_rank(user_id):
+    """Re-ranks one applicant after an edit to their education or personal details."""
+    try:
+        merit.update_merit_rank(user_id)
+    except merit.MeritLockTimeout:
+        # The next rebuild_merit_list run picks the change up
+        logger.warning(f"Merit list busy, skipped re-ranking user {user_id}")
+
+
+@shared_task
+def rebuild_merit_list():
+    """Recomputes the whole merit list, closing any gaps left by deleted applicants."""
+    started_at = time.monotonic()
+    ranked = merit.rebuild_merit_list()
+    logger.info(f"Ranked {ranked} applicants in {time.monotonic() - started_at:.1f}s")
+    return ranked
+
+
+@shared_task
+def process_uploaded_images(model_label, pk, fields):
+    """Validates uploaded images, strips EXIF and writes display/thumbnail renditions."""
+    entries = images.process_uploaded_images(apps.get_model(model_label), pk, fields)
+    return {field: entry.get('display') for field, entry in entries.items()}
+
+
+@shared_task
+def delete_stale_uploads():
+    """Deletes abandoned chunked uploads and their temp files."""
+    deleted = uploads.delete_stale_uploads()
+    logger.info(f"Deleted {deleted} stale chunked uploads")
+    return deleted
+
+
+@shared_task
+def sweep_unreferenced_documents():
+    """Deletes stored documents nothing has referenced since the grace period."""
+    deleted = storage.sweep_unreferenced()
+    logger.info(f"Deleted {deleted} unreferenced documents")
+    return deleted
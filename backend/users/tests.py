@@ -73,4 +73,1557 @@
 #         serializer = CustomUserSerializer(data=data)
 #         self.assertTrue(serializer.is_valid())
 
-#     # Add more tests for other serializers
\ No newline at end of file
+#     # Add more tests for other serializers
+
+import datetime
+import csv
+import hashlib
+import io
+import itertools
+import json
+import logging
+import os
+import random
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import images, mail_queue, merit, revocation, sms, storage, tasks, uploads
+from . import metrics as request_metrics
+from .benchmark import compare
+from .log import REDACTED, JSONFormatter, redact
+from .management.commands.benchmark_flow import education_info, personal_info
+from .models import CustomUser, EmailOTP, PhoneOTP, Application, PersonalInfo, EducationInfo, NumberSequence, AdmissionCounter, MeritRank, ChunkedUpload, StoredBlob
+from .sms import SMSMessage, get_connection, metrics
+from .sms.backends.http import SMSGatewayError
+from .otp_store import get_otp_store, CacheOTPStore, DatabaseOTPStore, EMAIL, PHONE, OTP_VALID, OTP_MISSING, OTP_EXPIRED, OTP_INVALID
+from .sms.dispatch import dispatcher
+from .throttles import OTPRequestThrottle, get_client_ip
+from .authentication import CachedJWTAuthentication, user_cache_key
+from .checks import check_mail_queue_cache, check_otp_store_cache, check_sms_gateway
+from .conditional import ConditionalRequestMixin
+from .payload_cache import PERSONAL_INFO, get_payload, invalidate_payload, set_payload
+from .merit import merit_lock, rebuild_merit_list, update_merit_rank
+from .stats import get_admission_stats
+from .sequences import APPLICATION_NUMBER, FORM_NUMBER, SequenceAllocator, format_number
+from .views import send_otp_email
+
+
+def create_applicant(n=1, personal_info=True, education_info=True, application=True):
+    """An applicant with every section filled in, unless told otherwise."""
+    user = CustomUser.objects.create_user(
+        username=f'applicant{n}',
+        password='Str0ng-pass!',
+        email=f'applicant{n}@example.com',
+        phone=9000000000 + n,
+        user_type='applicant',
+        first_name='Test',
+        last_name='Applicant',
+        is_email_verified=True,
+        is_phone_verified=True,
+    )
+    if personal_info:
+        PersonalInfo.objects.create(
+            user=user, dob=datetime.date(2005, 1, 1), gender='female', nationality='Indian',
+            religion='Hindu', aadhar_card=100000 + n, father_name='Father', father_contact=200000 + n,
+            mother_name='Mother', mother_contact=300000 + n, guardian_contact=400000 + n,
+            permanentAddress_Country='India', permanentAddress_State='Bihar',
+            permanentAddress_City='Patna', permanentAddress_PinCode=800001,
+            permanentAddress_Address='Boring Road', is_same_as_permanentAddress=True,
+            blood_group='A+', casteCategory='GEN', caste='General',
+            caste_or_ews_certificate_number=500000 + n,
+        )
+    if education_info:
+        EducationInfo.objects.create(
+            user=user, intermediate_school_name='School', intermediate_school_board='CBSE',
+            intermdiate_grade='A', intermediaate_roll_number=600000 + n,
+            intermediate_obtained_marks=400, intermediate_total_marks=500,
+            intermediate_percentage=80.0, intermediate_year_of_passing=2024,
+            lastappearingexam_year_of_passing=2024,
+        )
+    if application:
+        Application.objects.create(
+            user=user, application_number=n, form_number=n, application_status='pending',
+        )
+    return user
+
+
+class ProfileViewTests(APITestCase):
+    def test_profile_is_one_query(self):
+        user = create_applicant()
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['email'], user.email)
+        self.assertEqual(response.data['personal_info']['casteCategory'], 'GEN')
+        self.assertEqual(response.data['education_info']['intermediate_percentage'], 80.0)
+        self.assertEqual(response.data['application_status'], 'pending')
+
+    def test_profile_image_urls_match_the_section_endpoint(self):
+        user = create_applicant()
+        EducationInfo.objects.filter(user=user).update(intermediate_certificate_image='intermediate.png')
+        self.client.force_authenticate(user)
+        profile = self.client.get(reverse('profile')).data['education_info']
+        section = self.client.get(reverse('education-info')).data
+        self.assertTrue(profile['intermediate_certificate_image'].startswith('http://testserver/'))
+        self.assertEqual(profile['intermediate_certificate_image'], section['intermediate_certificate_image'])
+
+    def test_profile_with_missing_sections(self):
+        user = create_applicant(personal_info=False, education_info=False, application=False)
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['personal_info'])
+        self.assertIsNone(response.data['education_info'])
+        self.assertIsNone(response.data['application_status'])
+
+    def test_profile_requires_authentication(self):
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SMS_BACKEND='users.sms.backends.locmem.SMSBackend')
+class PhoneOTPDeliveryTests(APITestCase):
+    def setUp(self):
+        sms.outbox.clear()
+
+    def test_phone_otp_is_sent_by_sms(self):
+        user = create_applicant()
+        response = self.client.post(reverse('verify-phone'), {'phone': user.phone}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dispatcher.flush()
+        self.assertEqual(len(sms.outbox), 1)
+        self.assertEqual(sms.outbox[0].to, str(user.phone))
+
+        otp = sms.outbox[0].body.rsplit(' ', 1)[-1]
+        response = self.client.put(reverse('verify-phone'), {'phone': user.phone, 'otp': otp}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class FakeGateway(ThreadingHTTPServer):
+    """Records each request; answers with the queued statuses, then 200."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.requests = []
+        self.statuses = []
+        super().__init__(('127.0.0.1', 0), FakeGatewayHandler)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/send'
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append({
+            'path': self.path,
+            'authorization': self.headers['Authorization'],
+            'client_port': self.client_address[1],
+            'payload': json.loads(body),
+        })
+        status_code = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status_code)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(SMS_GATEWAY_API_KEY='test-key', SMS_SENDER_ID='ADMSN', SMS_GATEWAY_BACKOFF=0,
+                   SMS_GATEWAY_RETRIES=2, SMS_BATCH_SIZE=100)
+class HTTPSMSBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.gateway = FakeGateway()
+        threading.Thread(target=self.gateway.serve_forever, daemon=True).start()
+        self.addCleanup(self.gateway.server_close)
+        self.addCleanup(self.gateway.shutdown)
+
+    def connection(self, **kwargs):
+        return get_connection('users.sms.backends.http.SMSBackend', url=self.gateway.url, **kwargs)
+
+    def messages(self, count):
+        return [SMSMessage(9000000000 + i, f'Your OTP is {i:06}') for i in range(count)]
+
+    @override_settings(SMS_BACKEND='users.sms.backends.http.SMSBackend', SMS_GATEWAY_URL=None)
+    def test_refuses_to_send_without_a_gateway(self):
+        with self.assertRaisesMessage(SMSGatewayError, 'SMS_GATEWAY_URL is not set'):
+            get_connection()
+        self.assertEqual([warning.id for warning in check_sms_gateway(None)], ['users.W001'])
+        with override_settings(SMS_BACKEND='users.sms.backends.console.SMSBackend'):
+            self.assertEqual(check_sms_gateway(None), [])
+
+    def test_batches_messages_into_one_request(self):
+        self.assertEqual(self.connection().send_messages(self.messages(3)), 3)
+        self.assertEqual(len(self.gateway.requests), 1)
+        request = self.gateway.requests[0]
+        self.assertEqual(request['path'], '/send')
+        self.assertEqual(request['authorization'], 'Bearer test-key')
+        self.assertEqual(request['payload']['sender'], 'ADMSN')
+        self.assertEqual(request['payload']['messages'][2], {'to': '9000000002', 'body': 'Your OTP is 000002'})
+
+    @override_settings(SMS_BATCH_SIZE=2)
+    def test_splits_batches_and_reuses_the_connection(self):
+        self.assertEqual(self.connection().send_messages(self.messages(5)), 5)
+        self.assertEqual([len(r['payload']['messages']) for r in self.gateway.requests], [2, 2, 1])
+        self.assertEqual(len({r['client_port'] for r in self.gateway.requests}), 1)
+
+    def test_retries_server_errors(self):
+        self.gateway.statuses = [503, 429]
+        retries = metrics.stats['gateway_retries']
+        self.assertEqual(self.connection().send_messages(self.messages(1)), 1)
+        self.assertEqual(len(self.gateway.requests), 3)
+        self.assertEqual(metrics.stats['gateway_retries'] - retries, 2)
+
+    def test_gives_up_after_retries(self):
+        self.gateway.statuses = [503] * 3
+        errors = metrics.stats['gateway_errors']
+        with self.assertRaises(SMSGatewayError):
+            self.connection().send_messages(self.messages(1))
+        self.assertEqual(len(self.gateway.requests), 3)
+        self.assertEqual(metrics.stats['gateway_errors'] - errors, 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.gateway.statuses = [400]
+        self.assertEqual(self.connection(fail_silently=True).send_messages(self.messages(1)), 0)
+        self.assertEqual(len(self.gateway.requests), 1)
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    baseline = {'login': {'requests': 50, 'errors': 0, 'rps': 10.0, 'p50_ms': 100.0, 'p95_ms': 200.0, 'p99_ms': 250.0}}
+
+    def result(self, **changes):
+        return {'login': dict(self.baseline['login'], **changes)}
+
+    def test_within_thresholds(self):
+        self.assertEqual(compare(self.result(p50_ms=140.0, rps=7.5), self.baseline, 50, 30), [])
+
+    def test_regressions(self):
+        regressions = compare(self.result(p50_ms=160.0, rps=6.0, errors=2), self.baseline, 50, 30)
+        self.assertEqual(regressions, [
+            'login: p50 100.0 ms -> 160.0 ms',
+            'login: 10.0 -> 6.0 req/s',
+            'login: 0 -> 2 errors',
+        ])
+
+    def test_new_steps_are_ignored(self):
+        self.assertEqual(compare({**self.result(), 'logout': self.baseline['login']}, self.baseline, 50, 30), [])
+
+
+class QueryBudgetMixin:
+    """
+    assertQueries(n) fails unless the block runs exactly n queries,
+    assertMaxQueries(n) if it runs more. The failure lists every query.
+    On-commit callbacks run inside the block, as they would after a real
+    request, so the queries of signal handlers count too.
+    """
+
+    @contextmanager
+    def assertQueries(self, expected, maximum=False):
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                yield
+        executed = len(context.captured_queries)
+        if executed > expected or (executed != expected and not maximum):
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries, budget {"at most " if maximum else ""}{expected}:\n{queries}')
+
+    def assertMaxQueries(self, maximum):
+        return self.assertQueries(maximum, maximum=True)
+
+
+@override_settings(
+    SMS_BACKEND='users.sms.backends.locmem.SMSBackend',
+    # Hashing cost doesn't change the query count
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    # The store used with Redis in production
+    OTP_STORE_BACKEND='users.otp_store.CacheOTPStore',
+)
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Query budgets of every endpoint in users/urls.py, with a cold cache.
+    Authenticated requests include the one query that loads request.user.
+    Raise a budget only together with the change that needs it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root, CHUNKED_UPLOAD_DIR=f'{cls.media_root}/uploads',
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        )
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        caches['payloads'].clear()
+        self.applicants = [create_applicant(n) for n in range(1, 4)]
+        self.applicant = self.applicants[0]
+        self.admin = CustomUser.objects.create_user(
+            username='admin', password='Str0ng-pass!', email='admin@example.com', phone=9100000000,
+            user_type='admin', first_name='Admin', last_name='User', is_email_verified=True, is_phone_verified=True,
+            is_staff=True,
+        )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_register(self):
+        with self.assertQueries(4):
+            response = self.client.post(reverse('register'), {
+                'username': 'new', 'first_name': 'New', 'last_name': 'Applicant', 'password': 'Str0ng-pass!',
+                'password2': 'Str0ng-pass!', 'email': 'new@example.com', 'phone': 9200000000, 'user_type': 'applicant',
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_login(self):
+        with self.assertQueries(1):
+            response = self.client.post(reverse('login'), {'username': 'applicant1', 'password': 'Str0ng-pass!'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout(self):
+        refresh = RefreshToken.for_user(self.applicant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with self.assertQueries(1):
+            response = self.client.post(reverse('logout'), {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_refresh(self):
+        with self.assertQueries(1):
+            response = self.client.post(reverse('token_refresh'), {'refresh': str(RefreshToken.for_user(self.applicant))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_request_email_otp(self):
+        with self.assertQueries(1):
+            response = self.client.post(reverse('verify-email'), {'email': self.applicant.email}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_verify_email_otp(self):
+        CustomUser.objects.filter(pk=self.applicant.pk).update(is_email_verified=False)
+        otp = get_otp_store().issue(self.applicant, EMAIL, self.applicant.email)
+        with self.assertQueries(2):
+            response = self.client.put(reverse('verify-email'), {'email': self.applicant.email, 'otp': otp}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(CustomUser.objects.get(pk=self.applicant.pk).is_email_verified)
+
+    def test_request_phone_otp(self):
+        with self.assertQueries(1):
+            response = self.client.post(reverse('verify-phone'), {'phone': self.applicant.phone}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dispatcher.flush()
+
+    def test_verify_phone_otp(self):
+        CustomUser.objects.filter(pk=self.applicant.pk).update(is_phone_verified=False)
+        otp = get_otp_store().issue(self.applicant, PHONE, str(self.applicant.phone))
+        with self.assertQueries(2):
+            response = self.client.put(reverse('verify-phone'), {'phone': str(self.applicant.phone), 'otp': otp}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(CustomUser.objects.get(pk=self.applicant.pk).is_phone_verified)
+
+    def test_request_password_reset(self):
+        with self.assertQueries(1):
+            response = self.client.post(reverse('reset-password'), {'email': self.applicant.email}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_reset_password(self):
+        otp = get_otp_store().issue(self.applicant, EMAIL, self.applicant.email)
+        with self.assertQueries(2):
+            response = self.client.put(reverse('reset-password'), {
+                'email': self.applicant.email, 'otp': otp, 'new_password': 'N3w-pass-word!',
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_personal_info(self):
+        self.authenticate(self.applicant)
+        with self.assertQueries(2):
+            response = self.client.get(reverse('personal-info'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Served from the payload cache the second time
+        with self.assertQueries(0):
+            response = self.client.get(reverse('personal-info'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_missing_personal_info(self):
+        user = create_applicant(4, personal_info=False)
+        self.authenticate(user)
+        with self.assertQueries(2):
+            response = self.client.get(reverse('personal-info'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_put_personal_info(self):
+        self.authenticate(self.applicant)
+        data = dict(self.client.get(reverse('personal-info')).data, religion='Buddhist')
+        for field in ('id', 'profile_image', 'caste_or_ews_certificate_image', 'created_at', 'updated_at'):
+            data.pop(field)
+        data = {key: 'Given' if value == '' else value for key, value in data.items() if value is not None}
+        with self.assertQueries(9):
+            response = self.client.put(reverse('personal-info'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+    def test_patch_personal_info(self):
+        self.authenticate(self.applicant)
+        with self.assertQueries(3):
+            response = self.client.patch(reverse('personal-info'), {
+                'religion': 'Buddhist', 'gender': 'female', 'blood_group': 'A+',
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+    def test_get_education_info(self):
+        self.authenticate(self.applicant)
+        with self.assertQueries(2):
+            response = self.client.get(reverse('education-info'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_patch_education_info(self):
+        self.authenticate(self.applicant)
+        # Includes copying the new percentage to Application and re-ranking
+        with self.assertQueries(13):
+            response = self.client.patch(reverse('education-info'), {'intermediate_percentage': 85.0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile(self):
+        self.authenticate(self.applicant)
+        with self.assertQueries(2):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_applicant_list(self):
+        self.authenticate(self.admin)
+        with self.assertQueries(3):
+            response = self.client.get(reverse('applicant-list'), {'count': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_applicant_list_does_not_grow_with_applicants(self):
+        for n in range(4, 10):
+            create_applicant(n)
+        self.authenticate(self.admin)
+        with self.assertQueries(3):
+            response = self.client.get(reverse('applicant-list'), {'count': 'true'})
+        self.assertEqual(len(response.data['results']), 9)
+
+    def test_applicant_export(self):
+        self.authenticate(self.admin)
+        with self.assertQueries(2):
+            response = self.client.get(reverse('applicant-export'), {'output': 'ndjson'})
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_admission_stats(self):
+        self.authenticate(self.admin)
+        with self.assertQueries(2):
+            response = self.client.get(reverse('admission-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_payload_cache_stats(self):
+        self.authenticate(self.admin)
+        with self.assertQueries(1):
+            response = self.client.get(reverse('payload-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def scan(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_chunked_upload(self):
+        self.authenticate(self.applicant)
+        content = self.scan()
+        with self.assertQueries(7):
+            response = self.client.post(reverse('upload-start'), {
+                'target': 'profile_image', 'filename': 'photo.png', 'size': len(content),
+                'sha256': hashlib.sha256(content).hexdigest(),
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        upload_id = response.data['id']
+
+        with self.assertQueries(8):
+            response = self.client.put(
+                reverse('upload-chunk', args=[upload_id, 0]), content, content_type='application/octet-stream',
+                HTTP_X_CHUNK_SHA256=hashlib.sha256(content).hexdigest(),
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        with self.assertQueries(2):
+            response = self.client.get(reverse('upload-detail', args=[upload_id]))
+        self.assertEqual(response.data['received_chunks'], [0])
+
+        # Includes validating the scan and rendering its thumbnails, which run inline here
+        with self.assertMaxQueries(22):
+            response = self.client.post(reverse('upload-detail', args=[upload_id]))
+        self.assertEqual(response.data['status'], 'complete')
+
+
+class StructuredLogTests(APITestCase):
+    def test_redact(self):
+        self.assertEqual(
+            redact({'email': 'a@example.com', 'otp': '123456', 'nested': [{'Password': 'secret'}]}),
+            {'email': 'a@example.com', 'otp': REDACTED, 'nested': [{'Password': REDACTED}]},
+        )
+        self.assertEqual(redact('sent otp: 123456 to a@example.com'), f'sent otp: {REDACTED} to a@example.com')
+
+    def test_json_formatter(self):
+        record = logging.makeLogRecord({
+            'name': 'users.views', 'levelno': logging.INFO, 'levelname': 'INFO',
+            'msg': 'Email OTP %s', 'args': ('otp=654321',), 'request_id': 'abc', 'token': 'xyz',
+        })
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual(entry['message'], f'Email OTP otp={REDACTED}')
+        self.assertEqual(entry['request_id'], 'abc')
+        self.assertEqual(entry['token'], REDACTED)
+
+    def test_request_id_header(self):
+        response = self.client.get(reverse('metrics'), HTTP_X_REQUEST_ID='proxy-1')
+        self.assertEqual(response['X-Request-ID'], 'proxy-1')
+        response = self.client.get(reverse('metrics'), HTTP_X_REQUEST_ID='not valid!')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+
+@override_settings(ADMISSION_YEAR=2025, SEQUENCE_BLOCK_SIZE=10)
+class SequenceAllocatorTests(APITestCase):
+    def test_numbers_are_assigned_on_save(self):
+        first = create_applicant(1, application=False)
+        second = create_applicant(2, application=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            a = Application.objects.create(user=first, application_status='pending')
+        b = Application.objects.create(user=second, application_status='pending')
+        self.assertGreater(b.application_number, a.application_number)
+        self.assertEqual(a.application_number // 10 ** 6, 2025)
+        self.assertEqual(format_number(APPLICATION_NUMBER, 2025000137), 'APP-2025-000137')
+        self.assertEqual(format_number(FORM_NUMBER, a.form_number), f'FORM-2025-{a.form_number % 10 ** 6:06d}')
+
+    def test_one_reservation_per_block(self):
+        allocator = SequenceAllocator()
+        # Inside a transaction the rest of a block is shared once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            numbers = [allocator.allocate('test', 2025)]
+        numbers += [allocator.allocate('test', 2025) for _ in range(9)]
+        with self.captureOnCommitCallbacks(execute=True):
+            numbers.append(allocator.allocate('test', 2025))
+        numbers += [allocator.allocate('test', 2025) for _ in range(4)]
+        self.assertEqual(numbers, [2025000000 + n for n in range(1, 16)])
+        self.assertEqual(NumberSequence.objects.get(name='test', cycle=2025).last_value, 20)
+
+    def test_rolled_back_blocks_are_not_shared(self):
+        allocator = SequenceAllocator()
+        try:
+            with transaction.atomic():
+                self.assertEqual(allocator.allocate('test', 2025), 2025000001)
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        # The reservation rolled back with it; another worker may reserve the block again
+        self.assertEqual(allocator.allocate('test', 2025), 2025000001)
+        self.assertEqual(allocator.allocate('test', 2026), 2026000001)
+
+    def test_allocating_in_a_transaction_while_another_thread_reserves(self):
+        """
+        The other thread waits in its reservation until this thread's
+        transaction is done, as it would for the row this transaction holds.
+        Holding the allocator lock while reserving made that a deadlock.
+        (The in-memory test database can't take a real second writer.)
+        """
+        allocator = SequenceAllocator()
+        last_value = [0]
+        reserving, transaction_done = threading.Event(), threading.Event()
+        waited = []
+
+        def reserve_block(name, cycle, size):
+            if threading.current_thread() is other:
+                reserving.set()
+                waited.append(transaction_done.wait(timeout=5))
+            last_value[0] += size
+            return last_value[0] - size + 1, last_value[0] + 1
+
+        numbers = []
+        other = threading.Thread(target=lambda: numbers.append(allocator.allocate('test', 2025)))
+        with mock.patch('users.sequences.reserve_block', side_effect=reserve_block):
+            other.start()
+            self.assertTrue(reserving.wait(timeout=5))
+            with transaction.atomic():
+                numbers.append(allocator.allocate('test', 2025))
+            transaction_done.set()
+            other.join(timeout=5)
+        self.assertEqual(waited, [True])
+        self.assertEqual(sorted(numbers), [2025000001, 2025000011])
+
+
+@override_settings(ADMISSION_YEAR=2025, SEQUENCE_BLOCK_SIZE=5)
+class SequenceWorkerTests(TransactionTestCase):
+    """
+    Submissions from several workers, interleaved, in autocommit mode as in
+    production. The in-memory test database can't take concurrent writers;
+    manage.py stress_sequences runs the same with threads on a file database.
+    """
+
+    def test_workers_never_clash(self):
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f'worker{i}', email=f'worker{i}@example.com', phone=8000000000 + i,
+                       user_type='applicant')
+            for i in range(60)
+        )
+        workers = [SequenceAllocator() for _ in range(3)]
+        issued = [[] for _ in workers]
+        order = random.Random(0)
+        for user in users:
+            worker = order.randrange(len(workers))
+            numbers = workers[worker].allocate(APPLICATION_NUMBER), workers[worker].allocate(FORM_NUMBER)
+            issued[worker].append(numbers)
+            # Raises IntegrityError on a clash
+            Application.objects.create(
+                user=user, application_number=numbers[0], form_number=numbers[1], application_status='pending',
+            )
+        for numbers in issued:
+            self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(Application.objects.count(), len(users))
+        # One reservation per block of five
+        self.assertLessEqual(NumberSequence.objects.get(name=APPLICATION_NUMBER).last_value, len(users) + 5 * len(workers))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailQueueTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_drains_in_batches(self):
+        for i in range(5):
+            mail_queue.enqueue_email('OTP', f'Your OTP is {i}', f'user{i}@example.com')
+        self.assertEqual(mail_queue.drain_queue(batch_size=2), 5)
+        self.assertEqual(len(mail.outbox), 5)
+        stats = mail_queue.queue_stats()
+        self.assertEqual((stats['sent'], stats['depth'], stats['failed_batches']), (5, 0, 0))
+
+    def test_skips_expired_items(self):
+        seqs = [mail_queue.enqueue_email('OTP', 'Your OTP is 1', f'user{i}@example.com') for i in range(5)]
+        # More items than a batch expired, e.g. during an SMTP outage
+        cache.delete_many([mail_queue._item_key(seq) for seq in seqs[:3]])
+        self.assertEqual(mail_queue.drain_queue(batch_size=2), 0)
+        with mock.patch('users.mail_queue.time.time', return_value=time.time() + mail_queue.QUEUE_CLAIM_GRACE):
+            self.assertEqual(mail_queue.drain_queue(batch_size=2), 2)
+        self.assertEqual([message.to for message in mail.outbox], [['user3@example.com'], ['user4@example.com']])
+        self.assertEqual(mail_queue.queue_depth(), 0)
+
+    def test_waits_for_claimed_items_before_later_ones(self):
+        seqs = [mail_queue.enqueue_email('OTP', 'Your OTP is 1', f'user{i}@example.com') for i in range(3)]
+        # seqs[1] has claimed its number but its enqueue hasn't written the item yet
+        item = cache.get(mail_queue._item_key(seqs[1]))
+        cache.delete(mail_queue._item_key(seqs[1]))
+        self.assertEqual(mail_queue.drain_queue(), 1)
+        self.assertEqual(mail_queue.drain_queue(), 0)
+        cache.set(mail_queue._item_key(seqs[1]), item)
+        self.assertEqual(mail_queue.drain_queue(), 2)
+        self.assertEqual([message.to for message in mail.outbox], [[f'user{i}@example.com'] for i in range(3)])
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    def test_sends_inline_when_worker_cannot_see_the_cache(self):
+        self.assertEqual([warning.id for warning in check_mail_queue_cache(None)], ['users.W002'])
+        with mock.patch('users.views.send_queued_otp_emails.delay') as delay:
+            send_otp_email('a@example.com', '123456')
+        delay.assert_not_called()
+        self.assertEqual([message.to for message in mail.outbox], [['a@example.com']])
+        with mock.patch('users.mail_queue.cache_is_shared', return_value=True):
+            self.assertEqual(check_mail_queue_cache(None), [])
+
+
+class OTPRequestThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def request(self, remote_addr='203.0.113.5', **headers):
+        return SimpleNamespace(method='POST', data={'email': 'a@example.com'}, META={'REMOTE_ADDR': remote_addr, **headers})
+
+    def test_concurrent_burst_stays_within_limit(self):
+        # otp_email is 3/hour
+        barrier = threading.Barrier(10)
+        allowed = []
+
+        def attempt(i):
+            request = self.request(remote_addr=f'203.0.113.{i}')
+            barrier.wait()
+            allowed.append(OTPRequestThrottle().allow_request(request, None))
+
+        threads = [threading.Thread(target=attempt, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 3)
+        # Refused requests took their increments back
+        key = OTPRequestThrottle.cache_format.format(scope='otp_email', ident='a@example.com', window=int(time.time() // 3600))
+        self.assertEqual(cache.get(key), 3)
+        throttle = OTPRequestThrottle()
+        self.assertFalse(throttle.allow_request(self.request(), None))
+        self.assertGreater(throttle.wait(), 0)
+
+    def test_x_real_ip_only_from_trusted_proxies(self):
+        self.assertEqual(get_client_ip(self.request(HTTP_X_REAL_IP='198.51.100.1')), '203.0.113.5')
+        self.assertEqual(get_client_ip(self.request('127.0.0.1', HTTP_X_REAL_IP='198.51.100.1')), '198.51.100.1')
+        with override_settings(TRUSTED_PROXIES=['172.16.0.0/12']):
+            self.assertEqual(get_client_ip(self.request('172.18.0.3', HTTP_X_REAL_IP='198.51.100.1')), '198.51.100.1')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class OTPStoreTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_applicant(1)
+        self.email = self.user.email
+
+    def test_cache_store(self):
+        store = CacheOTPStore()
+        with mock.patch('users.otp_store.generate_otp', side_effect=['111111', '222222', '333333', '444444']):
+            store.issue(self.user, EMAIL, self.email)
+            self.assertEqual(store.consume(EMAIL, self.email, '999999'), OTP_INVALID)
+            self.assertEqual(store.consume(EMAIL, self.email, '111111'), OTP_VALID)
+            self.assertEqual(store.consume(EMAIL, self.email, '111111'), OTP_MISSING)
+
+            # A resend replaces the earlier OTP
+            store.issue(self.user, EMAIL, self.email)
+            store.issue(self.user, EMAIL, self.email)
+            self.assertEqual(store.consume(EMAIL, self.email, '222222'), OTP_INVALID)
+            self.assertEqual(store.consume(EMAIL, self.email, '333333'), OTP_VALID)
+
+            store.issue(self.user, EMAIL, self.email)
+        expired = time.time() + settings.OTP_EXPIRY.total_seconds() + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            self.assertEqual(store.consume(EMAIL, self.email, '444444'), OTP_MISSING)
+
+    def test_cache_store_keeps_resend_issued_while_consuming(self):
+        store = CacheOTPStore()
+        old = store.issue(self.user, EMAIL, self.email)
+        resent = []
+        compare_digest = secrets.compare_digest
+        resend = threading.Thread(target=lambda: resent.append(store.issue(self.user, EMAIL, self.email)))
+
+        def compare_and_resend(a, b):
+            # The resend has to wait until the used OTP is gone
+            resend.start()
+            resend.join(timeout=0.1)
+            return compare_digest(a, b)
+
+        with mock.patch('users.otp_store.secrets.compare_digest', side_effect=compare_and_resend):
+            self.assertEqual(store.consume(EMAIL, self.email, old), OTP_VALID)
+        resend.join()
+        self.assertEqual(store.consume(EMAIL, self.email, resent[0]), OTP_VALID)
+
+    def test_database_store(self):
+        store = DatabaseOTPStore()
+        with mock.patch('users.otp_store.generate_otp', side_effect=['111111', '222222', '333333', '444444']):
+            store.issue(self.user, EMAIL, self.email)
+            self.assertEqual(store.consume(EMAIL, self.email, '999999'), OTP_INVALID)
+            self.assertEqual(store.consume(EMAIL, self.email, '111111'), OTP_VALID)
+            self.assertEqual(store.consume(EMAIL, self.email, '111111'), OTP_MISSING)
+
+            # A resend replaces the earlier OTP
+            store.issue(self.user, EMAIL, self.email)
+            store.issue(self.user, EMAIL, self.email)
+            self.assertEqual(store.consume(EMAIL, self.email, '222222'), OTP_INVALID)
+            self.assertEqual(store.consume(EMAIL, self.email, '333333'), OTP_VALID)
+
+            store.issue(self.user, EMAIL, self.email)
+        EmailOTP.objects.filter(is_verified=False).update(expires_at=timezone.now())
+        self.assertEqual(store.consume(EMAIL, self.email, '444444'), OTP_EXPIRED)
+
+    def test_database_store_accepts_an_otp_once(self):
+        store = DatabaseOTPStore()
+        otp = store.issue(self.user, EMAIL, self.email)
+        # Another request marks the row used between our read and our update
+        filter_ = EmailOTP.objects.filter
+
+        def filter_and_consume(*args, **kwargs):
+            if 'pk' in kwargs:
+                filter_(pk=kwargs['pk']).update(is_verified=True)
+            return filter_(*args, **kwargs)
+
+        with mock.patch.object(EmailOTP.objects, 'filter', side_effect=filter_and_consume):
+            self.assertEqual(store.consume(EMAIL, self.email, otp), OTP_MISSING)
+
+    def test_cache_store_needs_a_shared_cache(self):
+        with override_settings(OTP_STORE_BACKEND='users.otp_store.CacheOTPStore'):
+            self.assertEqual([warning.id for warning in check_otp_store_cache(None)], ['users.W003'])
+        with override_settings(OTP_STORE_BACKEND='users.otp_store.DatabaseOTPStore'):
+            self.assertEqual(check_otp_store_cache(None), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CleanupTaskTests(APITestCase):
+    def create_unverified(self, n, joined_days_ago=2):
+        user = create_applicant(n, personal_info=False, education_info=n % 2 == 0)
+        CustomUser.objects.filter(pk=user.pk).update(
+            is_email_verified=False, is_phone_verified=False,
+            date_joined=timezone.now() - datetime.timedelta(days=joined_days_ago),
+        )
+        DatabaseOTPStore().issue(user, EMAIL, user.email)
+        return user
+
+    def test_deletes_unverified_accounts_in_batches(self):
+        stale = [self.create_unverified(n) for n in range(1, 6)]
+        recent = self.create_unverified(6, joined_days_ago=0)
+        verified = create_applicant(7)
+        with CaptureQueriesContext(connection) as queries:
+            deleted = tasks.delete_unverified_accounts(batch_size=2)
+        self.assertEqual(deleted, {
+            'users.CustomUser': 5, 'users.EmailOTP': 5, 'users.Application': 5, 'users.EducationInfo': 2,
+        })
+        self.assertEqual(set(CustomUser.objects.values_list('pk', flat=True)), {recent.pk, verified.pk})
+        self.assertFalse(EmailOTP.objects.filter(user__in=stale).exists())
+        # Three batches of at most two, then the empty lookup
+        selects = [query for query in queries.captured_queries if 'ORDER BY "users_customuser"."id"' in query['sql']]
+        self.assertEqual(len(selects), 4)
+
+    def test_stops_at_the_time_budget(self):
+        for n in range(1, 6):
+            self.create_unverified(n)
+        # Each monotonic() call moves the clock 10s on: one batch fits in 15s
+        with mock.patch('users.tasks.time.monotonic', side_effect=itertools.count(0, 10)):
+            deleted = tasks.delete_unverified_accounts(batch_size=2, time_budget=15)
+        self.assertEqual(deleted['users.CustomUser'], 2)
+        self.assertEqual(CustomUser.objects.count(), 3)
+
+    def test_keeps_accounts_verified_after_selection(self):
+        users = [self.create_unverified(n) for n in range(1, 3)]
+        atomic = transaction.atomic
+
+        def verify_then_atomic(*args, **kwargs):
+            # Verified between the batch lookup and its transaction
+            CustomUser.objects.filter(pk=users[0].pk).update(is_email_verified=True)
+            return atomic(*args, **kwargs)
+
+        with mock.patch('users.tasks.transaction.atomic', side_effect=verify_then_atomic):
+            deleted = tasks.delete_unverified_accounts()
+        self.assertEqual(deleted, {'users.CustomUser': 1, 'users.EmailOTP': 1, 'users.Application': 1, 'users.EducationInfo': 1})
+        self.assertEqual(list(CustomUser.objects.values_list('pk', flat=True)), [users[0].pk])
+        self.assertTrue(EmailOTP.objects.filter(user=users[0]).exists())
+
+    def test_deletes_expired_and_used_otps(self):
+        user = create_applicant(1, personal_info=False, education_info=False, application=False)
+        now = timezone.now()
+        expired, used, live = EmailOTP.objects.bulk_create(
+            EmailOTP(user=user, email=user.email, otp='123456', expires_at=now + offset, is_verified=is_verified)
+            for offset, is_verified in (
+                (-datetime.timedelta(minutes=1), False),
+                (datetime.timedelta(minutes=5), True),
+                (datetime.timedelta(minutes=5), False),
+            )
+        )
+        PhoneOTP.objects.create(user=user, phone=user.phone, otp='123456', expires_at=now - datetime.timedelta(minutes=1))
+        with CaptureQueriesContext(connection) as queries:
+            sizes = tasks.delete_expired_otps(batch_size=1)
+        self.assertEqual(sizes, {
+            'users.EmailOTP': {'before': 3, 'after': 1},
+            'users.PhoneOTP': {'before': 1, 'after': 0},
+        })
+        self.assertEqual(list(EmailOTP.objects.values_list('pk', flat=True)), [live.pk])
+        # Each pass filters on one column, so SQLite can use the expires_at index
+        self.assertFalse([query for query in queries.captured_queries if ' OR ' in query['sql']])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportApplicantsTests(APITestCase):
+    def import_rows(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        self.addCleanup(os.remove, f.name)
+        call_command('import_applicants', f.name, workers=1, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_import_rebuilds_counters_and_ranks(self):
+        self.import_rows([
+            {
+                'username': f'imported{i}', 'first_name': 'Imported', 'last_name': 'Applicant',
+                'email': f'imported{i}@example.com', 'phone': 9100000000 + i, 'password': 'Str0ng-pass!',
+                # Ignored: imported users are always applicants
+                'user_type': 'admin',
+                **personal_info(i), **education_info(i),
+            }
+            for i in range(2)
+        ])
+        self.assertEqual(CustomUser.objects.filter(user_type='applicant').count(), 2)
+        self.assertEqual(AdmissionCounter.objects.get(dimension='gender', value='female').count, 2)
+        self.assertEqual(sorted(MeritRank.objects.values_list('overall_rank', flat=True)), [1, 2])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdmissionsStaffTests(APITestCase):
+    def setUp(self):
+        create_applicant(1)
+        self.staff = CustomUser.objects.create_user(
+            username='staff', password='Str0ng-pass!', email='staff@example.com', phone=9200000000,
+            user_type='admin', is_staff=True,
+        )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_registering_as_admin_grants_nothing(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'intruder', 'first_name': 'In', 'last_name': 'Truder', 'password': 'Str0ng-pass!',
+            'password2': 'Str0ng-pass!', 'email': 'intruder@example.com', 'phone': 9300000000, 'user_type': 'admin',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['user']['user_type'], 'applicant')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        for name in ('applicant-export', 'applicant-list', 'admission-stats'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, status.HTTP_403_FORBIDDEN, name)
+
+    def test_staff_only(self):
+        # user_type alone isn't enough
+        self.authenticate(CustomUser.objects.create_user(
+            username='typed', password='Str0ng-pass!', email='typed@example.com', phone=9400000000, user_type='admin',
+        ))
+        self.assertEqual(self.client.get(reverse('admission-stats')).status_code, status.HTTP_403_FORBIDDEN)
+        self.authenticate(self.staff)
+        self.assertEqual(self.client.get(reverse('admission-stats')).status_code, status.HTTP_200_OK)
+
+    def test_export_rejects_invalid_filters(self):
+        self.authenticate(self.staff)
+        for params in ({'min_percentage': 'abc'}, {'created_after': 'zzz'}, {'application_status': 'lost'}):
+            response = self.client.get(reverse('applicant-export'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        response = self.client.get(reverse('applicant-export'), {'min_percentage': '50', 'created_after': '2000-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 2)
+
+
+class ApplicantListTests(APITestCase):
+    def setUp(self):
+        self.applicants = [create_applicant(n) for n in range(1, 6)]
+        staff = CustomUser.objects.create_user(
+            username='staff', password='Str0ng-pass!', email='staff@example.com', phone=9200000000, is_staff=True,
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(staff).access_token}')
+
+    def test_rejects_invalid_filters(self):
+        for params in ({'min_percentage': 'abc'}, {'created_after': 'zzz'}, {'year_of_passing': 'next'}):
+            response = self.client.get(reverse('applicant-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_percentage_ordering_follows_edits(self):
+        for n, user in enumerate(self.applicants, start=1):
+            education = user.educationinfo
+            education.intermediate_percentage = 50 + n
+            education.save()
+        # Ordered on Application's own copy of the percentage
+        self.assertEqual(Application.objects.get(user=self.applicants[0]).intermediate_percentage, 51)
+
+        usernames, url = [], reverse('applicant-list') + '?ordering=percentage&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            usernames += [row['username'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(usernames, [f'applicant{n}' for n in range(5, 0, -1)])
+
+        response = self.client.get(reverse('applicant-list'), {'min_percentage': '54'})
+        self.assertEqual(len(response.data['results']), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MeritRankTests(APITestCase):
+    def ranks(self):
+        return list(MeritRank.objects.order_by('user_id').values_list('user_id', 'overall_rank', 'category_rank'))
+
+    def test_incremental_updates_match_a_rebuild(self):
+        order = random.Random(0)
+        users = [create_applicant(n) for n in range(1, 13)]
+        rebuild_merit_list()
+        for step in range(60):
+            user = order.choice(users)
+            action = order.random()
+            if action < 0.1 and not hasattr(user, 'added'):
+                # An applicant who has only now filled in both sections
+                user = create_applicant(100 + step)
+                user.added = True
+                users.append(user)
+            elif action < 0.15:
+                EducationInfo.objects.filter(user=user).delete()
+            else:
+                # Few distinct values, so ties fall through to the later sort keys
+                EducationInfo.objects.filter(user=user).update(intermediate_percentage=order.choice([70.0, 80.0, 90.0]))
+                PersonalInfo.objects.filter(user=user).update(
+                    dob=datetime.date(2005, order.randint(1, 2), 1), casteCategory=order.choice(['GEN', 'OBC', 'SC']),
+                )
+            # The signals queue this for after commit, which never comes in a TestCase
+            update_merit_rank(user.pk)
+            incremental = self.ranks()
+            rebuild_merit_list()
+            self.assertEqual(incremental, self.ranks(), f'step {step}')
+
+    def test_lock_release_leaves_a_later_holder_alone(self):
+        cache.clear()
+        with merit_lock():
+            # Held past MERIT_LOCK_TIMEOUT: it expires and another writer takes it
+            cache.delete(merit.MERIT_LOCK_KEY)
+            self.assertTrue(cache.add(merit.MERIT_LOCK_KEY, 'other', timeout=merit.MERIT_LOCK_TIMEOUT))
+        self.assertEqual(cache.get(merit.MERIT_LOCK_KEY), 'other')
+        cache.delete(merit.MERIT_LOCK_KEY)
+        with merit_lock():
+            pass
+        self.assertIsNone(cache.get(merit.MERIT_LOCK_KEY))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdmissionStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def stats(self):
+        return get_admission_stats()
+
+    def test_counters_follow_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            users = [create_applicant(n) for n in range(1, 4)]
+        self.assertEqual(self.stats()['application_status'], {'pending': 3})
+        self.assertEqual(self.stats()['casteCategory'], {'GEN': 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            info = users[0].personalinfo
+            info.casteCategory = 'OBC'
+            info.save()
+            application = users[1].application
+            application.application_status = 'approved'
+            application.save()
+            users[2].delete()
+        stats = self.stats()
+        self.assertEqual(stats['casteCategory'], {'GEN': 1, 'OBC': 1})
+        self.assertEqual(stats['application_status'], {'pending': 1, 'approved': 1})
+        self.assertEqual(stats['gender'], {'female': 2})
+
+    def test_reconcile_after_drift(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(1, 3):
+                create_applicant(n)
+        # QuerySet.update skips the signals
+        PersonalInfo.objects.update(casteCategory='SC')
+        self.assertEqual(self.stats()['casteCategory'], {'GEN': 2})
+        call_command('reconcile_admission_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats()['casteCategory'], {'SC': 2})
+
+    def test_staff_only(self):
+        applicant = create_applicant(1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(applicant).access_token}')
+        self.assertEqual(self.client.get(reverse('admission-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ConditionalWriteTests(APITestCase):
+    def setUp(self):
+        self.applicant = create_applicant(1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.applicant).access_token}')
+
+    def test_stale_if_match(self):
+        etag = self.client.get(reverse('education-info'))['ETag']
+        response = self.client.patch(reverse('education-info'), {'intermdiate_grade': 'B'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(reverse('education-info'), {'intermdiate_grade': 'C'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_concurrent_writes_with_the_same_etag(self):
+        etag = self.client.get(reverse('personal-info'))['ETag']
+        # Both requests pass the early check, as when they arrive together;
+        # only the conditional write tells them apart
+        with mock.patch.object(ConditionalRequestMixin, 'precondition_failed_response', return_value=None):
+            first = self.client.patch(reverse('personal-info'), {'religion': 'Jain', 'gender': 'female', 'blood_group': 'A+'}, format='json', HTTP_IF_MATCH=etag)
+            second = self.client.patch(reverse('personal-info'), {'religion': 'Sikh', 'gender': 'female', 'blood_group': 'A+'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(first.status_code, status.HTTP_200_OK, first.data)
+        self.assertEqual(second.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(PersonalInfo.objects.get(user=self.applicant).religion, 'Jain')
+
+
+class PayloadCacheTests(APITestCase):
+    def setUp(self):
+        caches['payloads'].clear()
+        self.applicant = create_applicant(1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.applicant).access_token}')
+
+    def test_tombstone_refuses_older_versions(self):
+        info = PersonalInfo.objects.get(user=self.applicant)
+        committed = info.updated_at
+        invalidate_payload(PERSONAL_INFO, self.applicant.pk, committed)
+        # A reader that loaded the row before the commit
+        info.updated_at = committed - datetime.timedelta(seconds=1)
+        set_payload(PERSONAL_INFO, info, {'religion': 'old'})
+        self.assertIsNone(get_payload(PERSONAL_INFO, self.applicant.pk))
+        info.updated_at = committed
+        set_payload(PERSONAL_INFO, info, {'religion': 'new'})
+        self.assertEqual(get_payload(PERSONAL_INFO, self.applicant.pk).data, {'religion': 'new'})
+
+    def test_tombstone_after_delete_refuses_everything(self):
+        info = PersonalInfo.objects.get(user=self.applicant)
+        invalidate_payload(PERSONAL_INFO, self.applicant.pk)
+        set_payload(PERSONAL_INFO, info, {'religion': 'deleted'})
+        self.assertIsNone(get_payload(PERSONAL_INFO, self.applicant.pk))
+
+    def test_save_invalidates(self):
+        self.assertEqual(self.client.get(reverse('personal-info')).data['religion'], 'Hindu')
+        self.assertIsNotNone(get_payload(PERSONAL_INFO, self.applicant.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('personal-info'), {'religion': 'Jain', 'gender': 'female', 'blood_group': 'A+'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertIsNone(get_payload(PERSONAL_INFO, self.applicant.pk))
+        self.assertEqual(self.client.get(reverse('personal-info')).data['religion'], 'Jain')
+
+    @override_settings(ALLOWED_HOSTS=['one.example.com', 'two.example.com'])
+    def test_cached_urls_follow_the_requesting_host(self):
+        EducationInfo.objects.filter(user=self.applicant).update(intermediate_certificate_image='certificates/a.jpg')
+        first = self.client.get(reverse('education-info'), HTTP_HOST='one.example.com')
+        second = self.client.get(reverse('education-info'), HTTP_HOST='two.example.com')
+        self.assertRegex(first.data['intermediate_certificate_image'], r'^http://one\.example\.com/.*certificates/a\.jpg$')
+        self.assertEqual(
+            second.data['intermediate_certificate_image'],
+            first.data['intermediate_certificate_image'].replace('one.example.com', 'two.example.com'),
+        )
+        self.assertIsNone(second.data['lastappearingexam_marksheet_image'])
+
+
+class ImageProcessingTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.info = PersonalInfo.objects.get(user=create_applicant(1))
+
+    def upload(self, content, name='photo.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.info.profile_image.save(name, ContentFile(content))
+        self.info.refresh_from_db()
+        return self.info.image_renditions['profile_image']
+
+    def test_renditions(self):
+        # 2000x1000 stored, rotated 90 degrees by its EXIF orientation
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000), 'white').save(buffer, 'JPEG', exif=exif)
+        entry = self.upload(buffer.getvalue())
+
+        self.assertEqual(entry['source'], self.info.profile_image.name)
+        with self.info.profile_image.open('rb') as f:
+            original = Image.open(f)
+            self.assertEqual(original.size, (1000, 2000))
+            self.assertFalse(original.getexif())
+        for kind, size in images.RENDITIONS.items():
+            with default_storage.open(entry[kind]) as f:
+                rendition = Image.open(f)
+                self.assertEqual(rendition.format, images.RENDITION_FORMAT)
+                self.assertEqual(rendition.size, (size[0] // 2, size[1]))
+        self.assertEqual(images.pending_image_fields(self.info), [])
+
+    def test_invalid_image_is_rejected(self):
+        with self.assertLogs('users.images', 'WARNING') as logs:
+            entry = self.upload(b'not an image at all')
+        self.assertEqual(entry, {'source': self.info.profile_image.name, 'error': 'invalid image'})
+        self.assertIn('Rejected', logs.output[0])
+        # Recorded, so it isn't processed again on the next save
+        self.assertEqual(images.pending_image_fields(self.info), [])
+
+
+class ChunkedUploadTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root, CHUNKED_UPLOAD_DIR=f'{cls.media_root}/uploads',
+            CHUNKED_UPLOAD_MAX_OPEN=2, CHUNKED_UPLOAD_MAX_RESERVED=1000,
+        )
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.applicant = create_applicant(1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.applicant).access_token}')
+
+    def start(self, size=100):
+        return self.client.post(reverse('upload-start'), {'target': 'profile_image', 'filename': 'scan.png', 'size': size}, format='json')
+
+    def put_chunk(self, upload_id, content=b'x' * 100):
+        return self.client.put(
+            reverse('upload-chunk', args=[upload_id, 0]), content, content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=hashlib.sha256(content).hexdigest(),
+        )
+
+    def test_open_upload_limit(self):
+        first = self.start()
+        self.assertEqual(self.start().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.start().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Cancelling frees a slot, and removes the temp file
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('upload-detail', args=[first.data['id']]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(os.path.exists(f'{self.media_root}/uploads/{first.data["id"]}.part'))
+        self.assertEqual(self.start().status_code, status.HTTP_201_CREATED)
+
+    def test_reserved_bytes_limit(self):
+        self.assertEqual(self.start(size=600).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.start(size=500).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.start(size=400).status_code, status.HTTP_201_CREATED)
+
+    def test_expired_uploads_do_not_count(self):
+        self.start()
+        self.start()
+        ChunkedUpload.objects.update(created_at=timezone.now() - datetime.timedelta(days=2))
+        self.assertEqual(self.start().status_code, status.HTTP_201_CREATED)
+
+    def test_chunk_after_completion(self):
+        upload_id = self.start().data['id']
+        ChunkedUpload.objects.filter(pk=upload_id).update(status='complete')
+        self.assertEqual(self.put_chunk(upload_id).status_code, status.HTTP_409_CONFLICT)
+
+    def test_chunk_after_temp_file_removed(self):
+        upload_id = self.start().data['id']
+        uploads.discard_temp_file(ChunkedUpload.objects.get(pk=upload_id))
+        self.assertEqual(self.put_chunk(upload_id).status_code, status.HTTP_410_GONE)
+        self.assertEqual(self.client.post(reverse('upload-detail', args=[upload_id])).status_code, status.HTTP_410_GONE)
+
+    def test_chunk_racing_completion(self):
+        # Loaded while uploading, completed (and its temp file removed) before the write
+        upload = ChunkedUpload.objects.get(pk=self.start().data['id'])
+        uploads.discard_temp_file(upload)
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status='complete')
+        with self.assertRaises(uploads.UploadComplete):
+            uploads.write_chunk(upload, 0, io.BytesIO(b'x' * 100), hashlib.sha256(b'x' * 100).hexdigest())
+
+
+class DocumentStorageTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.infos = [PersonalInfo.objects.get(user=create_applicant(n)) for n in (1, 2)]
+        # Not an image, so processing rejects it without writing a copy
+        self.content = os.urandom(64)
+
+    def attach(self, info, content, name='scan.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            info.caste_or_ews_certificate_image.save(name, ContentFile(content))
+        return info.caste_or_ews_certificate_image
+
+    def stored(self, name):
+        return storages['documents'].exists(name)
+
+    def expire_grace_period(self):
+        StoredBlob.objects.update(last_saved_at=timezone.now() - storage.DELETE_GRACE_PERIOD - datetime.timedelta(seconds=1))
+
+    def test_identical_uploads_share_a_file(self):
+        first = self.attach(self.infos[0], self.content, 'a.jpg')
+        second = self.attach(self.infos[1], self.content, 'b.jpg')
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(first.name, storage.content_name(hashlib.sha256(self.content).hexdigest(), '.jpg'))
+        blob = StoredBlob.objects.get()
+        self.assertEqual((blob.refcount, blob.size), (2, len(self.content)))
+
+    def test_file_is_kept_while_referenced(self):
+        name = self.attach(self.infos[0], self.content).name
+        self.attach(self.infos[1], self.content)
+        self.expire_grace_period()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.infos[0].delete()
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(self.stored(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.infos[1].delete()
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertFalse(self.stored(name))
+
+    def test_sweep_deletes_files_released_within_the_grace_period(self):
+        name = self.attach(self.infos[0], self.content).name
+        self.attach(self.infos[0], os.urandom(64))
+        # Replaced straight after saving, so delete() left it for the sweep
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 0)
+        self.assertTrue(self.stored(name))
+        self.assertEqual(tasks.sweep_unreferenced_documents(), 0)
+
+        self.expire_grace_period()
+        self.assertEqual(tasks.sweep_unreferenced_documents(), 1)
+        self.assertFalse(self.stored(name))
+        self.assertTrue(self.stored(self.infos[0].caste_or_ews_certificate_image.name))
+
+    def test_recount_references(self):
+        name = self.attach(self.infos[0], self.content).name
+        StoredBlob.objects.update(refcount=5)
+        self.assertEqual(storage.recount_references(), 1)
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+
+
+class AuthUserCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_applicant(1)
+
+    def get_profile(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return self.client.get(reverse('profile'))
+
+    def test_cache_holds_no_password(self):
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+        self.assertNotIn(self.user.password, repr(cache.get(user_cache_key(self.user.pk))))
+        user = CachedJWTAuthentication().get_user(self.token)
+        self.assertEqual((user.pk, user.username, user.email), (self.user.pk, self.user.username, self.user.email))
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+        # Loaded on demand
+        with self.assertNumQueries(1):
+            self.assertEqual(user.password, self.user.password)
+
+    def test_save_drops_the_entry(self):
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.get_profile()
+        self.user.email = 'changed@example.com'
+        self.user.save()
+        self.assertEqual(self.get_profile().data['user']['email'], 'changed@example.com')
+
+    def test_verification_drops_the_entry(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_email_verified=False)
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.get_profile()
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        otp = get_otp_store().issue(self.user, EMAIL, self.user.email)
+        response = self.client.put(reverse('verify-email'), {'email': self.user.email, 'otp': otp}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertTrue(CachedJWTAuthentication().get_user(self.token).is_email_verified)
+
+    def test_deactivation(self):
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change(self):
+        # simplejwt's modules share the api_settings object read at import
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.token = RefreshToken.for_user(self.user).access_token
+            self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+            self.user.set_password('An0ther-pass!')
+            self.user.save()
+            self.assertEqual(self.get_profile().status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RevocationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_applicant(1)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def refresh_token(self):
+        return self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+
+    def test_refresh_after_logout(self):
+        self.assertEqual(self.refresh_token().status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('logout'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh_token().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_reaches_other_workers(self):
+        running = revocation.RevocationFilter()
+        running.sync()
+        revocation.revoke(self.refresh)
+        # Entries are read one sync after their number is first seen
+        running.sync()
+        running.sync()
+        self.assertIn(self.refresh['jti'], running)
+        # A worker starting now loads the whole log
+        with mock.patch.object(revocation, 'revocation_filter', revocation.RevocationFilter()):
+            self.assertTrue(revocation.is_revoked(self.refresh))
+
+    @mock.patch.object(revocation, 'FILTER_CAPACITY', 4)
+    def test_full_filter_rotates(self):
+        worker = revocation.RevocationFilter()
+        tokens = [RefreshToken.for_user(self.user) for _ in range(10)]
+        for token in tokens:
+            revocation.revoke(token)
+        worker.sync()
+        self.assertEqual(len(worker.generations), 3)
+        self.assertTrue(all(token['jti'] in worker for token in tokens))
+        seq = worker.seq
+        worker.sync()
+        # Not reloaded from the log
+        self.assertEqual(worker.seq, seq)
+
+        # Generations go once everything in them has expired
+        lifetime = settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
+        with mock.patch('time.monotonic', return_value=time.monotonic() + lifetime):
+            worker.sync()
+        self.assertEqual(len(worker.generations), 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncRegisterTests(APITestCase):
+    def register(self, name, n, **extra):
+        payload = {
+            'username': f'{n}', 'first_name': 'New', 'last_name': 'Applicant',
+            'email': f'{n}@EXAMPLE.COM', 'phone': 9500000000 + len(n),
+            'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!', **extra,
+        }
+        if name == 'register':
+            return self.client.post(reverse(name), payload, format='json')
+        return async_to_sync(self.async_client.post)(reverse(name), payload, content_type='application/json')
+
+    def test_same_user_as_the_sync_view(self):
+        responses = {
+            name: self.register(name, name, user_type='admin', is_staff=True, is_superuser=True)
+            for name in ('register', 'async-register')
+        }
+        for name, response in responses.items():
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            user = CustomUser.objects.get(username=name)
+            self.assertEqual(user.email, f'{name}@example.com')
+            self.assertEqual((user.user_type, user.is_staff, user.is_superuser), ('applicant', False, False))
+            self.assertTrue(user.check_password('Str0ng-pass!'))
+
+        sync_user, async_user = (response.json()['user'] for response in responses.values())
+        differing = {'id', 'username', 'email', 'phone', 'created_at', 'updated_at'}
+        self.assertEqual(sync_user.keys(), async_user.keys())
+        self.assertEqual(
+            {key: value for key, value in sync_user.items() if key not in differing},
+            {key: value for key, value in async_user.items() if key not in differing},
+        )
+
+    def test_same_validation_errors(self):
+        responses = [
+            self.register(name, name, password2='Different-pass!')
+            for name in ('register', 'async-register')
+        ]
+        self.assertEqual([response.status_code for response in responses], [400, 400])
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertFalse(CustomUser.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+])
+class AsyncLoginTests(TransactionTestCase):
+    """authenticate() runs in password_hashing_pool, on its own connection, so nothing may sit in a test transaction."""
+
+    def setUp(self):
+        self.user = create_applicant(1, personal_info=False, education_info=False, application=False)
+
+    def login(self, name='async-login', password='Str0ng-pass!', username='applicant1'):
+        payload = {'username': username, 'password': password}
+        if name == 'login':
+            return self.client.post(reverse(name), payload, content_type='application/json')
+        return async_to_sync(self.async_client.post)(reverse(name), payload, content_type='application/json')
+
+    def test_same_responses_as_the_sync_view(self):
+        for name in ('login', 'async-login'):
+            response = self.login(name)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['user']['username'], 'applicant1')
+            self.assertEqual(self.login(name, password='Wrong-pass!').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_goes_through_authenticate(self):
+        failed = mock.Mock()
+        user_login_failed.connect(failed)
+        self.addCleanup(user_login_failed.disconnect, failed)
+        self.assertEqual(self.login(password='Wrong-pass!').status_code, status.HTTP_401_UNAUTHORIZED)
+        failed.assert_called_once()
+
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Passwords hashed with an older hasher are upgraded on login
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            is_active=True, password=make_password('Str0ng-pass!', hasher='pbkdf2_sha1'),
+        )
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).password.startswith('md5$'))
+
+
+class RequestMetricsTests(SimpleTestCase):
+    def record(self):
+        request_metrics.record_request('users/profile/', 'GET', 200, 0.01, 1, 0.001, 100)
+
+    def test_exited_threads_hand_their_shard_on(self):
+        self.record()
+        shards = len(request_metrics._shards)
+        for _ in range(20):
+            thread = threading.Thread(target=self.record)
+            thread.start()
+            thread.join()
+        # Each thread reused the one the previous thread left
+        self.assertLessEqual(len(request_metrics._shards), shards + 1)
+        routes, statuses = request_metrics._merged()
+        self.assertGreaterEqual(statuses['users/profile/', 'GET', 200], 21)
+
+    def test_endpoint_is_off_without_a_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'http_requests_total', response.content)
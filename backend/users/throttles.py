@@ -0,0 +1,132 @@
+import ipaddress
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+def _is_trusted_proxy(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.TRUSTED_PROXIES)
+
+
+def get_client_ip(request):
+    """
+    Client address as seen by nginx (X-Real-IP) when the request came
+    through one of TRUSTED_PROXIES, otherwise REMOTE_ADDR: anyone else
+    could set the header to dodge the per-IP limit.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    if _is_trusted_proxy(remote_addr):
+        return request.META.get('HTTP_X_REAL_IP') or remote_addr
+    return remote_addr
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Sliding-window rate limit over several identities at once.
+
+    Each identity keeps one counter for the current fixed window and one for
+    the previous window. The previous count is weighted by how much of it
+    still overlaps the sliding window. A check reads the previous counts
+    with one get_many and increments the current ones first, comparing the
+    incremented values, so concurrent requests can't all pass a check made
+    before any of them counted; a refused request takes its increments back.
+
+    Subclasses define get_identities(request) returning (scope, ident) pairs;
+    the rate for each scope comes from DEFAULT_THROTTLE_RATES.
+    """
+    cache = cache
+    cache_format = 'throttle:{scope}:{ident}:{window}'
+    throttled_methods = ('POST',)
+
+    def get_identities(self, request):
+        raise NotImplementedError
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), duration
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if request.method not in self.throttled_methods:
+            return True
+
+        now = time.time()
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        checks = []
+        for scope, ident in self.get_identities(request):
+            if ident in (None, '') or not rates.get(scope):
+                continue
+            limit, duration = self.parse_rate(rates[scope])
+            window = int(now // duration)
+            checks.append((scope, str(ident), limit, duration, window))
+
+        previous_counts = self.cache.get_many([
+            self.cache_format.format(scope=scope, ident=ident, window=window - 1)
+            for scope, ident, limit, duration, window in checks
+        ])
+
+        counted = []
+        waits = []
+        for scope, ident, limit, duration, window in checks:
+            key = self.cache_format.format(scope=scope, ident=ident, window=window)
+            current = self.increment(key, duration)
+            counted.append(key)
+            previous = previous_counts.get(self.cache_format.format(scope=scope, ident=ident, window=window - 1), 0)
+            elapsed = now - window * duration
+            # current includes this request; the others seen so far are current - 1
+            estimate = previous * (1 - elapsed / duration) + current - 1
+            if estimate >= limit:
+                waits.append(self.compute_wait(limit, duration, elapsed, current - 1, previous))
+        if waits:
+            for key in counted:
+                try:
+                    self.cache.decr(key)
+                except ValueError:
+                    pass
+            self.wait_seconds = max(waits)
+            return False
+        return True
+
+    def increment(self, key, duration):
+        # Live for two windows: one as current, one as previous
+        self.cache.add(key, 0, timeout=duration * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.set(key, 1, timeout=duration * 2)
+            return 1
+
+    def compute_wait(self, limit, duration, elapsed, current, previous):
+        """Seconds until the weighted count drops below the limit again."""
+        if current < limit:
+            # The previous window's weight has to decay far enough
+            return max(duration * (1 - (limit - current) / previous) - elapsed, 0)
+        # Only once this window becomes the previous one, and then decays
+        return (duration - elapsed) + duration * (1 - limit / current)
+
+    def wait(self):
+        if self.wait_seconds is None:
+            return None
+        return max(math.ceil(self.wait_seconds), 1)
+
+
+class OTPRequestThrottle(SlidingWindowThrottle):
+    """Limits OTP requests per email, per phone and per client IP."""
+
+    def get_identities(self, request):
+        data = request.data if hasattr(request.data, 'get') else {}
+        return [
+            ('otp_email', data.get('email')),
+            ('otp_phone', data.get('phone')),
+            ('otp_ip', get_client_ip(request)),
+        ]
@@ -0,0 +1,223 @@
+"""
+Chunked, resumable uploads for large certificate scans.
+
+A client starts an upload with the file's size (and optionally its SHA-256),
+then PUTs numbered chunks in any order, each with an X-Chunk-SHA256 header.
+Every chunk is streamed from the request body straight to its offset in a
+per-upload temp file while being hashed, so memory use doesn't depend on the
+chunk or file size. A chunk whose checksum doesn't match is not recorded and
+can simply be sent again; GET on the upload lists the chunks already stored,
+which is all a client needs to resume. Completing the upload attaches the
+temp file to the target image field, which hands it to the usual
+post-upload image processing.
+
+Every open upload reserves its full size on disk, so a user may only have
+CHUNKED_UPLOAD_MAX_OPEN of them, reserving CHUNKED_UPLOAD_MAX_RESERVED bytes
+in total, at once. Uploads expire after CHUNKED_UPLOAD_EXPIRY or can be
+cancelled to free their share sooner.
+"""
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from rest_framework import status
+
+from .images import IMAGE_FIELDS
+from .models import ChunkedUpload, CustomUser, UploadChunk
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 64 * 1024
+
+# target name -> model holding that image field
+TARGETS = {field: model for model, fields in IMAGE_FIELDS.items() for field in fields}
+
+
+class UploadError(Exception):
+    """A request that can't be applied to the upload; the message is safe to show."""
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class UploadLimitExceeded(UploadError):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+
+
+class UploadComplete(UploadError):
+    status_code = status.HTTP_409_CONFLICT
+
+    def __init__(self, message='This upload is already complete.'):
+        super().__init__(message)
+
+
+class UploadExpired(UploadError):
+    """The temp file is gone: the upload expired or was cancelled."""
+    status_code = status.HTTP_410_GONE
+
+    def __init__(self, message='This upload has expired. Start it again.'):
+        super().__init__(message)
+
+
+def temp_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def start_upload(user, target, filename, size, chunk_size=None, sha256=''):
+    """Creates the upload and preallocates its temp file."""
+    if target not in TARGETS:
+        raise UploadError(f'Invalid target. Choose one of: {", ".join(TARGETS)}.')
+    if not 0 < size <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f'File size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.')
+    chunk_size = chunk_size or settings.CHUNKED_UPLOAD_CHUNK_SIZE
+    if not 0 < chunk_size <= settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunk size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes.')
+
+    with transaction.atomic():
+        # Serializes this user's starts, so two of them can't both fit under the limits
+        CustomUser.objects.select_for_update().filter(pk=user.pk).exists()
+        cutoff = timezone.now() - settings.CHUNKED_UPLOAD_EXPIRY
+        open_uploads = ChunkedUpload.objects.filter(
+            user=user, status='uploading', created_at__gte=cutoff,
+        ).aggregate(count=Count('pk'), reserved=Sum('size'))
+        if open_uploads['count'] >= settings.CHUNKED_UPLOAD_MAX_OPEN:
+            raise UploadLimitExceeded(
+                f'You already have {open_uploads["count"]} uploads in progress. '
+                'Complete or cancel one before starting another.'
+            )
+        if (open_uploads['reserved'] or 0) + size > settings.CHUNKED_UPLOAD_MAX_RESERVED:
+            raise UploadLimitExceeded(
+                f'Uploads in progress may total at most {settings.CHUNKED_UPLOAD_MAX_RESERVED} bytes. '
+                'Complete or cancel one before starting another.'
+            )
+        upload = ChunkedUpload.objects.create(
+            user=user,
+            target=target,
+            filename=os.path.basename(filename)[:255],
+            size=size,
+            chunk_size=chunk_size,
+            sha256=sha256.lower(),
+        )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    with open(temp_path(upload), 'wb') as f:
+        f.truncate(size)
+    return upload
+
+
+def write_chunk(upload, index, stream, checksum):
+    """
+    Streams one chunk from stream into place, verifying its length and SHA-256.
+
+    Sending a chunk again overwrites it, so retries are safe.
+    """
+    if upload.status != 'uploading':
+        raise UploadComplete()
+    if not 0 <= index < upload.total_chunks:
+        raise UploadError(f'Chunk index must be between 0 and {upload.total_chunks - 1}.')
+    if not checksum:
+        raise UploadError('X-Chunk-SHA256 header is required.')
+
+    # Forget any earlier copy first: once we start writing it's overwritten
+    UploadChunk.objects.filter(upload=upload, index=index).delete()
+    expected = upload.chunk_length(index)
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        f = open(temp_path(upload), 'r+b')
+    except FileNotFoundError:
+        # Completed or cancelled since it was loaded, or expired
+        if ChunkedUpload.objects.filter(pk=upload.pk, status='complete').exists():
+            raise UploadComplete()
+        raise UploadExpired()
+    with f:
+        f.seek(index * upload.chunk_size)
+        for block in iter(lambda: stream.read(READ_BLOCK_SIZE), b''):
+            received += len(block)
+            if received > expected:
+                break
+            digest.update(block)
+            f.write(block)
+
+    if received != expected:
+        raise UploadError(f'Chunk {index} must be exactly {expected} bytes.')
+    if digest.hexdigest() != checksum.lower():
+        raise UploadError(f'Chunk {index} checksum mismatch.')
+
+    UploadChunk.objects.update_or_create(
+        upload=upload, index=index,
+        defaults={'size': received, 'sha256': digest.hexdigest()},
+    )
+    return received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(upload):
+    """Checks every chunk arrived and attaches the file to the target image field."""
+    model = TARGETS[upload.target]
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().filter(pk=upload.pk).first()
+        if upload is None:
+            raise UploadExpired()
+        if upload.status != 'uploading':
+            raise UploadComplete()
+        path = temp_path(upload)
+        if not os.path.exists(path):
+            raise UploadExpired()
+        missing = set(range(upload.total_chunks)) - set(upload.chunks.values_list('index', flat=True))
+        if missing:
+            raise UploadError(f'Missing chunks: {sorted(missing)}.')
+
+        if upload.sha256 and file_sha256(path) != upload.sha256:
+            raise UploadError('File checksum mismatch.')
+
+        instance = model.objects.filter(user_id=upload.user_id).first()
+        if instance is None:
+            raise UploadError(f'Save your {model._meta.verbose_name} before attaching documents.')
+
+        with open(path, 'rb') as f:
+            # FieldFile.save() copies in chunks and saves the instance, which
+            # queues the image processing
+            getattr(instance, upload.target).save(upload.filename, File(f), save=True)
+
+        upload.status = 'complete'
+        upload.completed_at = timezone.now()
+        upload.save(update_fields=['status', 'completed_at'])
+        transaction.on_commit(lambda: discard_temp_file(upload))
+    logger.info(f"Attached upload {upload.pk} ({upload.size} bytes) to {model._meta.label}.{upload.target}")
+    return instance
+
+
+def cancel_upload(upload):
+    """Deletes an upload in progress and its temp file, freeing its share of the limits."""
+    with transaction.atomic():
+        deleted, _ = ChunkedUpload.objects.filter(pk=upload.pk, status='uploading').delete()
+        if not deleted:
+            raise UploadComplete()
+        transaction.on_commit(lambda: discard_temp_file(upload))
+
+
+def discard_temp_file(upload):
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def delete_stale_uploads(older_than=None):
+    """Deletes uploads started more than CHUNKED_UPLOAD_EXPIRY ago, with their temp files."""
+    cutoff = timezone.now() - (older_than or settings.CHUNKED_UPLOAD_EXPIRY)
+    stale = list(ChunkedUpload.objects.filter(created_at__lt=cutoff))
+    for upload in stale:
+        discard_temp_file(upload)
+    ChunkedUpload.objects.filter(pk__in=[upload.pk for upload in stale]).delete()
+    return len(stale)
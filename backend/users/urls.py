@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import RegisterView, LoginView, EmailVerificationView, PhoneVerificationView, ResetPasswordView, PersonalInfoView, EducationInfoView, LogoutView
+from .views import RegisterView, LoginView, EmailVerificationView, PhoneVerificationView, ResetPasswordView, PersonalInfoView, EducationInfoView, LogoutView, ApplicantExportView, ApplicantListView, AdmissionStatsView, ProfileView, PayloadCacheStatsView, ChunkedUploadView, ChunkedUploadDetailView, UploadChunkView
+from .async_views import AsyncRegisterView, AsyncLoginView, AsyncEmailVerificationView, AsyncPhoneVerificationView, AsyncResetPasswordView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
@@ -10,6 +11,20 @@ urlpatterns = [
     path('verify-email/', EmailVerificationView.as_view(), name='verify-email'),
     path('verify-phone/', PhoneVerificationView.as_view(), name='verify-phone'),
     path('reset-password/', ResetPasswordView.as_view(), name='reset-password'),
+    # Async variants of the above, for ASGI deployments
+    path('async/register/', AsyncRegisterView.as_view(), name='async-register'),
+    path('async/login/', AsyncLoginView.as_view(), name='async-login'),
+    path('async/verify-email/', AsyncEmailVerificationView.as_view(), name='async-verify-email'),
+    path('async/verify-phone/', AsyncPhoneVerificationView.as_view(), name='async-verify-phone'),
+    path('async/reset-password/', AsyncResetPasswordView.as_view(), name='async-reset-password'),
     path('personal-info/', PersonalInfoView.as_view(), name='personal-info'),
     path('education-info/', EducationInfoView.as_view(), name='education-info'),
+    path('profile/', ProfileView.as_view(), name='profile'),
+    path('applicants/', ApplicantListView.as_view(), name='applicant-list'),
+    path('applicants/export/', ApplicantExportView.as_view(), name='applicant-export'),
+    path('stats/', AdmissionStatsView.as_view(), name='admission-stats'),
+    path('cache-stats/', PayloadCacheStatsView.as_view(), name='payload-cache-stats'),
+    path('uploads/', ChunkedUploadView.as_view(), name='upload-start'),
+    path('uploads/<uuid:upload_id>/', ChunkedUploadDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload-chunk'),
 ]
\ No newline at end of file
@@ -1,42 +1,77 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
 from rest_framework.views import APIView
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from django.core.cache import cache
 from django.db import transaction
-import random
-import datetime
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.utils.crypto import constant_time_compare
+import io
 import logging
 from rest_framework.permissions import IsAuthenticated
 
-from .serializers import CustomUserSerializer, PersonalInfoSerializer, EducationInfoSerializer
-from .models import CustomUser, EmailOTP, PhoneOTP, PersonalInfo, EducationInfo
+from .serializers import CustomUserSerializer, PersonalInfoSerializer, EducationInfoSerializer, ApplicantListSerializer, ApplicantFilterSerializer, ProfileSerializer, ChunkedUploadSerializer
+from .models import CustomUser, Application, PersonalInfo, EducationInfo, ChunkedUpload
+from .mail_queue import enqueue_email, worker_can_drain
+from .otp_store import get_otp_store, EMAIL, PHONE, OTP_VALID, OTP_MISSING, OTP_EXPIRED, OTP_INVALID
+from .tasks import send_queued_otp_emails
+from .throttles import OTPRequestThrottle
+from .permissions import IsAdmissionsStaff
+from .exports import export_queryset, stream_csv, stream_ndjson
+from .pagination import ApplicationKeysetPagination
+from .stats import get_admission_stats
+from .conditional import ConditionalRequestMixin
+from .payload_cache import PERSONAL_INFO, EDUCATION_INFO, absolute_urls, get_payload, set_payload, payload_cache_stats
+from .uploads import UploadError, start_upload, write_chunk, complete_upload, cancel_upload
+from .revocation import revoke
+from .authentication import drop_cached_user
+from . import metrics
+from .sms import SMSMessage
+from .sms.dispatch import dispatch as dispatch_sms
 
 logger = logging.getLogger(__name__)  # Logging for error tracking
 
-# Rate limit settings
-# EMAIL_OTP_LIMIT = "email_otp_limit_{email}"  # Lines to remove before prod
-# PHONE_OTP_LIMIT = "phone_otp_limit_{phone}"  # Lines to remove before prod
-# OTP_REQUEST_LIMIT = 3  # Max OTPs allowed per hour  # Lines to remove before prod
+OTP_ERRORS = {
+    OTP_MISSING: 'No OTP found. Request a new one.',
+    OTP_EXPIRED: 'OTP expired. Request a new one.',
+    OTP_INVALID: 'Invalid OTP',
+}
 
 
 def send_otp_email(email, otp):
-    """Sends OTP via email with error handling."""
+    """Queues the OTP email; send_queued_otp_emails delivers it off the request."""
     subject = "Email Verification OTP"
     message = f"Your OTP is {otp}"
-    email_from = settings.EMAIL_HOST_USER
-    recipient_list = [email]
+    enqueue_email(subject, message, email)
 
+    if not worker_can_drain():
+        # A worker can't see this process's cache; drain here instead
+        send_queued_otp_emails.apply()
+        return
     try:
-        send_mail(subject, message, email_from, recipient_list)
-        print(f"Email sent to: {email}")  # Line to remove before prod
+        send_queued_otp_emails.delay()
     except Exception as e:
-        logger.error(f"Error sending OTP email to {email}: {str(e)}")
-        print(f"Error sending email to {email}: {str(e)}")  # Line to remove before prod
+        # Still queued; the periodic send_queued_otp_emails run will pick it up
+        logger.error(f"Error scheduling OTP email to {email}: {str(e)}")
+
+
+def send_otp_sms(phone, otp):
+    """Hands the OTP SMS to the background dispatcher (users.sms.dispatch)."""
+    dispatch_sms(SMSMessage(phone, f"Your OTP is {otp}"))
+
+
+def mark_verified(flag, **lookup):
+    """Sets one of the user's verification flags without loading the user."""
+    user_id = CustomUser.objects.filter(**lookup).values_list('pk', flat=True).first()
+    CustomUser.objects.filter(pk=user_id).update(**{flag: True}, updated_at=timezone.now())
+    # update() skips the signal that drops the cached auth user
+    drop_cached_user(user_id)
 
 
 class RegisterView(generics.CreateAPIView):
@@ -44,56 +79,52 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = CustomUserSerializer
 
     def create(self, request, *args, **kwargs):
-        print("RegisterView - create called")  # Line to remove before prod
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
             refresh = RefreshToken.for_user(user)
-            print("RegisterView - User created successfully")  # Line to remove before prod
+            logger.info(f"Registered user {user.pk}")
             return Response({
                 'user': serializer.data,
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
             }, status=status.HTTP_201_CREATED)
         else:
-            print(f"RegisterView - Serializer errors: {serializer.errors}")  # Line to remove before prod
+            logger.info(f"Registration rejected: invalid {', '.join(serializer.errors)}")
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class LoginView(APIView):
     def post(self, request):
-        print("LoginView - post called")  # Line to remove before prod
         username = request.data.get('username')
         password = request.data.get('password')
 
         if not username or not password:
-            print("LoginView - Username or password not provided")  # Line to remove before prod
             return Response({'error': 'Please provide both username and password'},
                             status=status.HTTP_400_BAD_REQUEST)
 
         user = authenticate(username=username, password=password)
 
         if user:
-            print(f"LoginView - User authenticated: {username}")  # Line to remove before prod
             if not user.is_email_verified:
-                print(f"LoginView - Email not verified for: {username}")  # Line to remove before prod
+                logger.info(f"Login refused for user {user.pk}: email not verified")
                 return Response({'error': 'Email verification required.'},
                                 status=status.HTTP_401_UNAUTHORIZED)
 
             if not user.is_phone_verified:
-                print(f"LoginView - Phone not verified for: {username}")  # Line to remove before prod
+                logger.info(f"Login refused for user {user.pk}: phone not verified")
                 return Response({'error': 'Phone verification required.'},
                                 status=status.HTTP_401_UNAUTHORIZED)
 
             refresh = RefreshToken.for_user(user)
-            print(f"LoginView - Login successful for: {username}")  # Line to remove before prod
+            logger.info(f"Logged in user {user.pk}", extra={'sample_rate': settings.LOG_SUCCESS_SAMPLE_RATE})
             return Response({
                 'user': CustomUserSerializer(user).data,
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
             })
         else:
-            print(f"LoginView - Invalid credentials for: {username}")  # Line to remove before prod
+            logger.info("Login failed: invalid credentials")
             return Response({'error': 'Invalid credentials'},
                             status=status.HTTP_401_UNAUTHORIZED)
 
@@ -101,247 +132,179 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        """Logout user by blacklisting the refresh token"""
-        print("LogoutView - post called")  # Line to remove before prod
+        """Logout user by revoking the refresh token"""
         try:
             refresh_token = request.data.get('refresh')
             if not refresh_token:
-                print("LogoutView - Refresh token not provided")  # Line to remove before prod
                 return Response({'error': 'Refresh token is required'}, 
                               status=status.HTTP_400_BAD_REQUEST)
 
             token = RefreshToken(refresh_token)
-            token.blacklist()
+            if token.get(api_settings.USER_ID_CLAIM) != request.user.pk:
+                raise TokenError('Token belongs to another user')
+            revoke(token)
             
-            print(f"LogoutView - User {request.user.username} logged out successfully")  # Line to remove before prod
+            logger.info(f"Logged out user {request.user.pk}", extra={'sample_rate': settings.LOG_SUCCESS_SAMPLE_RATE})
             return Response({'message': 'Logged out successfully'}, 
                           status=status.HTTP_200_OK)
         except Exception as e:
-            print(f"LogoutView - Error: {str(e)}")  # Line to remove before prod
+            logger.warning(f"Logout rejected for user {request.user.pk}: {str(e)}")
             return Response({'error': 'Invalid token'}, 
                           status=status.HTTP_400_BAD_REQUEST)
 
 class EmailVerificationView(APIView):
+    throttle_classes = [OTPRequestThrottle]  # POST only
+
     def post(self, request):
         """Send OTP for email verification"""
-        print("EmailVerificationView - post called")  # Line to remove before prod
         email = request.data.get('email')
 
         if not email:
-            print("EmailVerificationView - Email not provided")  # Line to remove before prod
             return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         user = CustomUser.objects.filter(email=email).first()
         if not user:
-            print(f"EmailVerificationView - User not found for email: {email}")  # Line to remove before prod
+            logger.info("Email OTP requested for an unknown email")
             return Response({'error': 'User not found. Register first.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Rate limit OTP requests
-        # cache_key = EMAIL_OTP_LIMIT.format(email=email)  # Lines to remove before prod
-        # otp_count = cache.get(cache_key, 0)  # Lines to remove before prod
-        # if otp_count >= OTP_REQUEST_LIMIT:  # Lines to remove before prod
-        #     print(f"EmailVerificationView - OTP request limit reached for: {email}")  # Line to remove before prod
-        #     return Response({'error': 'OTP request limit reached. Try again later.'},  # Lines to remove before prod
-        #                     status=status.HTTP_429_TOO_MANY_REQUESTS)  # Lines to remove before prod
-
-        otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        expires_at = timezone.now() + datetime.timedelta(minutes=10)
-
-        EmailOTP.objects.create(user=user, email=email, otp=otp, expires_at=expires_at)
+        otp = get_otp_store().issue(user, EMAIL, email)
 
         send_otp_email(email, otp)
 
-        # cache.set(cache_key, otp_count + 1, timeout=3600)  # Limit resets every hour  # Lines to remove before prod
-        print(f"EmailVerificationView - OTP sent successfully to: {email}, OTP: {otp}")  # Line to remove before prod
+        logger.info(f"Email OTP sent to user {user.pk}")
 
         return Response({'message': 'OTP sent successfully'})
 
     def put(self, request):
         """Verify email OTP"""
-        print("EmailVerificationView - put called")  # Line to remove before prod
         email = request.data.get('email')
         otp = request.data.get('otp')
 
         if not email or not otp:
-            print("EmailVerificationView - Email or OTP not provided")  # Line to remove before prod
             return Response({'error': 'Email and OTP are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        email_otp = EmailOTP.objects.filter(email=email, is_verified=False).order_by('-created_at').first()
-        if not email_otp:
-            print(f"EmailVerificationView - No OTP found for email: {email}")  # Line to remove before prod
-            return Response({'error': 'No OTP found. Request a new one.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if email_otp.expires_at < timezone.now():
-            print(f"EmailVerificationView - OTP expired for email: {email}")  # Line to remove before prod
-            return Response({'error': 'OTP expired. Request a new one.'}, status=status.HTTP_400_BAD_REQUEST)
+        result = get_otp_store().consume(EMAIL, email, otp)
+        if result != OTP_VALID:
+            logger.info(f"Email OTP {result}")
+            return Response({'error': OTP_ERRORS[result]}, status=status.HTTP_400_BAD_REQUEST)
 
-        if email_otp.otp != otp:
-            print(f"EmailVerificationView - Invalid OTP for email: {email}")  # Line to remove before prod
-            return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
+        # The consumed OTP already proved the email belongs to a user
+        mark_verified('is_email_verified', email=email)
 
-        email_otp.is_verified = True
-        email_otp.save()
-
-        user = CustomUser.objects.filter(email=email).first()
-        if user:
-            user.is_email_verified = True
-            user.save()
-
-        print(f"EmailVerificationView - Email verified successfully for: {email}")  # Line to remove before prod
+        logger.info("Email verified")
         return Response({'message': 'Email verified successfully'})
 
 
 class PhoneVerificationView(APIView):
+    throttle_classes = [OTPRequestThrottle]  # POST only
+
     def post(self, request):
         """Send OTP for phone verification"""
-        print("PhoneVerificationView - post called")  # Line to remove before prod
         phone = request.data.get('phone')
 
         if not phone:
-            print("PhoneVerificationView - Phone number not provided")  # Line to remove before prod
             return Response({'error': 'Phone number is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         user = CustomUser.objects.filter(phone=phone).first()
         if not user:
-            print(f"PhoneVerificationView - User not found for phone: {phone}")  # Line to remove before prod
+            logger.info("Phone OTP requested for an unknown phone number")
             return Response({'error': 'User not found. Register first.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Rate limit OTP requests
-        # cache_key = PHONE_OTP_LIMIT.format(phone=phone)  # Lines to remove before prod
-        # otp_count = cache.get(cache_key, 0)  # Lines to remove before prod
-        # if otp_count >= OTP_REQUEST_LIMIT:  # Lines to remove before prod
-        #     print(f"PhoneVerificationView - OTP request limit reached for: {phone}")  # Line to remove before prod
-        #     return Response({'error': 'OTP request limit reached. Try again later.'},  # Lines to remove before prod
-        #                     status=status.HTTP_429_TOO_MANY_REQUESTS)  # Lines to remove before prod
-
-        otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        expires_at = timezone.now() + datetime.timedelta(minutes=10)
+        otp = get_otp_store().issue(user, PHONE, phone)
+        send_otp_sms(phone, otp)
 
-        PhoneOTP.objects.create(user=user, phone=phone, otp=otp, expires_at=expires_at)
-
-        # TODO: Integrate SMS Gateway to send OTP via SMS
-
-        # cache.set(cache_key, otp_count + 1, timeout=3600)  # Limit resets every hour  # Lines to remove before prod
-        print(f"PhoneVerificationView - OTP sent successfully to: {phone}, OTP: {otp}")  # Line to remove before prod
+        logger.info(f"Phone OTP sent to user {user.pk}")
 
         return Response({'message': 'OTP sent successfully'})
 
     def put(self, request):
         """Verify phone OTP"""
-        print("PhoneVerificationView - put called")  # Line to remove before prod
         phone = request.data.get('phone')
         otp = request.data.get('otp')
 
         if not phone or not otp:
-            print("PhoneVerificationView - Phone or OTP not provided")  # Line to remove before prod
             return Response({'error': 'Phone number and OTP are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        phone_otp = PhoneOTP.objects.filter(phone=phone, is_verified=False).order_by('-created_at').first()
-        if not phone_otp:
-            print(f"PhoneVerificationView - No OTP found for phone: {phone}")  # Line to remove before prod
-            return Response({'error': 'No OTP found. Request a new one.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if phone_otp.expires_at < timezone.now():
-            print(f"PhoneVerificationView - OTP expired for phone: {phone}")  # Line to remove before prod
-            return Response({'error': 'OTP expired. Request a new one.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if phone_otp.otp != otp:
-            print(f"PhoneVerificationView - Invalid OTP for phone: {phone}")  # Line to remove before prod
-            return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
+        result = get_otp_store().consume(PHONE, phone, otp)
+        if result != OTP_VALID:
+            logger.info(f"Phone OTP {result}")
+            return Response({'error': OTP_ERRORS[result]}, status=status.HTTP_400_BAD_REQUEST)
 
-        phone_otp.is_verified = True
-        phone_otp.save()
+        # The consumed OTP already proved the phone belongs to a user
+        mark_verified('is_phone_verified', phone=phone)
 
-        user = CustomUser.objects.filter(phone=phone).first()
-        if user:
-            user.is_phone_verified = True
-            user.save()
-
-        print(f"PhoneVerificationView - Phone verified successfully for: {phone}")  # Line to remove before prod
+        logger.info("Phone number verified")
         return Response({'message': 'Phone number verified successfully'})
 
 
 class ResetPasswordView(APIView):
+    throttle_classes = [OTPRequestThrottle]  # POST only
+
     def post(self, request):
         """Send OTP for password reset"""
-        print("ResetPasswordView - post called")  # Line to remove before prod
         email = request.data.get('email')
 
         if not email:
-            print("ResetPasswordView - Email not provided")  # Line to remove before prod
             return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         user = CustomUser.objects.filter(email=email).first()
         if not user:
-            print(f"ResetPasswordView - User not found for email: {email}")  # Line to remove before prod
+            logger.info("Password reset requested for an unknown email")
             return Response({'error': 'User not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Rate limit OTP requests
-        # cache_key = EMAIL_OTP_LIMIT.format(email=email)  # Lines to remove before prod
-        # otp_count = cache.get(cache_key, 0)  # Lines to remove before prod
-        # if otp_count >= OTP_REQUEST_LIMIT:  # Lines to remove before prod
-        #     print(f"ResetPasswordView - OTP request limit reached for: {email}")  # Line to remove before prod
-        #     return Response({'error': 'OTP request limit reached. Try again later.'},  # Lines to remove before prod
-        #                     status=status.HTTP_429_TOO_MANY_REQUESTS)  # Lines to remove before prod
-
-        otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        expires_at = timezone.now() + datetime.timedelta(minutes=10)
-
-        EmailOTP.objects.create(user=user, email=email, otp=otp, expires_at=expires_at)
+        otp = get_otp_store().issue(user, EMAIL, email)
         send_otp_email(email, otp)
 
-        # cache.set(cache_key, otp_count + 1, timeout=3600)  # Limit resets every hour  # Lines to remove before prod
-        print(f"ResetPasswordView - Password reset OTP sent successfully to: {email}, OTP: {otp}")  # Line to remove before prod
+        logger.info(f"Password reset OTP sent to user {user.pk}")
 
         return Response({'message': 'Password reset OTP sent successfully'})
 
     def put(self, request):
         """Reset password with OTP verification"""
-        print("ResetPasswordView - put called")  # Line to remove before prod
         email = request.data.get('email')
         otp = request.data.get('otp')
         new_password = request.data.get('new_password')
 
         if not email or not otp or not new_password:
-            print("ResetPasswordView - Email, OTP, or new password not provided")  # Line to remove before prod
             return Response({'error': 'Email, OTP and new password are required'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        email_otp = EmailOTP.objects.filter(email=email, is_verified=False).order_by('-created_at').first()
-        if not email_otp:
-            print(f"ResetPasswordView - No OTP found for email: {email}")  # Line to remove before prod
-            return Response({'error': 'No OTP found. Request a new one.'},
+        result = get_otp_store().consume(EMAIL, email, otp)
+        if result != OTP_VALID:
+            logger.info(f"Password reset OTP {result}")
+            return Response({'error': OTP_ERRORS[result]},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if email_otp.expires_at < timezone.now():
-            print(f"ResetPasswordView - OTP expired for email: {email}")  # Line to remove before prod
-            return Response({'error': 'OTP expired. Request a new one.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        if email_otp.otp != otp:
-            print(f"ResetPasswordView - Invalid OTP for email: {email}")  # Line to remove before prod
-            return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
-
         user = CustomUser.objects.filter(email=email).first()
         if user:
             user.set_password(new_password)
             user.save()
-            email_otp.is_verified = True
-            email_otp.save()
 
-            print(f"ResetPasswordView - Password reset successful for: {email}")  # Line to remove before prod
+            logger.info(f"Password reset for user {user.pk}")
             return Response({'message': 'Password reset successful'})
 
-        print(f"ResetPasswordView - User not found for email: {email}")  # Line to remove before prod
+        logger.info("Password reset for an unknown email")
         return Response({'error': 'User not found'}, status=status.HTTP_400_BAD_REQUEST)
-class PersonalInfoView(APIView):
+class PersonalInfoView(ConditionalRequestMixin, APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
         """Retrieve personal information."""
-        personal_info, created = PersonalInfo.objects.get_or_create(user=request.user)
+        cached = get_payload(PERSONAL_INFO, request.user.pk)
+        if cached:
+            return (
+                self.not_modified_response(request, cached)
+                or self.with_validators(Response(cached.data), cached)
+            )
+        personal_info = PersonalInfo.objects.filter(user=request.user).first()
+        if personal_info is None:
+            return Response({'error': 'Personal information not found'}, status=status.HTTP_404_NOT_FOUND)
+        not_modified = self.not_modified_response(request, personal_info)
+        if not_modified:
+            return not_modified
         serializer = PersonalInfoSerializer(personal_info)
-        return Response(serializer.data)
+        set_payload(PERSONAL_INFO, personal_info, serializer.data)
+        return self.with_validators(Response(serializer.data), personal_info)
 
     def post(self, request, *args, **kwargs):
         """Create new personal information."""
@@ -354,32 +317,228 @@ class PersonalInfoView(APIView):
     def put(self, request, *args, **kwargs):
         """Update personal information."""
         personal_info = PersonalInfo.objects.get_or_create(user=request.user)[0]
+        precondition_failed = self.precondition_failed_response(request, personal_info)
+        if precondition_failed:
+            return precondition_failed
         serializer = PersonalInfoSerializer(personal_info, data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
-            return Response(serializer.data)
+            self.save_if_unmodified(request, personal_info, lambda: serializer.save(user=request.user))
+            return self.with_validators(Response(serializer.data), personal_info)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def patch(self, request, *args, **kwargs):
         """Partially update personal information."""
         personal_info = PersonalInfo.objects.get_or_create(user=request.user)[0]
+        precondition_failed = self.precondition_failed_response(request, personal_info)
+        if precondition_failed:
+            return precondition_failed
         serializer = PersonalInfoSerializer(personal_info, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save(user=request.user)
-            return Response(serializer.data)
+            self.save_if_unmodified(request, personal_info, lambda: serializer.save(user=request.user))
+            return self.with_validators(Response(serializer.data), personal_info)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class EducationInfoView(generics.RetrieveUpdateAPIView):
+class ProfileView(APIView):
+    """
+    Everything the application summary page needs in one request:
+    user, personal info, education info and application status.
+    Sections the applicant hasn't filled in yet are null.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = (
+            CustomUser.objects
+            .select_related('personalinfo', 'educationinfo', 'application')
+            .get(pk=request.user.pk)
+        )
+        # The request makes image URLs absolute, as on the section endpoints
+        return Response(ProfileSerializer(user, context={'request': request}).data)
+
+class EducationInfoView(ConditionalRequestMixin, generics.RetrieveUpdateAPIView):
     """
     API view for managing education information.
-    GET: Retrieve education information
-    PUT/PATCH: Update education information
+    GET: Retrieve education information (304 if If-None-Match/If-Modified-Since match)
+    PUT/PATCH: Update education information (412 if If-Match is stale)
     """
     serializer_class = EducationInfoSerializer
     permission_classes = [IsAuthenticated]
+    # Cached without a request; made absolute per response like get_serializer() would
+    media_fields = ('intermediate_certificate_image', 'lastappearingexam_marksheet_image')
 
     def get_object(self):
-        return EducationInfo.objects.get_or_create(user=self.request.user)[0]
+        if not hasattr(self, '_object'):
+            self._object = EducationInfo.objects.get_or_create(user=self.request.user)[0]
+        return self._object
+
+    def retrieve(self, request, *args, **kwargs):
+        cached = get_payload(EDUCATION_INFO, request.user.pk)
+        if cached:
+            return (
+                self.not_modified_response(request, cached)
+                or self.with_validators(Response(absolute_urls(request, cached.data, self.media_fields)), cached)
+            )
+        instance = EducationInfo.objects.filter(user=request.user).first()
+        if instance is None:
+            return Response({'error': 'Education information not found'}, status=status.HTTP_404_NOT_FOUND)
+        not_modified = self.not_modified_response(request, instance)
+        if not_modified:
+            return not_modified
+        data = EducationInfoSerializer(instance).data
+        set_payload(EDUCATION_INFO, instance, data)
+        return self.with_validators(Response(absolute_urls(request, data, self.media_fields)), instance)
+
+    def update(self, request, *args, **kwargs):
+        instance = self.get_object()
+        precondition_failed = self.precondition_failed_response(request, instance)
+        if precondition_failed:
+            return precondition_failed
+        return self.with_validators(super().update(request, *args, **kwargs), instance)
 
     def perform_update(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        self.save_if_unmodified(self.request, serializer.instance, lambda: serializer.save(user=self.request.user))
+
+class ApplicantExportView(APIView):
+    """
+    Streams every applicant with their application, personal and education details.
+    GET ?output=csv (default) or ?output=ndjson, plus the filters in exports.FILTERS.
+    """
+    permission_classes = [IsAdmissionsStaff]
+
+    def get(self, request, *args, **kwargs):
+        queryset = export_queryset(request.query_params)
+        if request.query_params.get('output') == 'ndjson':
+            response = StreamingHttpResponse(stream_ndjson(queryset), content_type='application/x-ndjson')
+            filename = 'applicants.ndjson'
+        else:
+            response = StreamingHttpResponse(stream_csv(queryset), content_type='text/csv')
+            filename = 'applicants.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ApplicantListView(generics.ListAPIView):
+    """
+    Read-only applicant listing for reviewers, keyset-paginated.
+    GET ?ordering=created|percentage&cursor=...&page_size=...&count=true
+    Filters: application_status, casteCategory, min_percentage, max_percentage,
+    year_of_passing, created_after, created_before.
+    """
+    serializer_class = ApplicantListSerializer
+    permission_classes = [IsAdmissionsStaff]
+    pagination_class = ApplicationKeysetPagination
+
+    # ApplicantFilterSerializer field -> lookup; each is backed by an index
+    filters = {
+        'application_status': 'application_status',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lt',
+        'casteCategory': 'user__personalinfo__casteCategory',
+        'min_percentage': 'intermediate_percentage__gte',
+        'max_percentage': 'intermediate_percentage__lte',
+        'year_of_passing': 'user__educationinfo__intermediate_year_of_passing',
+    }
+
+    def get_queryset(self):
+        filters = ApplicantFilterSerializer.validated(self.request.query_params)
+        lookups = {self.filters[name]: value for name, value in filters.items()}
+        return (
+            Application.objects
+            .select_related('user', 'user__personalinfo', 'user__educationinfo')
+            .filter(**lookups)
+        )
+
+
+class AdmissionStatsView(APIView):
+    """Applicant counts by status, category, gender, blood group, board and year of passing."""
+    permission_classes = [IsAdmissionsStaff]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_admission_stats())
+
+
+class PayloadCacheStatsView(APIView):
+    """Hit/miss counts of the profile payload cache in this worker process."""
+    permission_classes = [IsAdmissionsStaff]
+
+    def get(self, request, *args, **kwargs):
+        return Response(payload_cache_stats())
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint for this worker process; see users.metrics."""
+
+    def get(self, request, *args, **kwargs):
+        if not settings.METRICS_TOKEN:
+            # Disabled until a scrape token is configured
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ChunkedUploadView(APIView):
+    """Starts a chunked upload of a document scan; see users.uploads."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = ChunkedUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            upload = start_upload(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response(ChunkedUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+class ChunkedUploadDetailView(APIView):
+    """GET reports progress for resuming; POST completes the upload; DELETE cancels it."""
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, request, upload_id):
+        return ChunkedUpload.objects.filter(pk=upload_id, user=request.user).first()
+
+    def get(self, request, upload_id, *args, **kwargs):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({'error': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def post(self, request, upload_id, *args, **kwargs):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({'error': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            complete_upload(upload)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        upload.refresh_from_db()
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def delete(self, request, upload_id, *args, **kwargs):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({'error': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            cancel_upload(upload)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class UploadChunkView(APIView):
+    """
+    PUT one chunk as the raw request body (application/octet-stream) with
+    its hex SHA-256 in X-Chunk-SHA256. The body is streamed to disk, never
+    parsed or buffered whole.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, upload_id, index, *args, **kwargs):
+        upload = ChunkedUpload.objects.filter(pk=upload_id, user=request.user).first()
+        if upload is None:
+            return Response({'error': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            size = write_chunk(upload, index, request.stream or io.BytesIO(), request.headers.get('X-Chunk-SHA256', ''))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response({'index': index, 'size': size})